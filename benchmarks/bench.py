@@ -0,0 +1,224 @@
+"""预览 / 分类 / 恢复的基准测试（无需图形界面）
+
+每个规模先用 synth.py 生成合成目录树，再在单独的子进程中依次计时：
+  preview  engine.preview（扫描 + 分类计数，与 GUI 选择文件夹后的预览相同）
+  scan     列举文件（-r 时为 Walker 递归遍历）
+  classify 逐个文件分类
+  plan     生成分类计划并处理同名冲突
+  execute  写入移动日志并执行移动
+  restore  按移动日志撤销（目录树恢复原状，下一轮可以直接重复）
+每个阶段记录 --repeat 轮中最快的耗时与吞吐量（文件/秒），每个规模记录子进程的峰值内存（RSS）。
+结果写成 JSON；传入 --baseline 时与保存的基线比较，任一阶段变慢超过 --threshold 即以状态 1 退出。
+
+示例：
+  python benchmarks/bench.py --sizes 10k,100k --tmpfs --save-baseline bench_baseline.json
+  python benchmarks/bench.py --sizes 10k,100k --tmpfs --baseline bench_baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+if not __package__:
+    # 直接以脚本运行时，把项目根目录与本目录加入搜索路径
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from file_organizer import engine
+from file_organizer.collisions import CollisionResolver
+from file_organizer.executor import MoveExecutor
+from file_organizer.journal import Journal
+from file_organizer.scanner import scan
+from file_organizer.walker import Walker
+from synth import DEFAULT_MIX, MARKER_SUFFIX, generate, parse_count, parse_mix, parse_size
+
+PHASES = ('preview', 'scan', 'classify', 'plan', 'execute', 'restore')
+
+# 比较基线时忽略变化小于此秒数的阶段（计时抖动）
+MIN_DELTA = 0.02
+
+
+def peak_rss():
+    """当前进程的峰值内存（字节），平台不支持时返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KiB 为单位，macOS 以字节为单位
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def _round(root, recursive, workers):
+    """执行一轮全部阶段，返回 {阶段: 秒}"""
+    classifier = engine.default_classifier('zh')
+    walker = Walker() if recursive else None
+    times = {}
+
+    start = time.perf_counter()
+    engine.preview(root, classifier=classifier, walker=walker)
+    times['preview'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if walker is not None:
+        snapshot = walker.walk(root, skip_top=classifier.categories)
+    else:
+        snapshot = scan(root)
+    files = list(snapshot)
+    times['scan'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    classify = classifier.classify
+    for file in files:
+        classify(file)
+    times['classify'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    moves, _ = CollisionResolver().resolve(engine.plan_sort(root, files, classifier=classifier))
+    times['plan'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    journal = Journal(root)
+    try:
+        run_id = journal.begin('sort', moves)
+        engine.execute(moves, on_done=lambda i: journal.done(run_id, i),
+                       executor=MoveExecutor(workers=workers))
+        journal.end(run_id)
+    finally:
+        journal.close()
+    times['execute'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = engine.restore_folder(root, executor=MoveExecutor(workers=workers))
+    times['restore'] = time.perf_counter() - start
+    if result['moved'] != len(moves):
+        raise RuntimeError(f"restore moved {result['moved']} of {len(moves)} files")
+    return times
+
+
+def run_case(root, files, repeat, recursive, workers):
+    """在子进程中执行：返回 {'phases': {...}, 'peak_rss': 字节}"""
+    best = {}
+    for _ in range(repeat):
+        for phase, seconds in _round(root, recursive, workers).items():
+            best[phase] = min(seconds, best.get(phase, seconds))
+    phases = {phase: {'seconds': round(seconds, 6),
+                      'files_per_sec': round(files / seconds) if seconds else None}
+              for phase, seconds in best.items()}
+    return {'phases': phases, 'peak_rss': peak_rss()}
+
+
+def compare(results, baseline, threshold):
+    """与基线比较，返回回归描述列表（基线中没有参数相同的规模时跳过该规模）"""
+    regressions = []
+    for key, case in results['cases'].items():
+        base = baseline.get('cases', {}).get(key)
+        if base is None or base.get('params') != case['params']:
+            print(f"{key}: no matching baseline, not compared", file=sys.stderr)
+            continue
+        for phase, current in case['phases'].items():
+            old = base['phases'].get(phase)
+            if old is None:
+                continue
+            new_s, old_s = current['seconds'], old['seconds']
+            if new_s > old_s * (1 + threshold) and new_s - old_s > MIN_DELTA:
+                regressions.append(f"{key} {phase}: {old_s:.3f}s -> {new_s:.3f}s "
+                                   f"(+{(new_s / old_s - 1) * 100:.0f}%)")
+        old_rss, new_rss = base.get('peak_rss'), case.get('peak_rss')
+        if old_rss and new_rss and new_rss > old_rss * (1 + threshold):
+            regressions.append(f"{key} peak_rss: {old_rss >> 20} MiB -> {new_rss >> 20} MiB")
+    return regressions
+
+
+def _base_dir(args):
+    if args.tmpfs:
+        if not os.path.isdir('/dev/shm'):
+            raise SystemExit('error: /dev/shm not found, use --base with a tmpfs mount')
+        return '/dev/shm'
+    return args.base or tempfile.gettempdir()
+
+
+def _print_case(key, case):
+    rss = case['peak_rss']
+    print(f"{key}: peak RSS {rss >> 20} MiB" if rss else f"{key}:")
+    for phase in PHASES:
+        entry = case['phases'][phase]
+        print(f"  {phase:<9}{entry['seconds']:>10.3f}s {entry['files_per_sec'] or 0:>12,} files/s")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='预览 / 分类 / 恢复的基准测试')
+    parser.add_argument('--sizes', default='10k',
+                        help='逗号分隔的文件数，可用 k/m 后缀（默认 10k，如 10k,100k,1m）')
+    parser.add_argument('--mix', type=parse_mix, help='扩展名分布，如 .jpg:30,.pdf:10,:5')
+    parser.add_argument('--depth', type=int, default=0, help='子目录层数，大于 0 时递归分类')
+    parser.add_argument('--fanout', type=int, default=4, help='每层子目录数')
+    parser.add_argument('--size', type=parse_size, default=(0, 0), help='文件大小范围，如 0-65536')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--repeat', type=int, default=3, help='每个规模重复的轮数，取最快的一轮')
+    parser.add_argument('--workers', type=int, default=4, help='跨设备复制的并发数')
+    parser.add_argument('--base', help='生成目录树的位置（如挂载好的回环文件系统，默认系统临时目录）')
+    parser.add_argument('--tmpfs', action='store_true', help='在 /dev/shm 上生成目录树')
+    parser.add_argument('--keep', action='store_true', help='保留生成的目录树，下次参数相同时直接复用')
+    parser.add_argument('--json', help='把结果写入此 JSON 文件')
+    parser.add_argument('--baseline', help='与此基线 JSON 比较，回归时以状态 1 退出')
+    parser.add_argument('--save-baseline', metavar='FILE', help='把结果保存为基线')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='允许的变慢比例（默认 0.2，即 20%%）')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    base = _base_dir(args)
+    results = {'python': platform.python_version(), 'platform': platform.platform(),
+               'base': base, 'cases': {}}
+    for count in (parse_count(size) for size in args.sizes.split(',')):
+        params = {'files': count, 'mix': args.mix or DEFAULT_MIX, 'depth': args.depth,
+                  'fanout': args.fanout, 'size': list(args.size), 'seed': args.seed}
+        root = os.path.join(base, f"fo-bench-{count}-d{args.depth}-s{args.seed}")
+        os.makedirs(root, exist_ok=True)
+        start = time.perf_counter()
+        generate(root, count, args.mix, args.depth, args.fanout, args.size, args.seed)
+        generated = time.perf_counter() - start
+        try:
+            # 每个规模一个新进程，峰值内存互不影响
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+                case = pool.submit(run_case, root, count, args.repeat, args.depth > 0,
+                                   args.workers).result()
+        finally:
+            if not args.keep:
+                shutil.rmtree(root, ignore_errors=True)
+                try:
+                    os.remove(root + MARKER_SUFFIX)
+                except OSError:
+                    pass
+        case['params'] = params
+        case['generate_seconds'] = round(generated, 3)
+        results['cases'][str(count)] = case
+        _print_case(count, case)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"regression: {line}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"no regressions against {args.baseline} (threshold {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""图形界面的启动耗时与导入预算
+
+用 python -X importtime 在新进程中导入 file_organizer.sort_files（图形界面启动时导入的全部模块），
+重复 --repeat 次取最快的一次，报告：
+  total    sort_files 及其导入的所有模块的累计耗时
+  toolkit  在另一个新进程中单独导入 customtkinter 的耗时（包含它导入时对系统深浅色的探测）
+  own      单独导入 customtkinter 时没有导入的模块的耗时之和，即本项目启动时额外导入的部分
+           （customtkinter 也会导入的 pathlib、json 等不计入，与导入顺序及主题探测的抖动无关）
+  modules  启动时导入的模块数（网络共享上的安装每个模块都要多几次往返）
+own 超过 --budget 毫秒，或分类引擎等应当延迟导入的模块（DEFERRED）在启动时被导入时以状态 1 退出。
+测量前先用 python -m compileall 生成字节码，否则测到的主要是编译时间
+（设置了 PYTHONDONTWRITEBYTECODE 时不会自动写入；网络共享上的安装同样应当预先编译）。
+有图形显示环境时加 --window 另外测量从启动解释器到窗口第一次空闲（已显示）的总耗时。
+
+示例：
+  python benchmarks/startup.py
+  python benchmarks/startup.py --budget 10 --window --json startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGET = 'file_organizer.sort_files'
+TOOLKIT = 'customtkinter'
+
+# 启动时不应导入的模块：都在窗口显示之后或第一次使用时才导入
+DEFERRED = ('file_organizer.engine', 'file_organizer.classifier', 'file_organizer.executor',
+            'file_organizer.dedupe', 'file_organizer.collisions', 'file_organizer.sniff',
+            'file_organizer.walker', 'file_organizer.journal', 'file_organizer.snapshots',
+            'file_organizer.stats', 'concurrent.futures', 'hashlib', 'uuid')
+
+_WINDOW_SCRIPT = """
+import time
+start = time.perf_counter()
+import customtkinter as ctk
+from file_organizer.sort_files import FileSorterGUI
+root = ctk.CTk()
+app = FileSorterGUI(root)
+def shown():
+    print(time.perf_counter() - start, flush=True)
+    root.destroy()
+root.after_idle(shown)
+root.mainloop()
+"""
+
+
+def _env():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    return env
+
+
+def parse_importtime(text):
+    """解析 -X importtime 的输出，返回 {模块: (自身微秒, 累计微秒)}（同名模块只记录第一次）"""
+    modules = {}
+    for line in text.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # 表头
+        modules.setdefault(fields[2].strip(), (int(fields[0]), int(fields[1])))
+    return modules
+
+
+def _importtime(module):
+    """在新进程中导入 module，返回 {模块: (自身微秒, 累计微秒)}"""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          capture_output=True, text=True, env=_env(), cwd=ROOT)
+    modules = parse_importtime(proc.stderr)
+    if proc.returncode != 0 or module not in modules:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+    return modules
+
+
+def measure_imports():
+    """导入图形界面与单独导入 customtkinter 各一次，
+    返回 {'total': 秒, 'toolkit': 秒, 'own': 秒, 'modules': 数量, 'deferred_loaded': [...]}"""
+    modules = _importtime(TARGET)
+    toolkit_modules = _importtime(TOOLKIT)
+    own = sum(own_us for name, (own_us, _) in modules.items() if name not in toolkit_modules)
+    return {'total': modules[TARGET][1] / 1e6, 'toolkit': toolkit_modules[TOOLKIT][1] / 1e6,
+            'own': own / 1e6, 'modules': len(modules),
+            'deferred_loaded': sorted(name for name in DEFERRED if name in modules)}
+
+
+def measure_window():
+    """启动解释器到窗口第一次空闲的总耗时（秒），没有图形显示环境时返回 None"""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-c', _WINDOW_SCRIPT], capture_output=True, text=True,
+                          env=_env(), cwd=ROOT)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        print(f"--window skipped: {proc.stderr.strip().splitlines()[-1:]}", file=sys.stderr)
+        return None
+    return elapsed
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='图形界面的启动耗时与导入预算')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数，取最快的一次（默认 5）')
+    parser.add_argument('--budget', type=float, default=10.0,
+                        help='本项目启动导入耗时的上限（毫秒，默认 10，不含 customtkinter）')
+    parser.add_argument('--window', action='store_true', help='另外测量窗口显示的总耗时（需要图形显示）')
+    parser.add_argument('--json', help='把结果写入此 JSON 文件')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    runs = [measure_imports() for _ in range(max(1, args.repeat))]
+    best = min(runs, key=lambda run: run['own'])
+    result = {'python': sys.version.split()[0], 'budget_ms': args.budget,
+              'total_ms': round(best['total'] * 1000, 3),
+              'toolkit_ms': round(best['toolkit'] * 1000, 3),
+              'own_ms': round(best['own'] * 1000, 3),
+              'modules': best['modules'], 'deferred_loaded': best['deferred_loaded']}
+    print(f"import {TARGET}: {result['total_ms']:.1f} ms total, "
+          f"{result['toolkit_ms']:.1f} ms {TOOLKIT}, {result['own_ms']:.1f} ms own, "
+          f"{result['modules']} modules")
+    if args.window:
+        windows = []
+        for _ in range(max(1, args.repeat)):
+            elapsed = measure_window()
+            if elapsed is None:
+                break
+            windows.append(elapsed)
+        else:
+            result['window_ms'] = round(min(windows) * 1000, 3)
+            print(f"window shown after {result['window_ms']:.1f} ms")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    failed = False
+    if result['deferred_loaded']:
+        print(f"error: imported at startup: {', '.join(result['deferred_loaded'])}", file=sys.stderr)
+        failed = True
+    if result['own_ms'] > args.budget:
+        print(f"error: startup imports take {result['own_ms']:.1f} ms, budget {args.budget:.1f} ms",
+              file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
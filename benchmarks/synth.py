@@ -0,0 +1,127 @@
+"""可复现的合成目录树生成器（基准测试用）
+
+同样的参数与随机种子总是生成同样的文件名、目录结构与内容，不同机器上的结果可以对比。
+文件放在 tmpfs（如 /dev/shm）上时测到的是纯 CPU 与系统调用开销；放在挂载好的
+回环文件系统（mkfs + mount -o loop）上时可以固定文件系统类型，排除宿主磁盘的差异。
+
+单独使用：python benchmarks/synth.py 目标文件夹 --files 100k --depth 2
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+# 默认扩展名分布：常见下载文件夹的比例，约 5% 无法按扩展名分类
+DEFAULT_MIX = {
+    '.jpg': 22, '.png': 10, '.gif': 2, '.mp4': 6, '.mkv': 2, '.pdf': 12, '.docx': 6,
+    '.xlsx': 4, '.txt': 8, '.md': 2, '.py': 3, '.json': 2, '.mp3': 5, '.flac': 1,
+    '.zip': 5, '.7z': 1, '.tar.gz': 1, '.exe': 2, '.deb': 1, '.bin': 2, '': 3,
+}
+
+# 生成完成后在目标文件夹旁写入的标记文件（不能放在里面，否则会被分类），
+# 参数相同时直接复用已有的目录树
+MARKER_SUFFIX = '.synth.json'
+
+_WORDS = ('report', 'photo', 'IMG', 'scan', 'invoice', 'draft', 'final', 'backup', 'notes',
+          'video', 'track', 'setup', 'data', 'export', 'screenshot', '报告', '照片', '新建')
+
+
+def parse_count(text):
+    """10k → 10000，1m → 1000000"""
+    text = text.strip().lower()
+    scale = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+
+def parse_mix(text):
+    """'.jpg:30,.pdf:10,:5' → {'.jpg': 30, '.pdf': 10, '': 5}（空扩展名表示没有扩展名）"""
+    mix = {}
+    for item in text.split(','):
+        ext, _, weight = item.strip().rpartition(':')
+        if ext and not ext.startswith('.'):
+            ext = '.' + ext
+        mix[ext] = float(weight)
+    return mix
+
+
+def parse_size(text):
+    """'0'、'4096' 或 '0-65536' → (最小, 最大) 字节"""
+    low, _, high = text.partition('-')
+    return int(low), int(high or low)
+
+
+def _dirs(depth, fanout):
+    """生成 depth 层、每层 fanout 个子目录的相对路径列表（含根目录 ''）"""
+    dirs = ['']
+    level = ['']
+    for d in range(depth):
+        level = [os.path.join(parent, f"dir{d}_{i}") for parent in level for i in range(fanout)]
+        dirs.extend(level)
+    return dirs
+
+
+def generate(root, files, mix=None, depth=0, fanout=4, size=(0, 0), seed=0):
+    """在 root 下生成 files 个文件，返回描述本次参数的字典
+
+    depth > 0 时文件随机分布在 depth 层子目录中（根目录也有）；
+    size 为 (最小, 最大) 字节，内容由种子决定，大小相同的文件内容一般不同。
+    """
+    root = os.path.abspath(root)
+    mix = mix or DEFAULT_MIX
+    params = {'files': files, 'mix': mix, 'depth': depth, 'fanout': fanout,
+              'size': list(size), 'seed': seed}
+    marker = root + MARKER_SUFFIX
+    try:
+        with open(marker, 'r', encoding='utf-8') as f:
+            if json.load(f) == params:
+                return params
+    except (OSError, ValueError):
+        pass
+    if os.path.isdir(root) and any(os.scandir(root)):
+        raise ValueError(f"{root} is not empty")
+
+    rng = random.Random(seed)
+    exts = list(mix)
+    weights = [mix[ext] for ext in exts]
+    dirs = _dirs(depth, fanout)
+    for rel in dirs:
+        os.makedirs(os.path.join(root, rel), exist_ok=True)
+    low, high = size
+    # 所有文件从同一块随机数据中截取不同位置，避免为每个文件生成随机字节
+    pool = rng.randbytes(high + 4096) if high else b''
+    for i in range(files):
+        rel = rng.choice(dirs)
+        name = f"{rng.choice(_WORDS)}_{i:07d}{rng.choices(exts, weights)[0]}"
+        n = rng.randint(low, high) if high else 0
+        with open(os.path.join(root, rel, name), 'wb') as f:
+            if n:
+                start = rng.randrange(4096)
+                f.write(i.to_bytes(8, 'little') + pool[start:start + n - 8] if n > 8
+                        else pool[start:start + n])
+    with open(marker, 'w', encoding='utf-8') as f:
+        json.dump(params, f)
+    return params
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='生成可复现的合成目录树')
+    parser.add_argument('path', help='目标文件夹（不存在时创建，必须为空）')
+    parser.add_argument('--files', type=parse_count, default=10000, help='文件数，可用 k/m 后缀')
+    parser.add_argument('--mix', type=parse_mix, help='扩展名分布，如 .jpg:30,.pdf:10,:5')
+    parser.add_argument('--depth', type=int, default=0, help='子目录层数（0 表示只有顶层）')
+    parser.add_argument('--fanout', type=int, default=4, help='每层子目录数')
+    parser.add_argument('--size', type=parse_size, default=(0, 0), help='文件大小范围，如 0-65536')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    args = parser.parse_args(argv)
+    os.makedirs(args.path, exist_ok=True)
+    try:
+        generate(args.path, args.files, args.mix, args.depth, args.fanout, args.size, args.seed)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
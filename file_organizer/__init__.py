@@ -0,0 +1 @@
+"""文件分类整理工具"""
@@ -0,0 +1,6 @@
+"""支持 python -m file_organizer"""
+import sys
+
+from .cli import main
+
+sys.exit(main())
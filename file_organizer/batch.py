@@ -0,0 +1,334 @@
+"""批量整理：按任务清单整理多个文件夹，汇总为一份报告
+
+任务清单（JSON）::
+
+    {
+        "workers": 8,
+        "device_jobs": 2,
+        "device_limits": {"/mnt/slow-nas": 1},
+        "defaults": {"language": "zh", "collisions": "rename"},
+        "jobs": [
+            {"folder": "/home/*/Downloads"},
+            {"folder": "/srv/share/scans", "recursive": true, "dedupe": "hardlink",
+             "rules": [{"category": "扫描件", "glob": "scan_*"}]},
+            {"folder": "/mnt/slow-nas/inbox", "pipeline": true},
+            {"folder": "/srv/share/old", "command": "restore"}
+        ]
+    }
+
+每个任务的配置依次由配置文件、defaults 与任务中的键合并而成，键与配置文件相同（见 config.py），
+另有 command（sort / restore）、recursive、pipeline 与 no_journal；folder 可以使用通配符，
+展开为多个任务，同一文件夹只整理一次。
+所有任务共用 workers 个工作线程；任务按文件夹所在设备（st_dev）分组，每个设备同时进行的任务数
+不超过 device_jobs（device_limits 中按挂载路径单独指定），设备之间按轮转顺序取任务，
+慢卷上的任务排队时其他设备的任务照常进行。
+单个任务失败不影响其他任务；取消时不再开始新的任务，进行中的任务在当前文件完成后停止，
+已完成的移动保存在各文件夹的移动日志中，下次运行时续做。
+"""
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from . import engine
+from .classifier import Classifier
+from .collisions import CollisionResolver
+from .dedupe import Deduper
+from .executor import MoveExecutor
+from .pipeline import PipelineExecutor, stream_sort_folder
+from .progress import Cancelled, Progress
+from .stats import Stats
+from .walker import Walker
+
+COMMANDS = ('sort', 'restore')
+
+
+class ManifestError(ValueError):
+    """任务清单无效"""
+
+
+class Job:
+    """一个文件夹的整理任务"""
+
+    def __init__(self, index, folder, command='sort', config=None):
+        self.index = index
+        self.folder = folder
+        self.command = command
+        self.config = config or {}
+        self.device = None
+        self.error = None       # 无法开始时的原因（文件夹不存在等）
+        self.duplicate = False  # 同一文件夹已由前面的任务整理，跳过
+
+
+def load_manifest(path):
+    """读取任务清单文件"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except OSError as e:
+        raise ManifestError(f"cannot read {path}: {e.strerror}") from None
+    except ValueError as e:
+        raise ManifestError(f"{path}: {e}") from None
+    if not isinstance(manifest, dict) or not isinstance(manifest.get('jobs'), list):
+        raise ManifestError(f"{path}: expected an object with a 'jobs' list")
+    return manifest
+
+
+def _expand(pattern):
+    """展开文件夹通配符，没有通配符时原样返回"""
+    if not glob.has_magic(pattern):
+        return [pattern]
+    return sorted(path for path in glob.glob(pattern) if os.path.isdir(path))
+
+
+def build_jobs(manifest, base=None):
+    """根据任务清单生成任务列表（base 为配置文件中的配置）"""
+    defaults = dict(base or {})
+    defaults.update(manifest.get('defaults') or {})
+    jobs = []
+    seen = {}
+    for n, item in enumerate(manifest['jobs']):
+        if isinstance(item, str):
+            item = {'folder': item}
+        if not isinstance(item, dict) or not isinstance(item.get('folder'), str):
+            raise ManifestError(f"job {n}: expected a folder path or an object with 'folder'")
+        config = dict(defaults)
+        config.update(item)
+        command = config.pop('command', 'sort')
+        if command not in COMMANDS:
+            raise ManifestError(f"job {n}: unknown command {command!r}")
+        pattern = os.path.expanduser(config.pop('folder'))
+        folders = _expand(pattern)
+        if not folders:
+            job = Job(len(jobs), pattern, command, config)
+            job.error = 'no folder matches'
+            jobs.append(job)
+            continue
+        for folder in folders:
+            job = Job(len(jobs), os.path.abspath(folder), command, config)
+            key = os.path.realpath(job.folder)
+            if key in seen:
+                job.error = f"already listed as job {seen[key]}"
+                job.duplicate = True
+            else:
+                seen[key] = job.index
+            jobs.append(job)
+    return jobs
+
+
+class BatchRunner:
+    """在共享的线程池中执行任务，每个设备的并发任务数有上限"""
+
+    def __init__(self, jobs, workers=4, device_jobs=2, device_limits=None):
+        self.jobs = list(jobs)
+        self.workers = max(1, workers)
+        self.device_jobs = max(1, device_jobs)
+        # 设备号 → 并发任务数；清单中以挂载路径给出，这里统一转换成 st_dev
+        self.device_limits = {}
+        for path, count in (device_limits or {}).items():
+            try:
+                self.device_limits[os.stat(path).st_dev] = max(1, int(count))
+            except (OSError, ValueError):
+                continue
+        self._active = set()    # 进行中任务的 Progress，工作线程增删，由 _lock 保护
+        self._lock = threading.Lock()
+        self._cancelled = False
+
+    @classmethod
+    def from_manifest(cls, manifest, base=None):
+        """根据任务清单（见模块说明）构建，base 为配置文件中的配置"""
+        jobs = build_jobs(manifest, base)
+        try:
+            return cls(jobs, workers=int(manifest.get('workers', 4)),
+                       device_jobs=int(manifest.get('device_jobs', 2)),
+                       device_limits=manifest.get('device_limits'))
+        except (TypeError, ValueError, AttributeError) as e:
+            raise ManifestError(f"invalid workers / device_jobs / device_limits: {e}") from None
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def cancel(self):
+        """不再开始新的任务，进行中的任务在当前文件完成后停止（可在信号处理函数中调用）"""
+        self._cancelled = True
+        # 只有工作线程会持有 _lock，在主线程的信号处理函数中获取不会死锁
+        with self._lock:
+            active = list(self._active)
+        for progress in active:
+            progress.cancel()
+
+    def _limit(self, dev):
+        return self.device_limits.get(dev, self.device_jobs)
+
+    # ---- 单个任务 ----
+
+    def _run_job(self, job, dry_run):
+        """在工作线程中执行一个任务，返回报告条目；出错时记录原因，不抛出异常"""
+        config = job.config
+        language = config.get('language', 'zh')
+        progress = Progress()
+        stats = Stats()
+        record = {'folder': job.folder, 'command': job.command, 'device': job.device,
+                  'status': 'ok', 'total': 0, 'moved': 0, 'skipped': 0, 'duplicates': 0,
+                  'resumed': 0, 'seconds': 0.0, 'files_per_sec': None, 'error': None}
+        with self._lock:
+            self._active.add(progress)
+        if self._cancelled:
+            progress.cancel()
+        start = time.perf_counter()
+        try:
+            walker = Walker.from_config(config) if config.get('recursive') else None
+            resolver = CollisionResolver.from_config(config)
+            use_journal = not config.get('no_journal')
+            if job.command == 'sort':
+                classifier = Classifier.from_config(config, language)
+                deduper = Deduper.from_config(config, language)
+                if config.get('pipeline') and not dry_run and deduper is None:
+                    result = stream_sort_folder(job.folder, language, progress=progress,
+                                                classifier=classifier,
+                                                executor=PipelineExecutor.from_config(config),
+                                                use_journal=use_journal, walker=walker,
+                                                resolver=resolver, stats=stats)
+                else:
+                    executor = (PipelineExecutor.from_config(config) if config.get('pipeline')
+                                else MoveExecutor.from_config(config))
+                    result = engine.sort_folder(job.folder, language, dry_run=dry_run,
+                                                progress=progress, classifier=classifier,
+                                                use_journal=use_journal, executor=executor,
+                                                walker=walker, deduper=deduper,
+                                                resolver=resolver, stats=stats)
+            else:
+                executor = (PipelineExecutor.from_config(config) if config.get('pipeline')
+                            else MoveExecutor.from_config(config))
+                result = engine.restore_folder(job.folder, dry_run=dry_run, progress=progress,
+                                               use_journal=use_journal, executor=executor,
+                                               walker=walker, resolver=resolver, stats=stats)
+            record['total'] = result['total']
+            record['moved'] = result['moved']
+            record['skipped'] = len(result.get('skipped') or ())
+            record['duplicates'] = len(result.get('duplicates') or ())
+            if result.get('resumed'):
+                record['resumed'] = result['resumed']['moved']
+        except Cancelled:
+            record['status'] = 'cancelled'
+            record['moved'] = progress.done
+        except Exception as e:
+            record['status'] = 'failed'
+            record['moved'] = progress.done
+            record['error'] = f"{type(e).__name__}: {e}"
+        finally:
+            with self._lock:
+                self._active.discard(progress)
+        seconds = time.perf_counter() - start
+        record['seconds'] = round(seconds, 6)
+        moved = record['moved'] + record['resumed']
+        if seconds > 0 and moved:
+            record['files_per_sec'] = round(moved / seconds, 1)
+        record['phases'] = stats.summary()['phases']
+        return record
+
+    # ---- 调度 ----
+
+    def run(self, dry_run=False, on_done=None):
+        """执行所有任务，返回汇总报告；on_done(报告条目) 在调用 run() 的线程中按完成顺序调用"""
+        started = time.time()
+        wall = time.perf_counter()
+        records = {}
+        pending = {}    # 设备号 → deque[Job]
+        for job in self.jobs:
+            if job.error is None:
+                try:
+                    if not os.path.isdir(job.folder):
+                        job.error = 'not a directory'
+                    else:
+                        job.device = os.stat(job.folder).st_dev
+                except OSError as e:
+                    job.error = e.strerror or str(e)
+            if job.error is not None:
+                records[job.index] = self._failed(job, job.error)
+                if job.duplicate:
+                    records[job.index]['status'] = 'skipped'
+                if on_done:
+                    on_done(records[job.index])
+                continue
+            pending.setdefault(job.device, deque()).append(job)
+        order = deque(pending)  # 轮转顺序
+        running = {}            # 设备号 → 进行中的任务数
+        results = queue.SimpleQueue()
+        active = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='fo-batch') as pool:
+
+            def dispatch():
+                nonlocal active
+                blocked = 0     # 连续遇到的已达上限的设备数
+                while order and active < self.workers and blocked < len(order) \
+                        and not self._cancelled:
+                    dev = order[0]
+                    if running.get(dev, 0) >= self._limit(dev):
+                        order.rotate(-1)
+                        blocked += 1
+                        continue
+                    jobs = pending[dev]
+                    job = jobs.popleft()
+                    if jobs:
+                        order.rotate(-1)
+                    else:
+                        order.popleft()
+                        del pending[dev]
+                    blocked = 0
+                    running[dev] = running.get(dev, 0) + 1
+                    active += 1
+                    future = pool.submit(self._run_job, job, dry_run)
+                    future.add_done_callback(lambda f, job=job: results.put((job, f)))
+
+            dispatch()
+            while active:
+                job, future = results.get()
+                active -= 1
+                running[job.device] -= 1
+                records[job.index] = record = future.result()
+                if on_done:
+                    on_done(record)
+                dispatch()
+
+        for jobs in pending.values():
+            for job in jobs:
+                records[job.index] = dict(self._failed(job, None), status='cancelled')
+        return self._report(started, time.perf_counter() - wall,
+                            [records[i] for i in sorted(records)])
+
+    @staticmethod
+    def _failed(job, error):
+        return {'folder': job.folder, 'command': job.command, 'device': job.device,
+                'status': 'failed', 'total': 0, 'moved': 0, 'skipped': 0, 'duplicates': 0,
+                'resumed': 0, 'seconds': 0.0, 'files_per_sec': None, 'error': error,
+                'phases': {}}
+
+    def _report(self, started, seconds, records):
+        """汇总报告：总计、按设备的合计与每个文件夹的条目"""
+        devices = {}
+        for record in records:
+            if record['device'] is None:
+                continue
+            entry = devices.setdefault(str(record['device']), {
+                'limit': self._limit(record['device']), 'jobs': 0, 'failed': 0, 'moved': 0,
+                'seconds': 0.0, 'example': record['folder']})
+            entry['jobs'] += 1
+            entry['failed'] += record['status'] == 'failed'
+            entry['moved'] += record['moved'] + record['resumed']
+            entry['seconds'] = round(entry['seconds'] + record['seconds'], 6)
+        moved = sum(record['moved'] + record['resumed'] for record in records)
+        statuses = [record['status'] for record in records]
+        return {'started': started, 'seconds': round(seconds, 6), 'workers': self.workers,
+                'jobs': len(records), 'ok': statuses.count('ok'),
+                'failed': statuses.count('failed'), 'cancelled': statuses.count('cancelled'),
+                'skipped_jobs': statuses.count('skipped'),
+                'moved': moved, 'files_per_sec': round(moved / seconds, 1) if seconds else None,
+                'devices': devices, 'folders': records}
+
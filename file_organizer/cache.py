@@ -0,0 +1,89 @@
+"""按文件元数据索引的持久缓存
+
+键由 (st_dev, st_ino, 大小, mtime_ns) 组成：文件内容变化时 mtime 或大小随之变化，
+缓存自动失效；同一文件系统内移动文件不改变 inode，移动到分类文件夹后缓存仍然有效。
+内容识别（sniff.py）与重复文件检测（dedupe.py）各用一个缓存文件。
+"""
+import atexit
+import json
+import os
+import threading
+from pathlib import Path
+
+# 每个缓存文件最多保留的条目数，超出时丢弃最早写入的条目
+MAX_ENTRIES = 500_000
+
+
+def metadata_key(st):
+    """由 stat 结果生成缓存键"""
+    return f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+
+
+class MetadataCache:
+    """JSON 文件中的 元数据键 → 值 映射，首次访问时加载，save() 时整体写回"""
+
+    def __init__(self, path, max_entries=MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._entries = None
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    def _load(self):
+        if self._entries is not None:
+            return self._entries
+        with self._lock:
+            if self._entries is not None:
+                return self._entries
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    entries = json.load(f)
+            except (OSError, ValueError):
+                entries = {}
+            self._entries = entries if isinstance(entries, dict) else {}
+            return self._entries
+
+    def __len__(self):
+        return len(self._load())
+
+    def get(self, key):
+        return self._load().get(key)
+
+    def set(self, key, value):
+        with self._lock:
+            entries = self._load()
+            if entries.get(key) != value:
+                entries[key] = value
+                self._dirty = True
+
+    def save(self):
+        """有新条目时写回磁盘（先写临时文件再替换）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = self._entries
+            if len(entries) > self.max_entries:
+                for key in list(entries)[:len(entries) - self.max_entries]:
+                    del entries[key]
+            tmp = self.path.with_name(self.path.name + '.tmp')
+            try:
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(entries, f, separators=(',', ':'))
+                os.replace(tmp, self.path)
+            except OSError:
+                return
+            self._dirty = False
+
+
+# 缓存文件路径 → MetadataCache，同一进程中的多个分类器 / 去重器共用一份缓存
+_caches = {}
+
+
+def get_cache(path):
+    """获取某个缓存文件对应的缓存对象，进程退出时自动保存"""
+    path = Path(path)
+    cache = _caches.get(path)
+    if cache is None:
+        cache = _caches[path] = MetadataCache(path)
+        atexit.register(cache.save)
+    return cache
@@ -0,0 +1,324 @@
+"""编译后的文件分类器
+
+内置分类与用户规则在构建时一次性编译成查找结构：
+- 扩展名 / 多段后缀（如 .tar.gz）→ 哈希表，按文件名中每个点的位置查一次；
+- glob / 正则名称规则 → 按字面前缀或后缀分桶，每个桶合并成一个带命名分组的正则，
+  每个文件只需匹配命中的少数几个桶（含捕获组的用户正则单独编译，见 _compile_alternatives）；
+- 带大小、修改时间条件的规则按其后缀索引，只有可能命中时才读取 stat。
+规则按配置中的先后顺序生效，第一个命中的规则决定分类，未命中时回退到内置分类；
+开启内容识别（见 sniff.py）时，名称规则都未命中的文件再按文件头归类。
+"""
+import fnmatch
+import os
+import re
+import time
+
+from .scanner import FileEntry
+from .sniff import Sniffer, aliases
+
+# 文件类型分类字典
+FILE_CATEGORIES = {
+    '图片': {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.svg', '.ico', '.tiff'},
+    '视频': {'.mp4', '.avi', '.mkv', '.mov', '.flv', '.wmv', '.webm', '.m4v', '.m3u8'},
+    '文本': {'.txt', '.doc', '.docx', '.pdf', '.xlsx', '.xls', '.ppt', '.pptx', '.md', '.csv', '.json', '.xml', '.html', '.css', '.js', '.py', '.java', '.cpp', '.c'},
+    '音频': {'.mp3', '.wav', '.flac', '.aac', '.ogg', '.wma', '.m4a'},
+    '压缩包': {'.zip', '.rar', '.7z', '.tar', '.gz', '.bz2'},
+    '程序': {'.exe', '.msi', '.apk', '.dmg', '.deb', '.rpm'}
+}
+
+# 未匹配任何分类时使用的文件夹名
+OTHER_CATEGORY = {'zh': '其他', 'en': 'Other'}
+
+_DAY = 86400
+_MATCH_KEYS = ('suffix', 'glob', 'regex')
+_CONDITION_KEYS = ('min_size', 'max_size', 'older_than_days', 'newer_than_days')
+
+
+class RuleError(ValueError):
+    """规则配置无效"""
+
+
+class _Condition:
+    """大小 / 修改时间条件，全部满足才算命中"""
+    __slots__ = ('index', 'category', 'name_res', 'min_size', 'max_size', 'max_mtime', 'min_mtime')
+
+    def __init__(self, index, category, rule, now, name_res=()):
+        self.index = index
+        self.category = category
+        self.name_res = name_res
+        self.min_size = rule.get('min_size')
+        self.max_size = rule.get('max_size')
+        older = rule.get('older_than_days')
+        newer = rule.get('newer_than_days')
+        self.max_mtime = now - older * _DAY if older is not None else None
+        self.min_mtime = now - newer * _DAY if newer is not None else None
+
+    def matches(self, entry):
+        if self.name_res and not any(regex.fullmatch(entry.name) for regex in self.name_res):
+            return False
+        st = entry.stat()
+        if self.min_size is not None and st.st_size < self.min_size:
+            return False
+        if self.max_size is not None and st.st_size > self.max_size:
+            return False
+        if self.max_mtime is not None and st.st_mtime > self.max_mtime:
+            return False
+        if self.min_mtime is not None and st.st_mtime < self.min_mtime:
+            return False
+        return True
+
+
+def _as_list(value):
+    return [value] if isinstance(value, str) else list(value)
+
+
+def _normalize_suffix(suffix):
+    suffix = suffix.lower()
+    return suffix if suffix.startswith('.') else '.' + suffix
+
+
+def _glob_key(pattern):
+    """提取 glob 的索引键：字面前缀（前两个字符）或以点开头的字面后缀"""
+    pattern = pattern.lower()
+    wild = [i for i, ch in enumerate(pattern) if ch in '*?[']
+    if not wild:
+        return ('^', pattern[:2])
+    prefix = pattern[:wild[0]]
+    if len(prefix) >= 2:
+        return ('^', prefix[:2])
+    tail = pattern[max(pattern.rfind(ch) for ch in '*?]') + 1:]
+    dot = tail.find('.')
+    if dot >= 0:
+        return ('$', tail[dot:])
+    if prefix:
+        return ('^', prefix)
+    return None
+
+
+def _compile_alternatives(items):
+    """把 [(命中结果, 正则片段)] 编译成尽量少的正则，返回 [(正则, 命中结果或 组名 → 命中结果)]
+
+    没有捕获组的片段合并成一个正则，命名分组 _r<n> 对应第 n 个片段；含捕获组的用户正则
+    单独编译：合并后组名可能重复，编号反向引用（如 (a)\\1）也会指向别的分组。
+    合并后仍无法编译时全部单独编译。
+    """
+    single = []
+    simple = []
+    for hit, pattern in items:
+        regex = re.compile(pattern)
+        if regex.groups:
+            single.append((regex, hit))
+        else:
+            simple.append((hit, pattern))
+    if len(simple) == 1:
+        single.append((re.compile(simple[0][1]), simple[0][0]))
+    elif simple:
+        try:
+            regex = re.compile('|'.join(f"(?P<_r{n}>{pattern})"
+                                        for n, (_, pattern) in enumerate(simple)))
+        except re.error:
+            single.extend((re.compile(pattern), hit) for hit, pattern in simple)
+        else:
+            single.append((regex, {f"_r{n}": hit for n, (hit, _) in enumerate(simple)}))
+    return single
+
+
+def _name_patterns(rule):
+    """把 glob / regex 规则转换成 (索引键, 正则片段) 列表"""
+    parts = []
+    # glob 与扩展名一样不区分大小写
+    for g in _as_list(rule.get('glob', ())):
+        parts.append((_glob_key(g), f"(?i:{fnmatch.translate(g)})"))
+    flags = '(?i:' if rule.get('ignore_case') else '(?:'
+    for r in _as_list(rule.get('regex', ())):
+        parts.append((None, flags + r + ')'))
+    return parts
+
+
+class Classifier:
+    """编译后的分类器：classify(entry) 返回分类文件夹名"""
+
+    def __init__(self, rules=(), categories=None, other=OTHER_CATEGORY['zh'], sniffer=None):
+        if categories is None:
+            categories = FILE_CATEGORIES
+        self.other = other
+        self.sniffer = sniffer
+        # 内置分类：扩展名 → 分类
+        self._builtin = {ext: category
+                         for category, extensions in categories.items()
+                         for ext in extensions}
+        rules = list(rules)
+        self._compile(rules)
+        # 所有可能的分类文件夹名，递归模式下不会再进入这些文件夹
+        self.categories = set(categories) | {other}
+        self.categories.update(rule['category'] for rule in rules)
+
+    @classmethod
+    def from_config(cls, config, language='zh'):
+        """根据配置字典（见 config.py）构建分类器"""
+        try:
+            sniffer = Sniffer.from_config(config)
+        except ValueError as e:
+            raise RuleError(str(e)) from None
+        return cls(config.get('rules', ()), other=OTHER_CATEGORY.get(language, OTHER_CATEGORY['zh']),
+                   sniffer=sniffer)
+
+    def _compile(self, rules):
+        now = time.time()
+        self._suffixes = {}      # 后缀 → 最先出现的无条件规则 (序号, 分类)
+        self._conditional = {}   # 后缀 → 带条件规则列表
+        self._generic = []       # 没有后缀的带条件规则，对所有文件检查
+        buckets = {}             # 名称索引键 → [(序号, 分类, 正则片段)]
+        self._max_dots = 1
+        for index, rule in enumerate(rules):
+            if not isinstance(rule, dict) or not rule.get('category'):
+                raise RuleError(f"rule #{index} must be an object with a 'category'")
+            category = rule['category']
+            has_match = any(key in rule for key in _MATCH_KEYS)
+            has_condition = any(rule.get(key) is not None for key in _CONDITION_KEYS)
+            if not has_match and not has_condition:
+                raise RuleError(f"rule #{index} has no suffix, glob, regex or size/age condition")
+            if 'suffix' in rule and ('glob' in rule or 'regex' in rule):
+                raise RuleError(f"rule #{index} mixes 'suffix' with 'glob'/'regex'")
+
+            patterns = _name_patterns(rule)
+            if patterns:
+                try:
+                    for _, pattern in patterns:
+                        re.compile(pattern)
+                except re.error as e:
+                    raise RuleError(f"rule #{index}: {e}") from None
+                if has_condition:
+                    name_res = [regex for regex, _ in
+                                _compile_alternatives([(None, pattern) for _, pattern in patterns])]
+                    self._generic.append(_Condition(index, category, rule, now, name_res))
+                else:
+                    for key, pattern in patterns:
+                        if key is not None and key[0] == '$':
+                            self._max_dots = max(self._max_dots, key[1].count('.'))
+                        buckets.setdefault(key, []).append((index, category, pattern))
+                continue
+
+            for suffix in _as_list(rule.get('suffix', ())):
+                suffix = _normalize_suffix(suffix)
+                self._max_dots = max(self._max_dots, suffix.count('.'))
+                if has_condition:
+                    cond = _Condition(index, category, rule, now)
+                    self._conditional.setdefault(suffix, []).append(cond)
+                else:
+                    self._suffixes.setdefault(suffix, (index, category))
+            if 'suffix' not in rule:
+                self._generic.append(_Condition(index, category, rule, now))
+
+        # 每个桶编译成一个合并的正则（及少数单独编译的正则），命中结果为 (序号, 分类)
+        self._names = {key: _compile_alternatives([((index, category), pattern)
+                                                   for index, category, pattern in items])
+                       for key, items in buckets.items()}
+        self._generic.sort(key=lambda c: c.index)
+
+    def _candidate_suffixes(self, lowered, skip_leading=True):
+        """文件名的所有候选后缀（从长到短），最多 _max_dots 段"""
+        # 默认去掉开头的点，隐藏文件本身不算扩展名
+        start = len(lowered) - len(lowered.lstrip('.')) if skip_leading else -1
+        suffixes = []
+        pos = len(lowered)
+        for _ in range(self._max_dots):
+            pos = lowered.rfind('.', start + 1, pos)
+            if pos < 0:
+                break
+            suffixes.append(lowered[pos:])
+        suffixes.reverse()
+        return suffixes
+
+    def _match_names(self, name, lowered):
+        """在可能命中的名称桶中查找最先定义的规则"""
+        keys = [('^', lowered[:2]), ('^', lowered[:1]), None]
+        keys += [('$', s) for s in self._candidate_suffixes(lowered, skip_leading=False)]
+        best = None
+        for key in keys:
+            for regex, hits in self._names.get(key, ()):
+                match = regex.fullmatch(name)
+                if match is not None:
+                    # 合并的正则中第一个命中的分支即桶内最先定义的规则
+                    hit = hits[match.lastgroup] if isinstance(hits, dict) else hits
+                    if best is None or hit[0] < best[0]:
+                        best = hit
+        return best
+
+    def classify(self, entry):
+        """返回文件所属分类"""
+        if not isinstance(entry, FileEntry):
+            path = os.fspath(entry)
+            entry = FileEntry(os.path.basename(path), path)
+        name = entry.name
+        lowered = name.lower()
+        suffixes = self._candidate_suffixes(lowered)
+
+        best = None  # (序号, 分类)
+        for suffix in suffixes:
+            hit = self._suffixes.get(suffix)
+            if hit is not None and (best is None or hit[0] < best[0]):
+                best = hit
+        if self._names:
+            hit = self._match_names(name, lowered)
+            if hit is not None and (best is None or hit[0] < best[0]):
+                best = hit
+
+        # 带条件的规则只有在可能改变结果时才需要 stat
+        if self._conditional or self._generic:
+            candidates = [c for suffix in suffixes for c in self._conditional.get(suffix, ())]
+            if candidates:
+                candidates = sorted(candidates + self._generic, key=lambda c: c.index)
+            else:
+                candidates = self._generic
+            for cond in candidates:
+                if best is not None and cond.index > best[0]:
+                    break
+                try:
+                    if cond.matches(entry):
+                        best = (cond.index, cond.category)
+                        break
+                except OSError:
+                    continue
+
+        if best is not None:
+            return best[1]
+        ext = suffixes[-1] if suffixes else ''
+        category = self._builtin.get(ext)
+        if self.sniffer is not None and (category is None or self.sniffer.verify):
+            sniffed, strong = self.sniffer.identify(entry)
+            if sniffed is not None and sniffed != ext:
+                if category is None:
+                    return self._sniffed_category(sniffed)
+                # 扩展名已知时只有可靠的二进制魔数与扩展名不相容才纠正
+                compatible = aliases(sniffed)
+                if strong and compatible is not None and ext not in compatible:
+                    return self._sniffed_category(sniffed)
+        return category if category is not None else self.other
+
+    def _sniffed_category(self, ext):
+        """识别出的扩展名按无条件后缀规则与内置分类归类"""
+        hit = self._suffixes.get(ext)
+        if hit is not None:
+            return hit[1]
+        return self._builtin.get(ext, self.other)
+
+    def _needs_sniff(self, entry):
+        """按名称粗略判断是否需要读取文件头（用于批量预读）"""
+        if self.sniffer.verify:
+            return True
+        suffixes = self._candidate_suffixes(entry.name.lower())
+        if any(suffix in self._suffixes for suffix in suffixes):
+            return False
+        return self._builtin.get(suffixes[-1] if suffixes else '') is None
+
+    def prefetch(self, files):
+        """开启内容识别时按批并行预读文件头，按原顺序产出 files；否则原样返回"""
+        if self.sniffer is None:
+            return files
+        return self.sniffer.prefetch(files, self._needs_sniff)
+
+    def save(self):
+        """写回内容识别缓存（分批预读只在新条目足够多时写回，运行结束时调用）"""
+        if self.sniffer is not None:
+            self.sniffer.save()
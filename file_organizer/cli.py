@@ -0,0 +1,432 @@
+"""命令行入口：python -m file_organizer {sort,restore,resume,preview,watch} PATH | batch MANIFEST"""
+import argparse
+import json
+import signal
+import sys
+import threading
+from pathlib import Path
+
+from . import engine
+from .batch import BatchRunner, ManifestError, load_manifest
+from .classifier import Classifier, RuleError
+from .config import load_config
+from .collisions import CollisionResolver
+from .dedupe import Deduper
+from .executor import MoveExecutor
+from .pipeline import PipelineExecutor, stream_sort_folder
+from .walker import Walker
+from .watch import Watcher
+from .progress import Cancelled, Progress, format_size
+from .stats import Stats, profiled, traced
+
+
+def _print_moves(result):
+    """逐行打印移动计划"""
+    for move in result['moves']:
+        print(f"{move.src} -> {move.dest}")
+
+
+def _to_json(result):
+    """把结果转换成可序列化的字典"""
+    data = dict(result)
+    for key in ('moves', 'skipped', 'duplicates'):
+        if isinstance(data.get(key), list):
+            data[key] = [{'src': str(m.src), 'dest': str(m.dest), 'category': m.category}
+                         for m in data[key]]
+    return data
+
+
+def _print_resumed(result):
+    """打印续做的中断运行"""
+    resumed = result.get('resumed')
+    if resumed:
+        print(f"resumed interrupted {resumed['kind']}: moved {resumed['moved']}/{resumed['total']} files")
+
+
+def _classifier(args):
+    """按配置文件中的规则与 --sniff 构建分类器"""
+    config = load_config(args.config)
+    if args.sniff:
+        config['sniff'] = args.sniff
+    return Classifier.from_config(config, args.lang)
+
+
+def _executor(args):
+    """按配置文件与 --workers / --pipeline 构建移动执行器"""
+    config = load_config(getattr(args, 'config', None))
+    if args.pipeline:
+        executor = PipelineExecutor.from_config(config)
+        if args.inflight:
+            executor.inflight = args.inflight
+        return executor
+    executor = MoveExecutor.from_config(config)
+    if args.workers:
+        executor.workers = args.workers
+    return executor
+
+
+def _deduper(args):
+    """按配置文件与 --dedupe 构建去重器，未开启时返回 None"""
+    config = load_config(args.config)
+    if args.dedupe:
+        config['dedupe'] = args.dedupe
+    try:
+        return Deduper.from_config(config, args.lang)
+    except ValueError as e:
+        raise RuleError(str(e)) from None
+
+
+def _resolver(args):
+    """按配置文件与 --on-collision 构建同名冲突处理器"""
+    config = load_config(getattr(args, 'config', None))
+    if args.on_collision:
+        config['collisions'] = args.on_collision
+    try:
+        return CollisionResolver.from_config(config)
+    except ValueError as e:
+        raise RuleError(str(e)) from None
+
+
+def _walker(args):
+    """-r 时按配置文件与命令行参数构建递归遍历器，否则返回 None"""
+    if not args.recursive:
+        return None
+    walker = Walker.from_config(load_config(getattr(args, 'config', None)))
+    if args.max_depth is not None:
+        walker.max_depth = args.max_depth
+    walker.exclude += args.exclude
+    walker.follow_symlinks = walker.follow_symlinks or args.follow_symlinks
+    return walker
+
+
+def _cancel_on_sigint(target):
+    """第一次 Ctrl+C 调用 target.cancel()，第二次立即中断（只能在主线程中安装）"""
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    def on_sigint(signum, frame):
+        if target.cancelled:
+            raise KeyboardInterrupt
+        target.cancel()
+        print("cancelling after the current files, press Ctrl+C again to abort",
+              file=sys.stderr, flush=True)
+
+    signal.signal(signal.SIGINT, on_sigint)
+
+
+def _progress():
+    """返回可取消的进度对象：第一次 Ctrl+C 在当前文件完成后停止，第二次立即中断
+
+    已完成的移动保留在移动日志中，之后运行 resume（或再次 sort / restore）续做剩余部分；
+    暂停可以直接用 Ctrl+Z / fg。
+    """
+    progress = Progress()
+    _cancel_on_sigint(progress)
+    return progress
+
+
+def _stats(args):
+    """--stats / --stats-file（或配置中的 stats_file）时返回 Stats，否则返回 None"""
+    args.stats_file = args.stats_file or load_config(getattr(args, 'config', None)).get('stats_file')
+    return Stats() if args.stats or args.stats_file else None
+
+
+def _report_stats(args, stats, result):
+    """打印并导出统计；--json 时统计并入 JSON 输出"""
+    if stats is None:
+        return
+    if args.stats_file:
+        stats.write(args.stats_file, {'command': args.command, 'folder': str(args.path)})
+    if args.stats:
+        if args.json:
+            result['stats'] = stats.summary()
+        else:
+            print(stats.format(), file=sys.stderr)
+
+
+def cmd_sort(args):
+    deduper = _deduper(args)
+    stats = _stats(args)
+    progress = _progress()
+    if args.pipeline and not args.dry_run and deduper is None:
+        # 去重需要先看到全部文件，开启时改用普通流程（仍使用流水线执行器）
+        result = stream_sort_folder(args.path, args.lang, progress=progress,
+                                    classifier=_classifier(args),
+                                    executor=_executor(args), use_journal=not args.no_journal,
+                                    walker=_walker(args), resolver=_resolver(args),
+                                    stats=stats)
+    else:
+        result = engine.sort_folder(args.path, args.lang, dry_run=args.dry_run, progress=progress,
+                                    classifier=_classifier(args), use_journal=not args.no_journal,
+                                    executor=_executor(args), walker=_walker(args),
+                                    deduper=deduper, resolver=_resolver(args), stats=stats)
+    _report_stats(args, stats, result)
+    if args.json:
+        print(json.dumps(_to_json(result), ensure_ascii=False, indent=2))
+        return 0
+    for move in result.get('duplicates', ()):
+        print(f"duplicate: {move.src} == {move.dest}")
+    for move in result.get('skipped', ()):
+        print(f"skipped: {move.src} -> {move.dest}", file=sys.stderr)
+    if args.dry_run:
+        _print_moves(result)
+    else:
+        _print_resumed(result)
+        print(f"sorted {result['moved']}/{result['total']} files in {result['folder']}")
+    return 0
+
+
+def cmd_restore(args):
+    stats = _stats(args)
+    result = engine.restore_folder(args.path, dry_run=args.dry_run, progress=_progress(),
+                                   use_journal=not args.no_journal, executor=_executor(args),
+                                   walker=_walker(args), resolver=_resolver(args), stats=stats)
+    _report_stats(args, stats, result)
+    if args.json:
+        print(json.dumps(_to_json(result), ensure_ascii=False, indent=2))
+    elif args.dry_run:
+        _print_moves(result)
+    else:
+        _print_resumed(result)
+        print(f"restored {result['moved']}/{result['total']} files in {result['folder']}")
+    for move in result.get('skipped', ()):
+        print(f"skipped: {move.src} -> {move.dest}", file=sys.stderr)
+    if result.get('skipped') and not args.json:
+        print(f"{len(result['skipped'])} files left in place (original location taken); "
+              "move the other files away and run restore again", file=sys.stderr)
+    return 0
+
+
+def cmd_resume(args):
+    result = engine.resume(args.path, _progress(), executor=_executor(args))
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    elif result is None:
+        print(f"nothing to resume in {args.path}")
+    else:
+        print(f"resumed {result['kind']}: moved {result['moved']}/{result['total']} files, "
+              f"{result['skipped']} missing, {result['conflicts']} left in place (destination exists)")
+    return 0
+
+
+def cmd_preview(args):
+    result = engine.preview(args.path, args.lang, sample=args.sample,
+                            classifier=_classifier(args), walker=_walker(args))
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0
+    print(f"{result['folder']}: {result['total']} files, {format_size(result['size'])}")
+    for category in sorted(result['categories']):
+        entry = result['categories'][category]
+        print(f"{category} ({entry['count']}, {format_size(entry['size'])})")
+        for name in entry['files']:
+            print(f"   • {name}")
+        if entry['count'] > len(entry['files']):
+            print(f"   ... {entry['count'] - len(entry['files'])} more")
+    return 0
+
+
+def cmd_watch(args):
+    config = load_config(args.config)
+    kwargs = {'classifier': _classifier(args), 'executor': _executor(args),
+              'use_journal': not args.no_journal}
+    if args.backend:
+        kwargs['backend'] = args.backend
+    if args.settle is not None:
+        kwargs['settle'] = args.settle
+    if args.interval is not None:
+        kwargs['interval'] = args.interval
+    if args.on_collision:
+        kwargs['collisions'] = args.on_collision
+    watcher = Watcher.from_config(args.path, config, **kwargs)
+
+    def on_batch(result):
+        if args.json:
+            print(json.dumps(_to_json(result), ensure_ascii=False), flush=True)
+            return
+        for move in result['moves']:
+            print(f"{move.src} -> {move.dest}")
+        for move in result['skipped']:
+            print(f"skipped: {move.src} -> {move.dest}", file=sys.stderr)
+        if result['error']:
+            print(f"error: {result['error']}", file=sys.stderr)
+        sys.stdout.flush()
+
+    if not args.json:
+        print(f"watching {args.path} ({watcher.source.name}), press Ctrl+C to stop", flush=True)
+    try:
+        watcher.run(on_batch)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _print_job(record):
+    """打印一个批量任务的结果"""
+    folder = record['folder']
+    if record['status'] == 'skipped':
+        print(f"skipped   {folder}: {record['error']}", file=sys.stderr, flush=True)
+        return
+    if record['status'] == 'failed':
+        print(f"failed    {folder}: {record['error']}", file=sys.stderr, flush=True)
+        return
+    moved = record['moved'] + record['resumed']
+    rate = f", {record['files_per_sec']:.0f} files/s" if record['files_per_sec'] else ''
+    print(f"{record['status']:<9} {folder}: {record['command']} moved {moved}/{record['total']} "
+          f"files in {record['seconds']:.2f}s{rate}", flush=True)
+
+
+def cmd_batch(args):
+    # 图形界面保存的语言、主题与递归开关不作为批量任务的默认值
+    base = {key: value for key, value in load_config(args.config).items()
+            if key not in ('language', 'theme', 'recursive')}
+    runner = BatchRunner.from_manifest(load_manifest(args.manifest), base)
+    if args.workers:
+        runner.workers = args.workers
+    _cancel_on_sigint(runner)
+    report = runner.run(dry_run=args.dry_run, on_done=None if args.json else _print_job)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(f"{report['jobs']} jobs: {report['ok']} ok, {report['failed']} failed, "
+              f"{report['cancelled']} cancelled, {report['skipped_jobs']} skipped; moved {report['moved']} files "
+              f"in {report['seconds']:.2f}s")
+    if report['cancelled']:
+        return 130
+    return 1 if report['failed'] else 0
+
+
+def build_parser():
+    """构建参数解析器"""
+    parser = argparse.ArgumentParser(prog='file_organizer',
+                                     description='按文件类型整理文件夹（无需图形界面）')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_common(p):
+        p.add_argument('path', type=Path, help='要处理的文件夹')
+        p.add_argument('--json', action='store_true', help='以 JSON 输出结果')
+
+    def add_workers(p):
+        p.add_argument('--workers', type=int, help='跨设备复制的默认并发数（默认读取配置，否则为 4）')
+        p.add_argument('--pipeline', action='store_true',
+                       help='流水线模式：同时进行多个元数据操作，适合 SMB/NFS 等网络挂载')
+        p.add_argument('--inflight', type=int, help='流水线模式下同时进行的操作数（默认 32）')
+
+    def add_collision(p):
+        p.add_argument('--on-collision', choices=['rename', 'skip', 'newer', 'hash'],
+                       help='目标已有同名文件时：rename 改名为"名称 (1)"（默认），skip 留在原处，'
+                            'newer 保留较新的文件（较旧的改名为"名称 (replaced)"，可以撤销），'
+                            'hash 内容相同时留在原处、不同时改名')
+
+    def add_stats(p):
+        p.add_argument('--stats', action='store_true',
+                       help='输出各阶段耗时、操作次数与单个文件延迟的 p50/p99（--json 时并入 JSON）')
+        p.add_argument('--stats-file', metavar='FILE',
+                       help='把统计写入文件：.prom 结尾为 Prometheus 文本格式，否则为 JSON')
+        p.add_argument('--profile', metavar='FILE', help='用 cProfile 记录并写入此文件')
+        p.add_argument('--tracemalloc', type=int, metavar='N', default=0,
+                       help='用 tracemalloc 跟踪内存，结束时输出峰值与前 N 个分配位置')
+
+    def add_walk(p):
+        p.add_argument('-r', '--recursive', action='store_true', help='递归处理所有子文件夹')
+        p.add_argument('--max-depth', type=int, help='递归的最大深度（0 表示只处理顶层）')
+        p.add_argument('--exclude', action='append', default=[], metavar='PATTERN',
+                       help='排除匹配名称或相对路径的文件/文件夹，可重复')
+        p.add_argument('--follow-symlinks', action='store_true', help='跟随目录符号链接（自动防止环路）')
+
+    p = sub.add_parser('sort', help='分类整理文件')
+    add_common(p)
+    p.add_argument('--dry-run', action='store_true', help='只打印计划，不移动文件')
+    p.add_argument('--lang', choices=['zh', 'en'], default='zh', help='"其他"分类使用的语言')
+    p.add_argument('--config', type=Path, help='规则配置文件（默认 ~/.file_sorter_config.json）')
+    p.add_argument('--sniff', choices=['unknown', 'all'],
+                   help='按文件头识别类型：unknown 只识别无法按名称分类的文件，all 还纠正扩展名错误的文件')
+    p.add_argument('--no-journal', action='store_true', help='不写移动日志')
+    p.add_argument('--dedupe', choices=['skip', 'hardlink', 'move'],
+                   help='检测重复文件：skip 留在原处，hardlink 改为硬链接（恢复时重新复制成独立的文件），'
+                        'move 移到"重复文件"文件夹')
+    add_collision(p)
+    add_workers(p)
+    add_walk(p)
+    add_stats(p)
+    p.set_defaults(func=cmd_sort)
+
+    p = sub.add_parser('restore', help='按移动日志撤销分类（无日志时把子文件夹中的文件移回主文件夹）')
+    add_common(p)
+    p.add_argument('--dry-run', action='store_true', help='只打印计划，不移动文件')
+    p.add_argument('--no-journal', action='store_true', help='忽略移动日志，直接展开所有子文件夹')
+    add_collision(p)
+    add_workers(p)
+    add_walk(p)
+    add_stats(p)
+    p.set_defaults(func=cmd_restore)
+
+    p = sub.add_parser('resume', help='续做上次中断的分类或恢复')
+    add_common(p)
+    add_workers(p)
+    p.set_defaults(func=cmd_resume)
+
+    p = sub.add_parser('preview', help='预览分类结果')
+    add_common(p)
+    p.add_argument('--lang', choices=['zh', 'en'], default='zh', help='"其他"分类使用的语言')
+    p.add_argument('--config', type=Path, help='规则配置文件（默认 ~/.file_sorter_config.json）')
+    p.add_argument('--sniff', choices=['unknown', 'all'],
+                   help='按文件头识别类型：unknown 只识别无法按名称分类的文件，all 还纠正扩展名错误的文件')
+    p.add_argument('--sample', type=int, default=5, help='每个分类显示的文件数')
+    add_walk(p)
+    p.set_defaults(func=cmd_preview)
+
+    p = sub.add_parser('watch', help='持续监视文件夹，自动整理新到达的文件')
+    add_common(p)
+    p.add_argument('--lang', choices=['zh', 'en'], default='zh', help='"其他"分类使用的语言')
+    p.add_argument('--config', type=Path, help='规则配置文件（默认 ~/.file_sorter_config.json）')
+    p.add_argument('--sniff', choices=['unknown', 'all'],
+                   help='按文件头识别类型：unknown 只识别无法按名称分类的文件，all 还纠正扩展名错误的文件')
+    p.add_argument('--no-journal', action='store_true', help='不写移动日志')
+    p.add_argument('--settle', type=float, help='文件大小与修改时间保持不变多少秒后才移动（默认 2）')
+    p.add_argument('--interval', type=float, help='轮询间隔秒数（默认 1）')
+    p.add_argument('--backend', choices=['auto', 'inotify', 'poll'], default=None,
+                   help='变化检测方式（默认 auto；网络挂载上 inotify 看不到其他机器的写入，请用 poll）')
+    add_collision(p)
+    add_workers(p)
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser('batch', help='按任务清单整理多个文件夹（按设备限制并发），输出汇总报告')
+    p.add_argument('manifest', type=Path, help='任务清单 JSON（格式见 file_organizer/batch.py）')
+    p.add_argument('--config', type=Path, help='默认规则配置文件（默认 ~/.file_sorter_config.json）')
+    p.add_argument('--workers', type=int, help='同时进行的任务数（默认读取清单中的 workers，否则为 4）')
+    p.add_argument('--dry-run', action='store_true', help='只生成计划，不移动文件')
+    p.add_argument('--report', type=Path, metavar='FILE', help='把汇总报告写入此 JSON 文件')
+    p.add_argument('--json', action='store_true', help='以 JSON 输出汇总报告')
+    p.set_defaults(func=cmd_batch)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if hasattr(args, 'path') and not args.path.is_dir():
+        print(f"error: {args.path} is not a directory", file=sys.stderr)
+        return 2
+    try:
+        with profiled(getattr(args, 'profile', None)), \
+                traced(getattr(args, 'tracemalloc', 0), sys.stderr):
+            return args.func(args)
+    except RuleError as e:
+        print(f"error: invalid rule: {e}", file=sys.stderr)
+        return 2
+    except ManifestError as e:
+        print(f"error: invalid manifest: {e}", file=sys.stderr)
+        return 2
+    except Cancelled:
+        if getattr(args, 'no_journal', False):
+            print("cancelled", file=sys.stderr)
+        else:
+            print(f"cancelled: finished moves are kept in the journal, "
+                  f"run 'resume {args.path}' to continue", file=sys.stderr)
+        return 130
+    except OSError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
@@ -0,0 +1,155 @@
+"""同名文件冲突处理
+
+每个目标文件夹只列举一次，已有文件名与本次计划占用的文件名放在同一个集合中，
+冲突检查是一次哈希查找，目标文件夹中已有几十万个文件时也不需要为每个文件 stat。
+策略：
+- rename：改名为 "名称 (1).扩展名"、"名称 (2).扩展名"……（默认）；
+- skip：留在原处不移动；
+- newer：保留修改时间较新的文件：源文件较新时先把目标改名为 "名称 (replaced).扩展名"
+  留在原文件夹（作为单独的移动写入日志，撤销时放回原位），否则源文件留在原处；
+- hash：内容相同时留在原处（已有一份），不同时按 rename 处理。
+"""
+import os
+import stat
+import sys
+
+from .dedupe import same_content
+
+POLICIES = ('rename', 'skip', 'newer', 'hash')
+
+if sys.platform in ('win32', 'darwin'):
+    # Windows 与 macOS 的默认文件系统不区分大小写
+    def _key(name):
+        return name.lower()
+else:
+    def _key(name):
+        return name
+
+
+def _numbered(name, n):
+    """a.txt → a (n).txt，隐藏文件与没有扩展名的文件在末尾追加"""
+    stem, ext = os.path.splitext(name)
+    if not stem:
+        stem, ext = name, ''
+    return f"{stem} ({n}){ext}"
+
+
+def _replaced(name, n):
+    """newer 策略中被替换的文件：a.txt → a (replaced).txt、a (replaced 2).txt……"""
+    stem, ext = os.path.splitext(name)
+    if not stem:
+        stem, ext = name, ''
+    return f"{stem} (replaced){ext}" if n == 1 else f"{stem} (replaced {n}){ext}"
+
+
+class CollisionResolver:
+    """按策略改写移动计划中与已有文件或其他计划重名的目标路径
+
+    listing 为假时不列举目标文件夹，改为对每个目标路径调用一次 lexists，
+    适合监视模式中只有少量文件、目标文件夹却很大的批次。
+    同一个解析器可以跨多批计划使用（流水线模式），已分配的名称会一直保留。
+    hash 策略比较内容时使用 index_path 指定的哈希索引（与去重共用，默认同 dedupe.INDEX_PATH）。
+    """
+
+    def __init__(self, policy='rename', listing=True, index_path=None):
+        if policy not in POLICIES:
+            raise ValueError(f"collision policy must be one of {', '.join(POLICIES)}, not {policy!r}")
+        self.policy = policy
+        self.listing = listing
+        self.index_path = index_path
+        self._dirs = {}     # 目标文件夹 → 已占用的文件名集合
+
+    @classmethod
+    def from_config(cls, config, **kwargs):
+        """根据配置字典构建（collisions、dedupe_index）"""
+        kwargs.setdefault('index_path', config.get('dedupe_index'))
+        return cls(config.get('collisions', 'rename'), **kwargs)
+
+    def _names(self, directory):
+        names = self._dirs.get(directory)
+        if names is None:
+            names = self._dirs[directory] = set()
+            if self.listing:
+                try:
+                    with os.scandir(directory) as it:
+                        for entry in it:
+                            names.add(_key(entry.name))
+                except OSError:
+                    pass
+        return names
+
+    def _taken(self, directory, name):
+        names = self._names(directory)
+        key = _key(name)
+        if key in names:
+            return True
+        if not self.listing and os.path.lexists(os.path.join(directory, name)):
+            names.add(key)
+            return True
+        return False
+
+    def _rename(self, directory, name, numbered=_numbered):
+        n = 1
+        while self._taken(directory, numbered(name, n)):
+            n += 1
+        return numbered(name, n)
+
+    def _keep_source(self, src, dest):
+        """newer / hash 策略：源文件是否应该替换目标（True），或留在原处（False）
+
+        目标不是普通文件或无法读取时返回 None，按 rename 处理。
+        """
+        try:
+            dest_st = os.stat(dest)
+            if not stat.S_ISREG(dest_st.st_mode):
+                return None
+            if self.policy == 'newer':
+                return os.stat(src).st_mtime_ns > dest_st.st_mtime_ns
+            return None if not same_content(src, dest, self.index_path) else False
+        except OSError:
+            return None
+
+    def resolve(self, moves):
+        """返回 (新计划, 因冲突留在原处的移动)"""
+        result = []
+        skipped = []
+        planned = {}    # (目标文件夹, 名称键) → 本批结果中的序号
+        for move in moves:
+            directory, name = os.path.split(move.dest)
+            if not self._taken(directory, name):
+                self._names(directory).add(_key(name))
+                planned[(directory, _key(name))] = len(result)
+                result.append(move)
+                continue
+            if self.policy == 'skip':
+                skipped.append(move)
+                continue
+            decision = None
+            if self.policy in ('newer', 'hash'):
+                index = planned.get((directory, _key(name)))
+                if index is None:
+                    decision = self._keep_source(move.src, move.dest)
+                else:
+                    # 与本批中另一个计划冲突：比较两个源文件
+                    other = result[index]
+                    decision = self._keep_source(move.src, other.src)
+                    if decision:
+                        skipped.append(other)
+                        result[index] = move._replace(dest=other.dest)
+                        continue
+            if decision is False:
+                skipped.append(move)
+            elif decision and self.policy == 'newer':
+                # 不覆盖：较旧的目标先改名留在原处，执行器等它移走后再放入源文件
+                aside = self._rename(directory, name, _replaced)
+                self._names(directory).add(_key(aside))
+                result.append(move._replace(src=move.dest, dest=os.path.join(directory, aside),
+                                            link=None, link_key=None))
+                planned[(directory, _key(name))] = len(result)
+                result.append(move)
+            else:
+                new_name = self._rename(directory, name)
+                self._names(directory).add(_key(new_name))
+                planned[(directory, _key(new_name))] = len(result)
+                result.append(move._replace(dest=os.path.join(directory, new_name)))
+        return result, skipped
@@ -0,0 +1,58 @@
+"""用户配置读写（~/.file_sorter_config.json）
+
+配置示例::
+
+    {
+        "language": "zh",
+        "theme": "auto",
+        "recursive": false,
+        "max_depth": 5,
+        "exclude": [".git", "node_modules"],
+        "follow_symlinks": false,
+        "watch_settle": 2.0,
+        "watch_interval": 1.0,
+        "watch_backend": "auto",
+        "watch_ignore": [".*", "*.part", "*.crdownload"],
+        "sniff": "unknown",
+        "sniff_workers": 8,
+        "dedupe": "hardlink",
+        "dedupe_workers": 4,
+        "collisions": "rename",
+        "stats_file": "/var/lib/node_exporter/textfile/file_organizer.prom",
+        "copy_workers": 4,
+        "device_workers": {"/mnt/archive": 8},
+        "pipeline_inflight": 32,
+        "mount_limits": {"/mnt/share": 16},
+        "rules": [
+            {"category": "备份", "suffix": [".tar.gz", ".tar.bz2"]},
+            {"category": "截图", "glob": "Screenshot*"},
+            {"category": "日志", "regex": "app-\\\\d+\\\\.log"},
+            {"category": "大文件", "min_size": 1073741824},
+            {"category": "旧文档", "suffix": ".pdf", "older_than_days": 365}
+        ]
+    }
+"""
+import json
+from pathlib import Path
+
+CONFIG_PATH = Path.home() / '.file_sorter_config.json'
+
+
+def load_config(path=None):
+    """读取配置，文件不存在或损坏时返回空字典"""
+    path = Path(path) if path else CONFIG_PATH
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return config if isinstance(config, dict) else {}
+
+
+def save_config(updates, path=None):
+    """合并保存配置，保留文件中未修改的其他键（如 rules）"""
+    path = Path(path) if path else CONFIG_PATH
+    config = load_config(path)
+    config.update(updates)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,226 @@
+"""分类时检测重复文件：大小 → 首尾块哈希 → 完整哈希，逐级过滤
+
+- 先按大小分组，只有大小相同的文件才可能重复，绝大多数文件不需要读取；
+- 大小相同的文件计算首尾各 BLOCK 字节的哈希，仍然相同的才读取整个文件；
+- 哈希在线程池中计算（hashlib 处理大块数据时释放 GIL，大缓冲读取同样可以并行）；
+- 哈希结果按文件元数据持久保存在 ~/.file_sorter_hash_index.json，重复运行几乎不需要再读文件。
+比较范围包括本次要分类的文件与分类文件夹中已有的文件。每组重复文件中保留已在分类文件夹中的，
+其次是修改时间最早的；其余按 action 处理：
+- skip：留在原处不移动；
+- hardlink：移动到分类文件夹后改为指向保留文件的硬链接，不再单独占用空间
+  （执行时确认链接到的正是检测时的保留文件才删除源文件，否则按普通移动处理；
+  移动日志记录这些硬链接，恢复时重新复制成独立的文件，需要再次占用相应的空间）；
+- move：移动到单独的"重复文件"文件夹。
+"""
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .cache import get_cache, metadata_key
+from .walker import Walker
+
+INDEX_PATH = Path.home() / '.file_sorter_hash_index.json'
+
+# 首尾块大小，不超过 2 * BLOCK 的文件首尾块哈希即完整哈希
+BLOCK = 64 * 1024
+
+# 完整哈希的读取缓冲区
+_BUFFER = 1024 * 1024
+
+ACTIONS = ('skip', 'hardlink', 'move')
+
+# action 为 move 时存放重复文件的文件夹名
+DUPLICATES_CATEGORY = {'zh': '重复文件', 'en': 'Duplicates'}
+
+
+def _partial_hash(path, size):
+    """文件首尾各 BLOCK 字节的哈希"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb', buffering=0) as f:
+        h.update(f.read(BLOCK))
+        if size > 2 * BLOCK:
+            f.seek(size - BLOCK)
+        h.update(f.read(BLOCK))
+    return h.hexdigest()
+
+
+def _full_hash(path):
+    """整个文件的哈希（大缓冲区、复用同一块内存）"""
+    h = hashlib.blake2b(digest_size=16)
+    buffer = bytearray(_BUFFER)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            h.update(view[:n])
+    return h.hexdigest()
+
+
+def _hashes(path, st, full, index):
+    """返回 (缓存键, [首尾块哈希, 完整哈希])，优先使用索引中的结果"""
+    key = metadata_key(st)
+    value = index.get(key) or [None, None]
+    if value[0] is None:
+        value = [_partial_hash(path, st.st_size), None]
+        if st.st_size <= 2 * BLOCK:
+            value[1] = value[0]
+    if full and value[1] is None:
+        value = [value[0], _full_hash(path)]
+    return key, value
+
+
+def same_content(a, b, index_path=None):
+    """逐级比较两个文件的内容是否相同（大小 → 首尾块哈希 → 完整哈希）"""
+    index = get_cache(index_path or INDEX_PATH)
+    sa = os.stat(a)
+    sb = os.stat(b)
+    if sa.st_size != sb.st_size:
+        return False
+    if (sa.st_dev, sa.st_ino) == (sb.st_dev, sb.st_ino):
+        return True
+    for slot, full in ((0, False), (1, True)):
+        key_a, value_a = _hashes(a, sa, full, index)
+        key_b, value_b = _hashes(b, sb, full, index)
+        index.set(key_a, value_a)
+        index.set(key_b, value_b)
+        if value_a[slot] != value_b[slot]:
+            return False
+    return True
+
+
+class Deduper:
+    """重复文件检测与处理"""
+
+    def __init__(self, action='skip', index_path=None, workers=4, language='zh'):
+        if action not in ACTIONS:
+            raise ValueError(f"dedupe action must be one of {', '.join(ACTIONS)}, not {action!r}")
+        self.action = action
+        # 值为 [首尾块哈希, 完整哈希或 None]
+        self.index = get_cache(index_path or INDEX_PATH)
+        self.workers = max(1, workers)
+        self.folder = DUPLICATES_CATEGORY.get(language, DUPLICATES_CATEGORY['zh'])
+
+    @classmethod
+    def from_config(cls, config, language='zh'):
+        """根据配置字典构建（dedupe、dedupe_index、dedupe_workers），未开启时返回 None"""
+        action = config.get('dedupe')
+        if not action:
+            return None
+        return cls('skip' if action is True else action, index_path=config.get('dedupe_index'),
+                   workers=config.get('dedupe_workers', 4), language=language)
+
+    # ---- 哈希 ----
+
+    def _hash(self, item, full):
+        """在工作线程中执行：返回 (缓存键, [首尾块哈希, 完整哈希])"""
+        path, st = item
+        return _hashes(path, st, full, self.index)
+
+    def _group(self, groups, pool, full):
+        """把每组文件按哈希再分组，只保留仍有多个成员且含待分类文件的组"""
+        items = [item for group in groups for item in group]
+        slot = 1 if full else 0
+        futures = [pool.submit(self._hash, (item[0], item[1]), full) for item in items]
+        buckets = {}
+        for item, future in zip(items, futures):
+            try:
+                key, value = future.result()
+            except OSError:
+                continue
+            self.index.set(key, value)
+            buckets.setdefault((item[1].st_size, value[slot]), []).append(item)
+        return [group for group in buckets.values()
+                if len(group) > 1 and any(not existing for _, _, existing in group)]
+
+    def find(self, files, existing=()):
+        """在 files（待分类的 FileEntry）与 existing（已分类的 FileEntry）中查找重复
+
+        返回 {重复文件路径: (保留文件路径, 保留文件的元数据键)}，只包含 files 中的文件。
+        """
+        by_size = {}
+        for entries, is_existing in ((files, False), (existing, True)):
+            for entry in entries:
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if st.st_size:
+                    by_size.setdefault(st.st_size, []).append((entry.path, st, is_existing))
+        groups = [group for group in by_size.values()
+                  if len(group) > 1 and any(not existing for _, _, existing in group)]
+        if not groups:
+            return {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='fo-hash') as pool:
+            groups = self._group(groups, pool, full=False)
+            # 首尾块已覆盖整个文件的组不需要再读
+            small = [group for group in groups if group[0][1].st_size <= 2 * BLOCK]
+            large = [group for group in groups if group[0][1].st_size > 2 * BLOCK]
+            groups = small + (self._group(large, pool, full=True) if large else [])
+        self.index.save()
+
+        duplicates = {}
+        for group in groups:
+            # 已分类的文件优先保留，其次是修改时间最早、文件名最短的
+            group.sort(key=lambda item: (not item[2], item[1].st_mtime_ns,
+                                         len(os.path.basename(item[0])), item[0]))
+            keep = (group[0][0], metadata_key(group[0][1]))
+            for path, _, is_existing in group[1:]:
+                if not is_existing:
+                    duplicates[path] = keep
+        return duplicates
+
+    # ---- 与分类计划结合 ----
+
+    def existing_files(self, root, categories):
+        """列举各分类文件夹中已有的文件"""
+        walker = Walker()
+        files = []
+        for category in categories:
+            path = os.path.join(root, category)
+            if os.path.isdir(path):
+                files.extend(walker.iter_files(path))
+        return files
+
+    def apply(self, root, moves, files, categories):
+        """按 action 改写分类计划，返回 (新计划, 重复文件列表)
+
+        重复文件列表中每一项为 Move(重复文件, 保留文件, 分类)。此时保留文件与硬链接的 link
+        都还是保留文件的当前路径，处理同名冲突之后用 link_targets() 换成最终路径。
+        """
+        root = os.fspath(root)
+        existing = self.existing_files(root, set(categories) - {self.folder})
+        duplicates = self.find(files, existing)
+        if not duplicates:
+            return moves, []
+        kept = []
+        linked = []
+        found = []
+        for move in moves:
+            original = duplicates.get(move.src)
+            if original is None:
+                kept.append(move)
+                continue
+            path, key = original
+            found.append(move._replace(dest=path))
+            if self.action == 'move':
+                kept.append(move._replace(dest=os.path.join(root, self.folder, os.path.basename(move.src)),
+                                          category=self.folder))
+            elif self.action == 'hardlink':
+                # 放在计划末尾，执行时保留文件已经移动到位
+                linked.append(move._replace(link=path, link_key=key))
+        return kept + linked, found
+
+    @staticmethod
+    def link_targets(moves, duplicates):
+        """把硬链接与重复文件列表中的保留文件换成其移动后的路径（已处理同名冲突的计划）
+
+        保留文件因冲突留在原处时不在计划中，仍指向原路径。
+        """
+        final = {move.src: move.dest for move in moves if move.link is None}
+        moves = [move._replace(link=final.get(move.link, move.link)) if move.link is not None
+                 else move for move in moves]
+        duplicates = [move._replace(dest=final.get(move.dest, move.dest)) for move in duplicates]
+        return moves, duplicates
@@ -0,0 +1,467 @@
+"""文件分类引擎：扫描 → 计划 → 执行
+
+本模块只依赖标准库，可在没有图形界面的服务器上直接导入，
+GUI（sort_files.py）与命令行（cli.py）都只是它的客户端。
+"""
+import heapq
+import os
+import time
+from collections import namedtuple
+
+from .classifier import OTHER_CATEGORY, Classifier
+from .collisions import CollisionResolver
+from .executor import MoveExecutor, break_link
+from .journal import Journal
+from .scanner import iter_files, scan
+from .stats import phase
+
+# 一次移动操作：源路径、目标路径、所属分类；
+# link 不为空时改为在目标位置创建指向 link 的硬链接并删除源文件（重复文件去重），
+# link_key 为去重时保留文件的元数据键（cache.metadata_key），链接到的文件与之不符时按普通移动处理
+Move = namedtuple('Move', ['src', 'dest', 'category', 'link', 'link_key'], defaults=(None, None))
+
+
+# 各语言的默认分类器（只含内置分类）
+_default_classifiers = {}
+
+
+def default_classifier(language='zh'):
+    """获取只包含内置分类的分类器"""
+    classifier = _default_classifiers.get(language)
+    if classifier is None:
+        classifier = Classifier(other=OTHER_CATEGORY.get(language, OTHER_CATEGORY['zh']))
+        _default_classifiers[language] = classifier
+    return classifier
+
+
+def get_category(file_path, language='zh', classifier=None):
+    """获取文件分类（file_path 可以是路径或 FileEntry）"""
+    return (classifier or default_classifier(language)).classify(file_path)
+
+
+def plan_sort(root, files, language='zh', classifier=None):
+    """根据扫描结果（快照或 FileEntry 列表）生成分类计划
+
+    子文件夹中的文件（递归模式）保留相对路径：a/b/x.jpg → 图片/a/b/x.jpg。
+    """
+    root = os.fspath(root)
+    classifier = classifier or default_classifier(language)
+    classify = classifier.classify
+    join = os.path.join
+    dirname = os.path.dirname
+    relpath = os.path.relpath
+    moves = []
+    for file in classifier.prefetch(files):
+        category = classify(file)
+        parent = dirname(file.path)
+        rel = os.curdir if parent == root else relpath(parent, root)
+        if rel == os.curdir:
+            dest = join(root, category, file.name)
+        else:
+            dest = join(root, category, rel, file.name)
+        moves.append(Move(file.path, dest, category))
+    return moves
+
+
+def plan_restore(root, snapshot=None, walker=None):
+    """生成恢复计划：把各子文件夹中的文件移回主文件夹
+
+    默认只处理一层子文件夹；传入 walker 时递归处理所有层级。
+    """
+    root = os.fspath(root)
+    join = os.path.join
+    moves = []
+    if walker is not None:
+        if snapshot is None:
+            snapshot = walker.walk(root)
+        for file in snapshot:
+            rel = os.path.relpath(os.path.dirname(file.path), root)
+            if rel != os.curdir:
+                moves.append(Move(file.path, join(root, file.name), rel.split(os.sep)[0]))
+        return moves
+    if snapshot is None:
+        snapshot = scan(root)
+    for name, path in snapshot.dirs:
+        for file in scan(path):
+            moves.append(Move(file.path, join(root, file.name), name))
+    return moves
+
+
+def execute(moves, progress=None, on_done=None, executor=None, stats=None):
+    """执行移动计划
+
+    progress(已完成, 总数) 用于汇报进度；on_done(序号) 在每个文件移动完成后调用，
+    用于写入移动日志；stats（stats.Stats）记录操作次数与每个文件的延迟。
+    跨设备复制与并发控制见 executor.MoveExecutor。
+    """
+    with phase(stats, 'execute'):
+        return (executor or MoveExecutor()).run(moves, progress, on_done, stats=stats)
+
+
+def _execute_run(journal, run_id, items, progress=None, executor=None, stats=None):
+    """执行日志中的一次运行，items 为 [(序号, Move)]"""
+    moves = [move for _, move in items]
+    indices = [i for i, _ in items]
+    moved = execute(moves, progress, on_done=lambda k: journal.done(run_id, indices[k]),
+                    executor=executor, stats=stats)
+    journal.end(run_id)
+    return moved
+
+
+def _break_links(paths, stats=None):
+    """撤销硬链接去重后，把恢复到原位置的文件换成独立的副本（见 executor.break_link）
+
+    复制失败（如空间不足）时文件仍是硬链接，内容不会丢失，不影响撤销本身。
+    """
+    with phase(stats, 'cleanup'):
+        for path in paths:
+            try:
+                if break_link(path) and stats is not None:
+                    stats.count('copy')
+            except OSError:
+                continue
+
+
+def _linked_originals(runs):
+    """这些运行中以硬链接去重的文件的原位置"""
+    return {src for run in runs for src in run.linked()}
+
+
+def remove_dirs_if_empty(paths, stop=None):
+    """删除给定的空目录（由深到浅），非空或不存在时忽略
+
+    传入 stop 时继续向上删除变空的父目录，直到 stop（不含）为止。
+    """
+    paths = set(paths)
+    if stop is not None:
+        stop = os.fspath(stop)
+        for path in list(paths):
+            parent = os.path.dirname(path)
+            while parent.startswith(stop + os.sep) and parent not in paths:
+                paths.add(parent)
+                parent = os.path.dirname(parent)
+        paths.discard(stop)
+    for path in sorted(paths, key=len, reverse=True):
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass
+
+
+def _same_file(a, b):
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+def resume(root, progress=None, journal=None, executor=None, stats=None):
+    """续做上次中断的运行，只处理日志中未完成的条目，不重新扫描目录
+
+    中断之后目标位置被其他文件占用的条目不再移动，文件留在原处（计入 conflicts），
+    下次分类时按冲突策略重新规划。没有中断的运行时返回 None。
+    """
+    journal = journal or Journal(root)
+    with phase(stats, 'journal'):
+        run = journal.interrupted()
+    if run is None:
+        return None
+    items = []
+    skipped = 0
+    conflicts = 0
+    vacating = set()    # 续做的移动的源路径：newer 策略中先移开的旧文件位置不算占用
+    try:
+        for i, (src, dest, category) in run.pending():
+            if os.path.lexists(src):
+                if dest in vacating or not os.path.lexists(dest):
+                    vacating.add(src)
+                    items.append((i, Move(src, dest, category)))
+                elif _same_file(src, dest):
+                    # 不覆盖的重命名（link + unlink）或去重硬链接在删除源文件前中断
+                    os.unlink(src)
+                    journal.done(run.id, i)
+                else:
+                    journal.skip(run.id, i, 'exists')
+                    conflicts += 1
+            elif os.path.lexists(dest):
+                # 已移动但完成记录在崩溃前未落盘
+                journal.done(run.id, i)
+            else:
+                journal.skip(run.id, i, 'missing')
+                skipped += 1
+        linked = set()
+        if run.kind == 'undo':
+            linked = _linked_originals(r for r in journal.runs() if r.id in run.undoes)
+        try:
+            moved = _execute_run(journal, run.id, items, progress, executor, stats)
+        finally:
+            if linked:
+                _break_links([move.dest for _, move in items if move.dest in linked], stats)
+        if run.kind == 'undo':
+            remove_dirs_if_empty((os.path.dirname(src) for src, _, _ in run.moves.values()),
+                                  stop=root)
+    finally:
+        journal.close()
+    return {'folder': str(root), 'kind': run.kind, 'total': len(items),
+            'moved': moved, 'skipped': skipped, 'conflicts': conflicts}
+
+
+def remove_empty_dirs(root, snapshot=None):
+    """删除主文件夹下的空子文件夹（递归快照中由深到浅删除）"""
+    if snapshot is None:
+        snapshot = scan(root)
+    remove_dirs_if_empty(path for _, path in snapshot.dirs)
+
+
+class PreviewStats:
+    """预览统计：每个分类只保留数量、总大小和最大的 sample 个文件，内存占用恒定"""
+
+    def __init__(self, sample=5):
+        self.sample = sample
+        self.total = 0
+        self.total_size = 0
+        self.categories = {}  # 分类 → [数量, 总大小, 最小堆[(大小, 名称)]]
+
+    def add(self, category, name, size):
+        stats = self.categories.get(category)
+        if stats is None:
+            stats = self.categories[category] = [0, 0, []]
+        stats[0] += 1
+        stats[1] += size
+        self.total += 1
+        self.total_size += size
+        heap = stats[2]
+        if len(heap) < self.sample:
+            heapq.heappush(heap, (size, name))
+        elif heap and size > heap[0][0]:
+            heapq.heapreplace(heap, (size, name))
+
+    def to_dict(self, root, done=True):
+        """生成结果字典（新对象，可安全交给其他线程）"""
+        categories = {}
+        for category, (count, size, heap) in self.categories.items():
+            categories[category] = {'count': count, 'size': size,
+                                    'files': [name for _, name in sorted(heap, reverse=True)]}
+        return {'folder': str(root), 'total': self.total, 'size': self.total_size,
+                'categories': categories, 'done': done}
+
+
+def iter_preview(root, language='zh', sample=5, snapshot=None, classifier=None, interval=0.1,
+                 walker=None):
+    """流式预览：边扫描边统计，每隔 interval 秒产出一次中间结果，最后产出完整结果
+
+    传入 walker 时递归统计所有子文件夹（已有的分类文件夹除外）。
+    """
+    classifier = classifier or default_classifier(language)
+    classify = classifier.classify
+    if snapshot is not None:
+        files = snapshot
+    elif walker is not None:
+        files = walker.iter_files(root, skip_top=classifier.categories)
+    else:
+        files = iter_files(root)
+    stats = PreviewStats(sample)
+    deadline = time.monotonic() + interval
+    for count, file in enumerate(classifier.prefetch(files), 1):
+        try:
+            size = file.size
+        except OSError:
+            size = 0
+        stats.add(classify(file), file.name, size)
+        if count % 256 == 0 and time.monotonic() >= deadline:
+            yield stats.to_dict(root, done=False)
+            deadline = time.monotonic() + interval
+    classifier.save()
+    yield stats.to_dict(root)
+
+
+def preview(root, language='zh', sample=5, snapshot=None, classifier=None, walker=None):
+    """预览分类结果，每个分类保留最大的 sample 个文件名"""
+    for result in iter_preview(root, language, sample, snapshot, classifier,
+                               interval=float('inf'), walker=walker):
+        pass
+    return result
+
+
+def _scan(root, walker=None, skip_top=(), stats=None):
+    """单层或递归扫描，记录扫描耗时与列举的目录数、文件数"""
+    with phase(stats, 'scan'):
+        snapshot = walker.walk(root, skip_top=skip_top) if walker is not None else scan(root)
+    if stats is not None:
+        stats.count('scandir', 1 + len(snapshot.dirs) if walker is not None else 1)
+        stats.count('files_listed', len(snapshot))
+    return snapshot
+
+
+def _scan_for_sort(root, classifier, walker, deduper=None, stats=None):
+    """分类前的扫描；递归模式下跳过已有的分类文件夹"""
+    if walker is None:
+        return _scan(root, stats=stats)
+    skip = set(classifier.categories)
+    if deduper is not None:
+        skip.add(deduper.folder)
+    return _scan(root, walker, skip, stats)
+
+
+def _plan_sort_folder(root, language, classifier, walker, deduper, resolver, stats=None):
+    """扫描并生成分类计划：去重 → 处理同名冲突，返回 (计划, 重复文件, 因冲突跳过的移动)"""
+    snapshot = _scan_for_sort(root, classifier, walker, deduper, stats)
+    with phase(stats, 'classify'):
+        moves = plan_sort(root, snapshot, language, classifier)
+        classifier.save()
+    duplicates = []
+    if deduper is not None:
+        with phase(stats, 'dedupe'):
+            moves, duplicates = deduper.apply(root, moves, snapshot, classifier.categories)
+    with phase(stats, 'collisions'):
+        moves, skipped = (resolver or CollisionResolver()).resolve(moves)
+    if duplicates:
+        # 保留文件的目标路径可能因冲突改名，处理冲突之后才能确定硬链接指向哪里
+        moves, duplicates = deduper.link_targets(moves, duplicates)
+    return moves, duplicates, skipped
+
+
+def _remove_emptied_sources(root, moves, stats=None):
+    """递归分类后删除被移空的源子文件夹"""
+    root = os.fspath(root)
+    with phase(stats, 'cleanup'):
+        remove_dirs_if_empty((os.path.dirname(move.src) for move in moves
+                               if os.path.dirname(move.src) != root), stop=root)
+
+
+def sort_folder(root, language='zh', dry_run=False, progress=None, classifier=None,
+                use_journal=True, executor=None, walker=None, deduper=None, resolver=None,
+                stats=None):
+    """分类整理文件夹，返回结果摘要
+
+    use_journal 为真时先续做中断的运行，再把本次计划写入移动日志；
+    传入 walker 时递归整理所有子文件夹中的文件；传入 deduper 时检测并处理重复文件；
+    同名冲突按 resolver（默认 CollisionResolver()，即改名）处理；
+    传入 stats 时记录各阶段耗时与操作次数。
+    progress 抛出的异常（如 progress.Cancelled）会中止执行，日志中的剩余条目由下次运行续做。
+    """
+    classifier = classifier or default_classifier(language)
+    if dry_run or not use_journal:
+        moves, duplicates, skipped = _plan_sort_folder(root, language, classifier, walker,
+                                                       deduper, resolver, stats)
+        moved = 0
+        if not dry_run:
+            moved = execute(moves, progress, executor=executor, stats=stats)
+            if walker is not None:
+                _remove_emptied_sources(root, moves, stats)
+        return {'folder': str(root), 'total': len(moves), 'moved': moved, 'dry_run': dry_run,
+                'moves': moves, 'duplicates': duplicates, 'skipped': skipped}
+
+    journal = Journal(root)
+    resumed = resume(root, progress, journal, executor, stats)
+    moves, duplicates, skipped = _plan_sort_folder(root, language, classifier, walker,
+                                                   deduper, resolver, stats)
+    moved = 0
+    try:
+        if moves:
+            if progress:
+                # 扫描期间已取消时不写入日志，避免下次续做一次没有开始的运行
+                progress(0, len(moves))
+            with phase(stats, 'journal'):
+                run_id = journal.begin('sort', moves)
+            moved = _execute_run(journal, run_id, list(enumerate(moves)), progress, executor,
+                                 stats)
+            if walker is not None:
+                _remove_emptied_sources(root, moves, stats)
+    finally:
+        journal.close()
+    return {'folder': str(root), 'total': len(moves), 'moved': moved, 'dry_run': False,
+            'moves': moves, 'duplicates': duplicates, 'skipped': skipped, 'resumed': resumed}
+
+
+def plan_undo(journal, runs=None):
+    """根据移动日志生成撤销计划，返回 (运行 ID, 计划, 跳过的移动, 丢失的条目)
+
+    计划为 [((运行 ID, 序号), 移动)]，记录每条移动撤销的是哪一条。原位置已被占用而跳过的
+    移动仍然可以撤销，下次恢复时重试；文件已不在分类后位置的条目以 [(运行 ID, 序号)] 返回，
+    写入日志后不再尝试。
+    runs 为 journal.undoable() 的结果，已经读取过时可以传入，避免再解析一次日志。
+    """
+    if runs is None:
+        runs = journal.undoable()
+    moves = []
+    skipped = []
+    lost = []
+    # 多次运行可能移动过同一路径：前面的撤销已移走的文件视为丢失，已占用的原位置视为冲突
+    vacated = set()
+    claimed = set()
+    for run in runs:
+        for i, (src, dest, category) in reversed(run.remaining()):
+            move = Move(dest, src, category)
+            if dest in vacated or not os.path.lexists(dest):
+                lost.append((run.id, i))
+            elif src in claimed or (src not in vacated and os.path.lexists(src)):
+                # 原位置已有同名文件，不覆盖（前面的撤销会移走的文件除外，如 newer 策略替换的旧文件）
+                skipped.append(move)
+            else:
+                vacated.add(dest)
+                claimed.add(src)
+                moves.append(((run.id, i), move))
+    return [run.id for run in runs], moves, skipped, lost
+
+
+def restore_folder(root, dry_run=False, progress=None, use_journal=True, executor=None,
+                   walker=None, resolver=None, stats=None):
+    """恢复文件夹，返回结果摘要
+
+    文件夹有移动日志时按日志逆序撤销所有分类，只移动分类时移动过的文件，以硬链接去重的文件
+    恢复后复制成独立的文件；原位置已被占用的文件留在分类文件夹中（skipped），日志保留它们，
+    腾出原位置后再次恢复即可；lost 为已不在分类后位置、无法恢复的文件数。
+    没有日志（旧版本整理过的文件夹）时把各子文件夹中的文件移回主文件夹，
+    同名冲突按 resolver 处理，传入 walker 时递归处理所有层级。
+    """
+    journal = Journal(root)
+    if not use_journal or not journal.exists():
+        snapshot = _scan(root, walker, stats=stats)
+        with phase(stats, 'plan'):
+            moves = plan_restore(root, snapshot, walker)
+        if stats is not None and walker is None:
+            # plan_restore 逐个列举一层子文件夹
+            stats.count('scandir', len(snapshot.dirs))
+        with phase(stats, 'collisions'):
+            moves, skipped = (resolver or CollisionResolver()).resolve(moves)
+        moved = 0
+        if not dry_run:
+            moved = execute(moves, progress, executor=executor, stats=stats)
+            with phase(stats, 'cleanup'):
+                remove_empty_dirs(root, snapshot)
+        return {'folder': str(root), 'total': len(moves), 'moved': moved,
+                'dry_run': dry_run, 'moves': moves, 'skipped': skipped}
+
+    resumed = None if dry_run else resume(root, progress, journal, executor, stats)
+    with phase(stats, 'plan'):
+        runs = journal.undoable()
+        run_ids, items, skipped, lost = plan_undo(journal, runs)
+        moves = [move for _, move in items]
+    moved = 0
+    if not dry_run:
+        try:
+            if run_ids:
+                if progress:
+                    progress(0, len(moves))
+                with phase(stats, 'journal'):
+                    run_id = journal.begin('undo', moves, undoes=run_ids,
+                                           origins=[origin for origin, _ in items])
+                    journal.lost(run_id, lost)
+                linked = _linked_originals(runs)
+                try:
+                    moved = _execute_run(journal, run_id, list(enumerate(moves)), progress,
+                                         executor, stats)
+                finally:
+                    if linked:
+                        # 硬链接去重的文件恢复后不再与保留文件共用内容
+                        _break_links([move.dest for move in moves if move.dest in linked], stats)
+                with phase(stats, 'cleanup'):
+                    remove_dirs_if_empty((os.path.dirname(move.src) for move in moves + skipped),
+                                          stop=root)
+            if not journal.undoable():
+                journal.clear()
+        finally:
+            journal.close()
+    return {'folder': str(root), 'total': len(moves), 'moved': moved, 'dry_run': dry_run,
+            'moves': moves, 'skipped': skipped, 'lost': len(lost), 'resumed': resumed}
@@ -0,0 +1,383 @@
+"""移动执行器
+
+- 每个目标目录只创建一次；
+- 按源/目标所在设备（st_dev，按目录缓存）判断 os.rename 能否直接完成，
+  同设备的移动在当前线程中直接重命名；
+- 跨设备的移动交给线程池，使用 os.copy_file_range / os.sendfile 在内核中复制，
+  大文件拆成多个区块并行复制，复制完成后再原子替换到目标位置并删除源文件；
+- 每个目标设备的并发数可以单独配置；
+- 从不覆盖已有文件：目标已存在时抛出 FileExistsError（见 rename_noreplace）；
+- 带 link 的移动（重复文件）改为创建硬链接，链接到的不是去重时检测的保留文件（link_key 不符）
+  或无法创建时按普通移动处理。
+目标路径是排队中复制的源路径时（newer 策略先把旧文件改名移开），等待该复制完成后再移动。
+进度回调与完成回调始终在调用 run() 的线程中执行，移动日志无需加锁；
+进度回调抛出异常（如取消时的 Cancelled）或移动出错后不再开始新的移动。
+传入 stats（见 stats.py）时记录各类操作次数、复制字节数与每个文件的移动延迟。
+"""
+import errno
+import os
+import queue
+import shutil
+import stat
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import metadata_key
+
+_MiB = 1024 * 1024
+
+# copy_file_range / sendfile 不支持时回退到普通读写的错误码
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                    getattr(errno, 'ENOTSUP', errno.EOPNOTSUPP), errno.EBADF}
+
+# 文件系统不支持（或不允许）硬链接时的错误码
+_NOLINK_ERRNOS = {errno.EPERM, errno.EMLINK, errno.ENOSYS, errno.EOPNOTSUPP,
+                  getattr(errno, 'ENOTSUP', errno.EOPNOTSUPP)}
+
+
+def _exists_error(path):
+    return FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), path)
+
+
+def rename_noreplace(src, dest):
+    """不覆盖已有文件的重命名，目标已存在时抛出 FileExistsError，跨设备时抛出 EXDEV
+
+    POSIX 的 rename 会静默覆盖目标，这里改用 link + unlink（目标已存在时 link 失败）；
+    文件系统不支持硬链接时退回到先检查目标再重命名。Windows 的 rename 本身不覆盖。
+    两步之间中断时源与目标是同一个文件的两个链接，续做时会删除源文件（见 engine.resume）。
+    """
+    if os.name == 'nt':
+        os.rename(src, dest)
+        return
+    try:
+        os.link(src, dest, follow_symlinks=False)
+    except (OSError, NotImplementedError) as e:
+        if isinstance(e, OSError) and e.errno not in _NOLINK_ERRNOS:
+            raise
+        if os.path.lexists(dest):
+            raise _exists_error(dest) from None
+        os.rename(src, dest)
+        return
+    os.unlink(src)
+
+
+def break_link(path):
+    """path 与其他文件共用 inode（硬链接）时换成内容相同的独立文件，返回是否复制过
+
+    撤销硬链接去重时使用：恢复到原位置的文件不应再与其他文件共用内容，
+    否则修改其中一个会同时改变另一个。这是唯一有意替换已有文件的地方（替换的是同一份内容）。
+    """
+    st = os.lstat(path)
+    if not stat.S_ISREG(st.st_mode) or st.st_nlink < 2:
+        return False
+    directory, name = os.path.split(path)
+    tmp = os.path.join(directory, f".{name}.fo-partial")
+    try:
+        shutil.copy2(path, tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return True
+
+
+def move_noreplace(src, dest):
+    """shutil.move 的不覆盖版本（rename 不可用时的回退），目标已存在时抛出 FileExistsError"""
+    if os.path.lexists(dest):
+        raise _exists_error(dest)
+    shutil.move(src, dest)
+
+
+def _copy_range(src_fd, dst_fd, offset, length):
+    """在内核中复制 [offset, offset + length) 区间，不支持时回退到 pread/pwrite"""
+    pos = offset
+    end = offset + length
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while pos < end:
+                n = os.copy_file_range(src_fd, dst_fd, min(end - pos, 1 << 30), pos, pos)
+                if n == 0:
+                    break
+                pos += n
+            if pos >= end:
+                return
+        except OSError as e:
+            if e.errno not in _FALLBACK_ERRNOS:
+                raise
+    if hasattr(os, 'sendfile'):
+        try:
+            os.lseek(dst_fd, pos, os.SEEK_SET)
+            while pos < end:
+                n = os.sendfile(dst_fd, src_fd, pos, min(end - pos, 1 << 30))
+                if n == 0:
+                    break
+                pos += n
+            if pos >= end:
+                return
+        except OSError as e:
+            if e.errno not in _FALLBACK_ERRNOS:
+                raise
+    while pos < end:
+        data = os.pread(src_fd, min(end - pos, _MiB), pos)
+        if not data:
+            break
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(dst_fd, view, pos)
+            view = view[written:]
+            pos += written
+
+
+def linked_to(path, key):
+    """path 是否就是元数据键为 key 的文件（key 为空时无法确认，返回 False）"""
+    if key is None:
+        return False
+    try:
+        return metadata_key(os.stat(path)) == key
+    except OSError:
+        return False
+
+
+class MoveExecutor:
+    """执行移动计划，跨设备复制并行进行"""
+
+    def __init__(self, workers=4, device_workers=None, chunk_size=64 * _MiB,
+                 parallel_threshold=256 * _MiB):
+        self.workers = max(1, workers)
+        # 设备号 → 并发数；配置中以挂载路径给出，这里统一转换成 st_dev
+        self.device_workers = {}
+        for path, count in (device_workers or {}).items():
+            try:
+                self.device_workers[os.stat(path).st_dev] = max(1, int(count))
+            except (OSError, ValueError):
+                continue
+        self.chunk_size = chunk_size
+        self.parallel_threshold = parallel_threshold
+        self._dir_devices = {}
+        self._created = set()
+        self._stats = None
+
+    @classmethod
+    def from_config(cls, config):
+        """根据配置字典构建执行器（copy_workers、device_workers）"""
+        return cls(workers=config.get('copy_workers', 4),
+                   device_workers=config.get('device_workers'))
+
+    def _device(self, directory):
+        """目录所在设备号（按目录缓存）"""
+        dev = self._dir_devices.get(directory)
+        if dev is None:
+            dev = self._dir_devices[directory] = os.stat(directory).st_dev
+            if self._stats is not None:
+                self._stats.count('stat')
+        return dev
+
+    def _ensure_dir(self, directory):
+        if directory not in self._created:
+            os.makedirs(directory, exist_ok=True)
+            self._created.add(directory)
+            if self._stats is not None:
+                self._stats.count('mkdir')
+
+    def _limit(self, dev):
+        return self.device_workers.get(dev, self.workers)
+
+    # ---- 跨设备复制 ----
+
+    def _copy_file(self, src, dest, chunk_pool):
+        """复制到目标目录中的临时文件，完成后重命名到目标位置（不覆盖）并删除源文件"""
+        st = os.lstat(src)
+        if not hasattr(os, 'pread') or os.path.islink(src):
+            # 符号链接或不支持定位读写的平台交给 shutil
+            move_noreplace(src, dest)
+            if self._stats is not None:
+                self._stats.count('move')
+            return st.st_size
+        directory, name = os.path.split(dest)
+        tmp = os.path.join(directory, f".{name}.fo-partial")
+        size = st.st_size
+        src_fd = os.open(src, os.O_RDONLY)
+        try:
+            dst_fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            try:
+                if size >= self.parallel_threshold and chunk_pool is not None:
+                    os.ftruncate(dst_fd, size)
+                    chunks = [(offset, min(self.chunk_size, size - offset))
+                              for offset in range(0, size, self.chunk_size)]
+                    futures = [chunk_pool.submit(self._copy_chunk, src, tmp, offset, length)
+                               for offset, length in chunks]
+                    for future in futures:
+                        future.result()
+                else:
+                    _copy_range(src_fd, dst_fd, 0, size)
+            finally:
+                os.close(dst_fd)
+            shutil.copystat(src, tmp)
+            rename_noreplace(tmp, dest)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        finally:
+            os.close(src_fd)
+        os.unlink(src)
+        if self._stats is not None:
+            self._stats.count('copy')
+            self._stats.copied(size)
+        return size
+
+    @staticmethod
+    def _copy_chunk(src, tmp, offset, length):
+        """并行复制大文件的一个区块（每个区块使用独立的文件描述符）"""
+        src_fd = os.open(src, os.O_RDONLY)
+        try:
+            dst_fd = os.open(tmp, os.O_WRONLY)
+            try:
+                _copy_range(src_fd, dst_fd, offset, length)
+            finally:
+                os.close(dst_fd)
+        finally:
+            os.close(src_fd)
+
+    def _link(self, move):
+        """用指向保留文件的硬链接代替移动，失败（跨设备、不支持硬链接等）时返回 False
+
+        链接创建后确认其元数据与去重时的保留文件一致（同一 inode、大小与 mtime）才删除源文件，
+        否则删除刚创建的链接，按普通移动处理。
+        """
+        try:
+            os.link(move.link, move.dest)
+        except OSError:
+            return False
+        if not linked_to(move.dest, move.link_key):
+            os.unlink(move.dest)
+            return False
+        os.unlink(move.src)
+        if self._stats is not None:
+            self._stats.count('link')
+        return True
+
+    # ---- 调度 ----
+
+    def run(self, moves, progress=None, on_done=None, stats=None):
+        """执行移动计划，返回成功移动的文件数；出错时等待进行中的复制结束后抛出第一个异常"""
+        total = len(moves)
+        done = 0
+        error = None
+        # 目录可能在两次运行之间被删除，缓存只在一次运行内有效
+        self._dir_devices.clear()
+        self._created.clear()
+        self._stats = stats
+        clock = time.perf_counter
+        if progress:
+            progress(0, total)
+
+        results = queue.SimpleQueue()
+        pending = {}    # 设备号 → deque[(序号, Move, 开始时间)]
+        inflight = {}   # 设备号 → 进行中的复制数
+        copying = {}    # 排队或进行中的复制的序号 → 源路径
+        vacating = set()    # 这些复制的源路径，复制完成后才会空出来
+        outstanding = 0
+
+        def finish(i, start=None):
+            nonlocal done, error
+            done += 1
+            if start is not None:
+                stats.latency(clock() - start)
+            if on_done:
+                on_done(i)
+            if progress:
+                try:
+                    progress(done, total)
+                except BaseException as e:
+                    error = error or e
+
+        pool_size = self.workers + sum(self.device_workers.values())
+        with ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='fo-copy') as pool, \
+                ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='fo-chunk') as chunk_pool:
+
+            def dispatch(dev):
+                nonlocal outstanding
+                queue_ = pending.get(dev)
+                while queue_ and inflight.get(dev, 0) < self._limit(dev):
+                    i, move, start = queue_.popleft()
+                    inflight[dev] = inflight.get(dev, 0) + 1
+                    outstanding += 1
+                    future = pool.submit(self._copy_file, move.src, move.dest, chunk_pool)
+                    future.add_done_callback(
+                        lambda f, i=i, dev=dev, start=start: results.put((i, dev, start, f)))
+
+            def collect(block):
+                nonlocal outstanding, error
+                while outstanding:
+                    try:
+                        i, dev, start, future = results.get(block=block)
+                    except queue.Empty:
+                        return
+                    outstanding -= 1
+                    inflight[dev] -= 1
+                    vacating.discard(copying.pop(i))
+                    exc = future.exception()
+                    if exc is not None:
+                        error = error or exc
+                    else:
+                        finish(i, start)
+                    if error is None:
+                        dispatch(dev)
+
+            try:
+                for i, move in enumerate(moves):
+                    if error is not None:
+                        break
+                    # 从这里开始计算单个文件的延迟（跨设备复制包含排队时间）
+                    start = clock() if stats is not None else None
+                    if move.dest in vacating:
+                        # 依赖的复制完成后目标才空出来
+                        collect(block=True)
+                        if error is not None:
+                            break
+                    directory = os.path.dirname(move.dest)
+                    self._ensure_dir(directory)
+                    if move.link is not None and self._link(move):
+                        finish(i, start)
+                        collect(block=False)
+                        continue
+                    dest_dev = self._device(directory)
+                    if self._device(os.path.dirname(move.src)) == dest_dev:
+                        try:
+                            rename_noreplace(move.src, move.dest)
+                        except FileExistsError:
+                            raise
+                        except OSError as e:
+                            if e.errno != errno.EXDEV:
+                                move_noreplace(move.src, move.dest)
+                                if stats is not None:
+                                    stats.count('move')
+                                finish(i, start)
+                                collect(block=False)
+                                continue
+                        else:
+                            if stats is not None:
+                                stats.count('rename')
+                            finish(i, start)
+                            collect(block=False)
+                            continue
+                    pending.setdefault(dest_dev, deque()).append((i, move, start))
+                    copying[i] = move.src
+                    vacating.add(move.src)
+                    dispatch(dest_dev)
+                    collect(block=False)
+            except BaseException as e:
+                error = e
+            collect(block=True)
+        self._stats = None
+
+        if error is not None:
+            raise error
+        return done
@@ -0,0 +1,209 @@
+"""移动日志：每次分类都追加写入一份 NDJSON 日志，用于精确恢复与断点续做
+
+日志保存在被整理文件夹内的隐藏文件中，路径均相对于该文件夹记录，每行一条：
+
+    {"t": "begin", "run": ID, "kind": "sort"|"undo", "undoes": [ID...], "time": ...}
+    {"t": "move", "run": ID, "i": 序号, "src": 源, "dest": 目标, "category": 分类[, "link": true]
+     [, "of": [运行 ID, 序号]]}
+    {"t": "done", "run": ID, "i": 序号}
+    {"t": "skip", "run": ID, "i": 序号, "reason": 原因}
+    {"t": "lost", "run": ID, "of": [运行 ID, 序号]}
+    {"t": "end", "run": ID}
+
+link 表示该移动以硬链接去重（目标与保留文件共用 inode），撤销时需要重新复制成独立文件。
+撤销运行的每条移动用 of 记录它撤销的是哪次分类的哪一条，完成后那一条才算撤销；
+lost 表示撤销时文件已不在分类后的位置（被删除或移走），不必再撤销。
+原位置被占用而跳过的条目仍可撤销，下次恢复时重试，日志在所有条目都撤销后才清空。
+计划在执行前一次写入并 fsync；完成记录按批 fsync。崩溃后丢失的少量
+完成记录在续做时通过检查源/目标是否存在来核对，不需要重新扫描目录。
+"""
+import json
+import os
+import time
+import uuid
+
+JOURNAL_NAME = '.file_organizer_journal.ndjson'
+
+
+class Run:
+    """日志中的一次运行"""
+
+    def __init__(self, run_id, kind, undoes=()):
+        self.id = run_id
+        self.kind = kind
+        self.undoes = list(undoes)
+        self.moves = {}     # 序号 → (源, 目标, 分类)，绝对路径
+        self.done = set()
+        self.skipped = set()
+        self.links = set()  # 以硬链接去重的移动的序号
+        self.origins = {}   # 撤销运行：序号 → 撤销的 (运行 ID, 序号)
+        self.lost = []      # 撤销运行：文件已不存在、不必再撤销的 (运行 ID, 序号)
+        self.undone = set()  # 分类运行：已撤销（或不必撤销）的序号，由 Journal.undoable() 填写
+        self.ended = False
+
+    def pending(self):
+        """尚未完成的移动（按序号排列）"""
+        return [(i, self.moves[i]) for i in sorted(self.moves)
+                if i not in self.done and i not in self.skipped]
+
+    def remaining(self):
+        """已完成但尚未撤销的移动 [(序号, (源, 目标, 分类))]（按序号排列）"""
+        return [(i, self.moves[i]) for i in sorted(self.done) if i not in self.undone]
+
+    def linked(self):
+        """以硬链接去重的移动的原位置（源路径）"""
+        return [self.moves[i][0] for i in sorted(self.links) if i in self.moves]
+
+
+class Journal:
+    """某个文件夹的移动日志"""
+
+    def __init__(self, root, sync_every=256, sync_interval=1.0):
+        self.root = os.fspath(root)
+        self.path = os.path.join(self.root, JOURNAL_NAME)
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = 0.0
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    # ---- 写入 ----
+
+    def _write(self, record, sync=False):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._unsynced += 1
+        if (sync or self._unsynced >= self.sync_every
+                or time.monotonic() - self._last_sync >= self.sync_interval):
+            self.sync()
+
+    def sync(self):
+        """把缓冲区写入磁盘"""
+        if self._file is not None and self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        self.sync()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _rel(self, path):
+        return os.path.relpath(path, self.root)
+
+    def begin(self, kind, moves, undoes=(), origins=None):
+        """记录一次运行的完整计划，返回运行 ID
+
+        撤销运行传入 origins：与 moves 一一对应的 (运行 ID, 序号)，即每条移动撤销的条目。
+        """
+        run_id = uuid.uuid4().hex[:12]
+        self._write({'t': 'begin', 'run': run_id, 'kind': kind,
+                     'undoes': list(undoes), 'time': time.time()})
+        self.plan(run_id, 0, moves, origins)
+        return run_id
+
+    def plan(self, run_id, start, moves, origins=None):
+        """追加一批计划记录（序号从 start 开始）并落盘，流水线模式边扫描边记录"""
+        for i, move in enumerate(moves, start):
+            record = {'t': 'move', 'run': run_id, 'i': i, 'src': self._rel(move[0]),
+                      'dest': self._rel(move[1]), 'category': move[2]}
+            if len(move) > 3 and move[3] is not None:
+                record['link'] = True
+            if origins is not None:
+                record['of'] = list(origins[i - start])
+            self._write(record)
+        self.sync()
+
+    def done(self, run_id, i):
+        self._write({'t': 'done', 'run': run_id, 'i': i})
+
+    def skip(self, run_id, i, reason):
+        self._write({'t': 'skip', 'run': run_id, 'i': i, 'reason': reason})
+
+    def lost(self, run_id, origins):
+        """记录撤销时已不在分类后位置的条目 [(运行 ID, 序号)]"""
+        for origin in origins:
+            self._write({'t': 'lost', 'run': run_id, 'of': list(origin)})
+
+    def end(self, run_id):
+        self._write({'t': 'end', 'run': run_id}, sync=True)
+
+    def clear(self):
+        """所有运行都已撤销时清空日志（保留空文件，表示该文件夹由日志管理）"""
+        self.close()
+        with open(self.path, 'w', encoding='utf-8'):
+            pass
+
+    # ---- 读取 ----
+
+    def runs(self):
+        """解析日志，按写入顺序返回所有运行"""
+        runs = {}
+        if not self.exists():
+            return []
+        join = os.path.join
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 崩溃时可能留下不完整的最后一行
+                    continue
+                kind = record.get('t')
+                run = runs.get(record.get('run'))
+                if kind == 'begin':
+                    runs[record['run']] = Run(record['run'], record['kind'], record.get('undoes', ()))
+                elif run is None:
+                    continue
+                elif kind == 'move':
+                    run.moves[record['i']] = (join(self.root, record['src']),
+                                              join(self.root, record['dest']),
+                                              record.get('category'))
+                    if record.get('link'):
+                        run.links.add(record['i'])
+                    if record.get('of'):
+                        run.origins[record['i']] = tuple(record['of'])
+                elif kind == 'done':
+                    run.done.add(record['i'])
+                elif kind == 'skip':
+                    run.skipped.add(record['i'])
+                elif kind == 'lost':
+                    run.lost.append(tuple(record['of']))
+                elif kind == 'end':
+                    run.ended = True
+        return list(runs.values())
+
+    def interrupted(self):
+        """返回最后一次未正常结束的运行，没有则返回 None"""
+        runs = self.runs()
+        if runs and not runs[-1].ended:
+            return runs[-1]
+        return None
+
+    def undoable(self):
+        """返回还有条目未撤销的分类运行（从新到旧），各运行的 undone 为已撤销的序号"""
+        runs = self.runs()
+        undone = {}     # 分类运行 ID → 已撤销的序号
+        for run in runs:
+            if run.kind != 'undo':
+                continue
+            for i in run.done:
+                origin = run.origins.get(i)
+                if origin is not None:
+                    undone.setdefault(origin[0], set()).add(origin[1])
+            for run_id, i in run.lost:
+                undone.setdefault(run_id, set()).add(i)
+        result = []
+        for run in reversed(runs):
+            if run.kind == 'sort':
+                run.undone = undone.get(run.id, set())
+                if not run.done <= run.undone:
+                    result.append(run)
+        return result
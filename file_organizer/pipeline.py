@@ -0,0 +1,340 @@
+"""面向网络文件系统（SMB/NFS）的流水线模式
+
+网络挂载上每次 mkdir、rename、stat 都是一次往返，逐个执行时大部分时间都在等待。
+流水线模式让扫描 → 分类 → 重命名三个阶段重叠进行：
+- 主线程边列目录边分类，把移动交给线程池，最多保持 inflight 个操作同时进行；
+- 进行中与排队的操作达到上限时主线程停止读取目录（背压）；
+- 每个挂载点（按路径前缀配置）有独立的并发上限，慢卷不会占满所有并发；
+- 每个目标目录的 mkdir 只提交一次，依赖它的重命名在工作线程中等待其完成；
+- 目标路径是尚未完成的移动的源路径时（newer 策略先把旧文件改名移开），先等待那些移动完成。
+文件系统操作都经过 LocalFS，测试时可替换为注入延迟的 LatencyFS；
+传入 stats 时记录各类操作次数与每个文件的移动延迟（从取出到完成，包含排队时间）。
+"""
+import errno
+import os
+import queue
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .collisions import CollisionResolver
+from .engine import default_classifier, plan_sort, remove_dirs_if_empty, resume
+from .executor import linked_to, move_noreplace, rename_noreplace
+from .journal import Journal
+from .scanner import iter_files
+from .stats import phase
+
+
+class LocalFS:
+    """本地文件系统操作"""
+
+    def scandir(self, path):
+        return os.scandir(path)
+
+    def makedirs(self, path):
+        os.makedirs(path, exist_ok=True)
+
+    def rename(self, src, dest):
+        """不覆盖已有文件的重命名（见 executor.rename_noreplace）"""
+        rename_noreplace(src, dest)
+
+    def move(self, src, dest):
+        """跨设备等无法直接重命名时的回退（同样不覆盖）"""
+        move_noreplace(src, dest)
+
+    def link(self, target, dest):
+        os.link(target, dest)
+
+    def remove(self, path):
+        os.unlink(path)
+
+    def linked_to(self, path, key):
+        """path 是否就是元数据键为 key 的文件（见 executor.linked_to）"""
+        return linked_to(path, key)
+
+
+class _SlowScandir:
+    """每读取 batch 个目录项模拟一次往返"""
+
+    def __init__(self, it, delay, batch):
+        self._it = it
+        self._delay = delay
+        self._batch = batch
+        self._count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._it.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._count % self._batch == 0:
+            time.sleep(self._delay)
+        self._count += 1
+        return next(self._it)
+
+
+class LatencyFS(LocalFS):
+    """在本地文件系统上为每个操作注入固定延迟，用于模拟网络挂载"""
+
+    def __init__(self, delay=0.005, readdir_batch=128):
+        self.delay = delay
+        self.readdir_batch = readdir_batch
+
+    def scandir(self, path):
+        time.sleep(self.delay)
+        return _SlowScandir(os.scandir(path), self.delay, self.readdir_batch)
+
+    def makedirs(self, path):
+        time.sleep(self.delay)
+        super().makedirs(path)
+
+    def rename(self, src, dest):
+        time.sleep(self.delay)
+        super().rename(src, dest)
+
+    def move(self, src, dest):
+        time.sleep(self.delay)
+        super().move(src, dest)
+
+    def link(self, target, dest):
+        time.sleep(self.delay)
+        super().link(target, dest)
+
+    def remove(self, path):
+        time.sleep(self.delay)
+        super().remove(path)
+
+    def linked_to(self, path, key):
+        time.sleep(self.delay)
+        return super().linked_to(path, key)
+
+
+class PipelineExecutor:
+    """保持多个元数据操作同时进行的移动执行器，接口与 MoveExecutor 相同"""
+
+    def __init__(self, inflight=32, mount_limits=None, fs=None):
+        self.inflight = max(1, inflight)
+        # 挂载点路径前缀 → 并发上限，按最长前缀匹配，不需要额外的 stat
+        self.mount_limits = sorted(((os.path.abspath(path), max(1, int(limit)))
+                                    for path, limit in (mount_limits or {}).items()),
+                                   key=lambda item: len(item[0]), reverse=True)
+        self.fs = fs or LocalFS()
+
+    @classmethod
+    def from_config(cls, config, fs=None):
+        """根据配置字典构建执行器（pipeline_inflight、mount_limits）"""
+        return cls(inflight=config.get('pipeline_inflight', 32),
+                   mount_limits=config.get('mount_limits'), fs=fs)
+
+    def _mount(self, path):
+        """返回 (挂载点, 并发上限)"""
+        for prefix, limit in self.mount_limits:
+            if path == prefix or path.startswith(prefix + os.sep):
+                return prefix, limit
+        return None, self.inflight
+
+    def _move(self, move, mkdir_future):
+        """在工作线程中执行，返回实际使用的操作名"""
+        mkdir_future.result()
+        src, dest = move.src, move.dest
+        if move.link is not None:
+            try:
+                self.fs.link(move.link, dest)
+            except OSError:
+                pass
+            else:
+                # 链接到的不是去重时检测的保留文件时撤回链接，按普通移动处理
+                if self.fs.linked_to(dest, move.link_key):
+                    self.fs.remove(src)
+                    return 'link'
+                self.fs.remove(dest)
+        try:
+            self.fs.rename(src, dest)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            self.fs.move(src, dest)
+            return 'move'
+        return 'rename'
+
+    def run(self, moves, progress=None, on_done=None, total=None, stats=None):
+        """执行移动计划（moves 可以是边扫描边生成的迭代器），返回成功移动的文件数"""
+        if total is None and hasattr(moves, '__len__'):
+            total = len(moves)
+        done = 0
+        error = None
+        if progress:
+            progress(0, total or 0)
+
+        results = queue.SimpleQueue()
+        mkdirs = {}     # 目标目录 → mkdir 的 Future
+        pending = {}    # 挂载点 → deque[(序号, Move, 开始时间)]
+        running = {}    # 挂载点 → 进行中的操作数
+        queued = 0      # 已从迭代器取出但尚未完成的移动数
+        sources = {}    # 尚未完成的移动的序号 → 源路径
+        vacating = set()    # 这些移动的源路径，完成后才会空出来
+        clock = time.perf_counter
+
+        def finish(i, start=None):
+            nonlocal done, error
+            done += 1
+            if start is not None:
+                stats.latency(clock() - start)
+            if on_done:
+                on_done(i)
+            if progress:
+                try:
+                    progress(done, max(total or 0, done))
+                except BaseException as e:
+                    # 取消：不再开始新的移动，只等待进行中的操作
+                    error = error or e
+
+        with ThreadPoolExecutor(max_workers=self.inflight, thread_name_prefix='fo-pipe') as pool:
+
+            def dispatch(mount, limit):
+                items = pending.get(mount)
+                while items and running.get(mount, 0) < limit:
+                    i, move, start = items.popleft()
+                    directory = os.path.dirname(move.dest)
+                    mkdir_future = mkdirs.get(directory)
+                    if mkdir_future is None:
+                        mkdir_future = mkdirs[directory] = pool.submit(self.fs.makedirs, directory)
+                        if stats is not None:
+                            stats.count('mkdir')
+                    running[mount] = running.get(mount, 0) + 1
+                    future = pool.submit(self._move, move, mkdir_future)
+                    future.add_done_callback(
+                        lambda f, i=i, mount=mount, limit=limit, start=start:
+                        results.put((i, mount, limit, start, f)))
+
+            def collect(block):
+                """处理已完成的操作；block 为真时至少等待一个"""
+                nonlocal queued, error
+                while queued:
+                    try:
+                        i, mount, limit, start, future = results.get(block=block)
+                    except queue.Empty:
+                        return
+                    queued -= 1
+                    running[mount] -= 1
+                    vacating.discard(sources.pop(i))
+                    exc = future.exception()
+                    if exc is not None:
+                        error = error or exc
+                    else:
+                        if stats is not None:
+                            stats.count(future.result())
+                        finish(i, start)
+                    if error is None:
+                        dispatch(mount, limit)
+                    block = False
+
+            try:
+                for i, move in enumerate(moves):
+                    mount, limit = self._mount(move.dest)
+                    start = clock() if stats is not None else None
+                    while move.dest in vacating and error is None:
+                        collect(block=True)
+                    if error is not None:
+                        break
+                    pending.setdefault(mount, deque()).append((i, move, start))
+                    sources[i] = move.src
+                    vacating.add(move.src)
+                    queued += 1
+                    dispatch(mount, limit)
+                    collect(block=False)
+                    # 背压：排队与进行中的操作过多时等待完成
+                    while queued >= self.inflight * 2 and error is None:
+                        collect(block=True)
+                    if error is not None:
+                        break
+            except BaseException as e:
+                error = error or e
+            if error is not None:
+                # 丢弃尚未开始的移动，只等待进行中的操作
+                for items in pending.values():
+                    queued -= len(items)
+                    items.clear()
+            while queued:
+                collect(block=True)
+
+        if error is not None:
+            raise error
+        return done
+
+
+def stream_sort_folder(root, language='zh', progress=None, classifier=None,
+                       executor=None, use_journal=True, batch=256, walker=None,
+                       resolver=None, stats=None):
+    """流水线分类：边列目录边分类边移动，不等待整个目录扫描完成
+
+    计划按批写入移动日志并落盘后才交给执行器，崩溃后同样可以用 resume 续做。
+    同名冲突按批处理，所有批次共用一个 resolver，每个分类文件夹只列举一次。
+    各阶段相互重叠，stats 中只有整体的 pipeline 耗时与操作次数。
+    """
+    root = os.fspath(root)
+    executor = executor or PipelineExecutor()
+    classifier = classifier or default_classifier(language)
+    resolver = resolver or CollisionResolver()
+    planned, skipped = [], []
+    journal = Journal(root) if use_journal else None
+    resumed = resume(root, progress, journal, executor, stats) if journal else None
+    # 生成器与完成回调都在 executor.run() 的线程中执行，无需加锁
+    state = {'run_id': None}
+    source_dirs = set()
+
+    def flush(buffer):
+        buffer, conflicts = resolver.resolve(buffer)
+        skipped.extend(conflicts)
+        # 计划记录必须先于移动落盘
+        if journal is not None:
+            if state['run_id'] is None:
+                state['run_id'] = journal.begin('sort', ())
+            journal.plan(state['run_id'], len(planned), buffer)
+        planned.extend(buffer)
+        return buffer
+
+    if walker is not None:
+        files = walker.iter_files(root, skip_top=classifier.categories)
+    else:
+        files = iter_files(root, scandir=executor.fs.scandir)
+
+    def moves():
+        # 按批分类，内容识别的文件头预读也随之按批并行
+        buffer = []
+        for file in files:
+            buffer.append(file)
+            if walker is not None:
+                source_dirs.add(os.path.dirname(file.path))
+            if len(buffer) >= batch:
+                yield from flush(plan_sort(root, buffer, classifier=classifier))
+                buffer = []
+        if buffer:
+            yield from flush(plan_sort(root, buffer, classifier=classifier))
+
+    def on_done(i):
+        if journal is not None:
+            journal.done(state['run_id'], i)
+
+    moved = 0
+    try:
+        with phase(stats, 'pipeline'):
+            moved = executor.run(moves(), progress, on_done, stats=stats)
+        if journal is not None and state['run_id'] is not None:
+            journal.end(state['run_id'])
+        if source_dirs:
+            # 递归模式下删除被移空的源子文件夹
+            source_dirs.discard(root)
+            remove_dirs_if_empty(source_dirs, stop=root)
+    finally:
+        # 每批预读只在新条目足够多时写回内容识别缓存，运行结束时写回剩余的
+        classifier.save()
+        if journal is not None:
+            journal.close()
+    return {'folder': root, 'total': len(planned), 'moved': moved,
+            'dry_run': False, 'moves': planned, 'skipped': skipped, 'resumed': resumed}
@@ -0,0 +1,109 @@
+"""进度通道：工作线程只更新计数器，界面按固定频率轮询
+
+引擎每处理一个文件调用一次 progress(已完成, 总数)，这里只做两次赋值，
+不会向 Tk 事件队列投递任何回调；界面通过 snapshot() 读取当前状态。
+同一个回调也是协作式取消与暂停的检查点：暂停时在回调中等待（不再开始新的移动），
+取消时抛出 Cancelled。执行器随后等待进行中的复制结束，移动日志中保留已完成的记录，
+下次分类 / 恢复时只续做剩余的条目，不重新扫描文件夹。
+"""
+import threading
+import time
+
+
+def format_eta(seconds):
+    """把剩余秒数格式化为 H:MM:SS / M:SS"""
+    if seconds is None:
+        return '--:--'
+    seconds = int(seconds + 0.5)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+def format_size(size):
+    """把字节数格式化为易读的大小"""
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if size < 1024 or unit == 'TB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+class Cancelled(Exception):
+    """运行被用户取消（已完成的移动保留在移动日志中，可以续做）"""
+
+
+class Progress:
+    """线程间共享的进度计数器，兼作取消 / 暂停开关"""
+
+    def __init__(self, total=0):
+        self.total = total
+        self.done = 0
+        self.running = False
+        self.started = None
+        self.finished = None
+        self.cancelled = False
+        self._gate = threading.Event()     # 未暂停时为 set
+        self._gate.set()
+        self._paused_at = None
+        self._paused_total = 0.0
+
+    def start(self, total=0):
+        """开始计时"""
+        self.total = total
+        self.done = 0
+        self.started = time.monotonic()
+        self.finished = None
+        self.running = True
+
+    def __call__(self, done, total):
+        """引擎回调，在工作线程中调用；暂停时阻塞，取消时抛出 Cancelled"""
+        if self.started is None:
+            self.start(total)
+        self.done = done
+        self.total = total
+        if not self._gate.is_set():
+            self._gate.wait()
+        if self.cancelled:
+            raise Cancelled()
+
+    @property
+    def paused(self):
+        return not self._gate.is_set()
+
+    def pause(self):
+        """暂停：当前文件完成后不再开始新的移动"""
+        if self._gate.is_set():
+            self._paused_at = time.monotonic()
+            self._gate.clear()
+
+    def resume(self):
+        """继续暂停的运行"""
+        if not self._gate.is_set():
+            self._paused_total += time.monotonic() - self._paused_at
+            self._paused_at = None
+            self._gate.set()
+
+    def cancel(self):
+        """取消：在下一个检查点抛出 Cancelled（暂停中的运行同样会被唤醒并取消）"""
+        self.cancelled = True
+        self.resume()
+
+    def finish(self):
+        """结束计时"""
+        self.finished = time.monotonic()
+        self.running = False
+
+    def snapshot(self):
+        """返回 (已完成, 总数, 每秒文件数, 剩余秒数)"""
+        done, total = self.done, self.total
+        if self.started is None:
+            return done, total, 0.0, None
+        now = self.finished or time.monotonic()
+        # 暂停的时间不计入速度
+        paused = self._paused_total + (now - self._paused_at if self._paused_at else 0.0)
+        elapsed = now - self.started - paused
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = (total - done) / rate if rate > 0 else None
+        return done, total, rate, eta
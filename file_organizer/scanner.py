@@ -0,0 +1,98 @@
+"""基于 os.scandir 的单次扫描器
+
+目录只列举一次，文件/目录的判断使用 DirEntry 缓存的 d_type，
+不再为每个文件额外调用 stat；扫描结果（快照）可同时用于计数、预览和执行。
+"""
+import os
+
+from .journal import JOURNAL_NAME
+
+# 监视模式的状态文件
+WATCH_STATE_NAME = '.file_organizer_watch.json'
+
+# 工具自身的文件，不参与分类
+IGNORED_NAMES = frozenset({JOURNAL_NAME, WATCH_STATE_NAME, WATCH_STATE_NAME + '.tmp'})
+
+
+class FileEntry:
+    """快照中的一个文件，stat 结果按需获取并缓存"""
+    __slots__ = ('name', 'path', '_entry', '_stat')
+
+    def __init__(self, name, path, entry=None, stat=None):
+        self.name = name
+        self.path = path
+        self._entry = entry
+        self._stat = stat
+
+    @property
+    def suffix(self):
+        """小写扩展名（与 Path.suffix 一致，隐藏文件没有扩展名）"""
+        ext = os.path.splitext(self.name)[1]
+        return ext.lower() if len(ext) > 1 else ''
+
+    def stat(self):
+        if self._stat is None:
+            self._stat = self._entry.stat() if self._entry is not None else os.stat(self.path)
+        return self._stat
+
+    @property
+    def size(self):
+        return self.stat().st_size
+
+    @property
+    def mtime(self):
+        return self.stat().st_mtime
+
+    def __fspath__(self):
+        return self.path
+
+    def __repr__(self):
+        return f"FileEntry({self.path!r})"
+
+
+class Snapshot:
+    """一次目录扫描的结果"""
+
+    def __init__(self, root, files, dirs):
+        self.root = root
+        self.files = files  # FileEntry 列表
+        self.dirs = dirs    # (名称, 路径) 列表
+
+    def __len__(self):
+        return len(self.files)
+
+    def __iter__(self):
+        return iter(self.files)
+
+
+def iter_files(root, scandir=os.scandir):
+    """流式列举 root 顶层的文件，不保留整个目录列表"""
+    with scandir(os.fspath(root)) as it:
+        for entry in it:
+            if entry.name in IGNORED_NAMES:
+                continue
+            try:
+                if entry.is_file():
+                    yield FileEntry(entry.name, entry.path, entry)
+            except OSError:
+                continue
+
+
+def scan(root):
+    """列举 root 顶层的文件和子目录（只遍历一次）"""
+    root = os.fspath(root)
+    files = []
+    dirs = []
+    with os.scandir(root) as it:
+        for entry in it:
+            if entry.name in IGNORED_NAMES:
+                continue
+            try:
+                # d_type 已知时不会触发 stat；符号链接会跟随，与 Path.is_file 一致
+                if entry.is_file():
+                    files.append(FileEntry(entry.name, entry.path, entry))
+                elif entry.is_dir():
+                    dirs.append((entry.name, entry.path))
+            except OSError:
+                continue
+    return Snapshot(root, files, dirs)
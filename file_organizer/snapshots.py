@@ -0,0 +1,171 @@
+"""扫描快照缓存：界面刷新（切换语言、整理完成后的预览）时不必重新列举目录
+
+快照按 (文件夹, 遍历选项) 保存，同时记录每个列举过的目录的 mtime_ns。
+目录中增删、改名文件都会改变该目录的 mtime，取用时逐个 stat 这些目录
+（单层模式只有根目录一次 stat），全部一致才复用，否则丢弃快照重新扫描。
+整理 / 恢复完成后用刚执行的移动计划增量更新快照，并重新记录涉及的目录的 mtime，
+不需要重新扫描；这两步之间其他程序对这些目录的修改无法发现。
+目录的 mtime 不反映文件内容的变化，快照中的文件大小可能过时，
+重新选择文件夹时应调用 invalidate() 强制重新扫描。
+"""
+import os
+import threading
+
+from .scanner import FileEntry, iter_files
+
+
+def _walker_key(walker):
+    if walker is None:
+        return None
+    return walker.max_depth, tuple(walker.exclude), walker.follow_symlinks
+
+
+class _Snapshot:
+    __slots__ = ('files', 'dirs', 'skip_top')
+
+    def __init__(self, files, dirs, skip_top):
+        self.files = files          # 路径 → FileEntry
+        self.dirs = dirs            # 列举过的目录（含根目录）→ mtime_ns
+        self.skip_top = skip_top
+
+
+class SnapshotCache:
+    """文件夹 → 文件列表 的缓存，可在多个线程中使用"""
+
+    def __init__(self, max_entries=2):
+        self.max_entries = max_entries
+        self._entries = {}  # (文件夹, 遍历选项) → _Snapshot，按写入顺序淘汰
+        self._lock = threading.Lock()
+
+    def get(self, root, walker=None, skip_top=()):
+        """快照仍然有效时返回文件列表（FileEntry），否则返回 None"""
+        root = os.fspath(root)
+        key = (root, _walker_key(walker))
+        with self._lock:
+            snapshot = self._entries.get(key)
+        if snapshot is None:
+            return None
+        valid = True
+        skip_top = frozenset(skip_top) if walker is not None else frozenset()
+        if skip_top != snapshot.skip_top:
+            # 跳过的顶层文件夹不同（如切换语言后“其他”的名称）：差异中的文件夹都不存在时仍然有效
+            valid = not any(os.path.isdir(os.path.join(root, name))
+                            for name in skip_top ^ snapshot.skip_top)
+        if valid:
+            for path, mtime in list(snapshot.dirs.items()):
+                try:
+                    if os.stat(path).st_mtime_ns != mtime:
+                        valid = False
+                        break
+                except OSError:
+                    valid = False
+                    break
+        with self._lock:
+            if not valid:
+                if self._entries.get(key) is snapshot:
+                    del self._entries[key]
+                return None
+            return list(snapshot.files.values())
+
+    def files(self, root, walker=None, skip_top=()):
+        """返回 root 中的文件：快照有效时直接返回列表，否则返回边扫描边记录的迭代器
+
+        迭代器完整遍历后才存入缓存，中途停止（如预览被新的预览取代）时不保存。
+        传入 walker 时递归遍历，skip_top 为要跳过的顶层子目录名。
+        """
+        files = self.get(root, walker, skip_top)
+        if files is not None:
+            return files
+        return self._record(os.fspath(root), walker, frozenset(skip_top))
+
+    def _record(self, root, walker, skip_top):
+        # 根目录在列举之前记录 mtime，扫描期间的变化会在下次取用时发现
+        dirs = {root: os.stat(root).st_mtime_ns}
+        files = {}
+        if walker is None:
+            for file in iter_files(root):
+                files[file.path] = file
+                yield file
+            skip_top = frozenset()
+        else:
+            for (rel, path), batch in walker.iter_batches(root, skip_top):
+                if rel:
+                    try:
+                        dirs[path] = os.stat(path).st_mtime_ns
+                    except OSError:
+                        dirs[path] = None
+                for file in batch:
+                    files[file.path] = file
+                    yield file
+        self._store((root, _walker_key(walker)), _Snapshot(files, dirs, skip_top))
+
+    def _store(self, key, snapshot):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = snapshot
+            while len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
+
+    def apply(self, root, moves, walker=None):
+        """用刚执行完的移动计划（engine 结果中的 moves）更新 root 的快照，没有快照时忽略
+
+        移出已列举目录的文件从快照中删除，移入的文件加入快照（同一文件的 stat 结果沿用）；
+        涉及的目录及其上级目录重新记录 mtime，已被删除的目录连同其中的文件一起移除。
+        """
+        root = os.fspath(root)
+        key = (root, _walker_key(walker))
+        with self._lock:
+            snapshot = self._entries.get(key)
+            if snapshot is None:
+                return
+            files, dirs = snapshot.files, snapshot.dirs
+            touched = set()
+            for move in moves:
+                src_dir = os.path.dirname(move.src)
+                dest_dir = os.path.dirname(move.dest)
+                touched.add(src_dir)
+                touched.add(dest_dir)
+                old = files.pop(move.src, None)
+                if dest_dir not in dirs:
+                    if walker is None or not dest_dir.startswith(root + os.sep):
+                        continue
+                    rel = os.path.relpath(dest_dir, root)
+                    if not walker.includes(rel, snapshot.skip_top):
+                        continue
+                    # 恢复时重新创建的子目录（及其上级目录），mtime 在下面统一记录
+                    parent = dest_dir
+                    while parent not in dirs:
+                        dirs[parent] = None
+                        parent = os.path.dirname(parent)
+                name = os.path.basename(move.dest)
+                files[move.dest] = FileEntry(name, move.dest,
+                                             stat=old._stat if old is not None else None)
+            # 删除空目录时会一直向上删除，上级目录的 mtime 也会变化
+            for path in list(touched):
+                parent = os.path.dirname(path)
+                while parent.startswith(root + os.sep) and parent not in touched:
+                    touched.add(parent)
+                    parent = os.path.dirname(parent)
+            touched.add(root)
+            removed = set()
+            for path in touched:
+                if path not in dirs:
+                    continue
+                try:
+                    dirs[path] = os.stat(path).st_mtime_ns
+                except OSError:
+                    del dirs[path]
+                    removed.add(path)
+            if removed:
+                snapshot.files = {path: file for path, file in files.items()
+                                  if os.path.dirname(path) not in removed}
+
+    def invalidate(self, root=None):
+        """丢弃 root 的所有快照，root 为 None 时清空缓存"""
+        with self._lock:
+            if root is None:
+                self._entries.clear()
+                return
+            root = os.fspath(root)
+            for key in [key for key in self._entries if key[0] == root]:
+                del self._entries[key]
@@ -0,0 +1,317 @@
+"""按文件内容（魔数）识别类型，用于没有扩展名或扩展名错误的文件
+
+- 每个文件只读取开头 HEAD_SIZE 字节，按批交给线程池并行读取（os.read 期间释放 GIL），
+  线程池在识别器的整个生命周期内复用；
+- 识别结果按 (st_dev, st_ino, 大小, mtime_ns) 持久缓存在 ~/.file_sorter_sniff_cache.json，
+  文件未变化时以后的预览、分类与监视都不再读取它（移动到分类文件夹后 inode 不变，缓存仍然有效）；
+  流水线与监视模式每批都会预读，新条目累计到与上次写回时的缓存一样多才整体写回，
+  写回的总字节数与条目数成正比，其余的在运行结束（或进程退出）时写回；
+- 识别结果是一个规范扩展名（如 '.png'），再交给分类器按扩展名规则归类，自定义后缀规则同样生效。
+mode 为 'unknown' 时只识别按名称归入"其他"的文件；为 'all' 时还会纠正扩展名与内容
+明显不符的文件（只依据可靠的二进制魔数；文本类判断与只有一个 MP3 帧头这类弱特征不会覆盖已知扩展名）。
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .cache import get_cache, metadata_key
+
+CACHE_PATH = Path.home() / '.file_sorter_sniff_cache.json'
+
+# 每个文件读取的字节数（tar 的魔数位于 257 字节处）
+HEAD_SIZE = 512
+
+# 同一魔数可能对应的扩展名；扩展名在其中时不算"扩展名错误"
+_ZIP = frozenset({'.zip', '.docx', '.xlsx', '.pptx', '.odt', '.ods', '.odp', '.epub', '.apk',
+                  '.aab', '.jar', '.xpi', '.whl', '.ipa', '.cbz', '.nupkg', '.vsix', '.3mf'})
+_MP4 = frozenset({'.mp4', '.m4v', '.m4a', '.m4b', '.mov', '.3gp', '.3g2', '.f4v', '.heic',
+                  '.heif', '.avif'})
+_ALIASES = {
+    '.png': frozenset({'.png', '.apng'}),
+    '.jpg': frozenset({'.jpg', '.jpeg', '.jpe', '.jfif'}),
+    '.gif': frozenset({'.gif'}),
+    '.bmp': frozenset({'.bmp', '.dib'}),
+    '.tiff': frozenset({'.tif', '.tiff', '.dng', '.nef', '.cr2', '.arw'}),
+    '.ico': frozenset({'.ico', '.cur'}),
+    '.webp': frozenset({'.webp'}),
+    '.pdf': frozenset({'.pdf', '.ai'}),
+    '.wav': frozenset({'.wav', '.wave'}),
+    '.avi': frozenset({'.avi'}),
+    '.mkv': frozenset({'.mkv', '.webm', '.mka', '.mk3d'}),
+    '.webm': frozenset({'.mkv', '.webm', '.mka', '.mk3d'}),
+    '.flv': frozenset({'.flv'}),
+    '.wmv': frozenset({'.wmv', '.wma', '.asf'}),
+    '.mp3': frozenset({'.mp3', '.aac', '.flac'}),
+    '.flac': frozenset({'.flac'}),
+    '.ogg': frozenset({'.ogg', '.oga', '.ogv', '.opus', '.spx'}),
+    '.rar': frozenset({'.rar', '.cbr'}),
+    '.7z': frozenset({'.7z'}),
+    '.gz': frozenset({'.gz', '.tgz', '.svgz'}),
+    '.bz2': frozenset({'.bz2', '.tbz2'}),
+    '.xz': frozenset({'.xz', '.txz'}),
+    '.tar': frozenset({'.tar'}),
+    '.exe': frozenset({'.exe', '.dll', '.sys', '.scr', '.com', '.ocx', '.cpl', '.efi'}),
+    '.deb': frozenset({'.deb', '.udeb'}),
+    '.rpm': frozenset({'.rpm'}),
+}
+_ALIASES.update({ext: _ZIP for ext in ('.zip', '.docx', '.xlsx', '.pptx', '.apk', '.epub')})
+_ALIASES.update({ext: _MP4 for ext in ('.mp4', '.mov', '.m4a', '.heic', '.avif')})
+
+# 开头固定的魔数：(魔数, 扩展名)
+_MAGIC = (
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif'),
+    (b'II*\x00', '.tiff'),
+    (b'MM\x00*', '.tiff'),
+    (b'%PDF-', '.pdf'),
+    (b'Rar!\x1a\x07', '.rar'),
+    (b"7z\xbc\xaf'\x1c", '.7z'),
+    (b'\x1f\x8b\x08', '.gz'),
+    (b'\xfd7zXZ\x00', '.xz'),
+    (b'fLaC', '.flac'),
+    (b'OggS', '.ogg'),
+    (b'FLV\x01', '.flv'),
+    (b'0&\xb2u\x8ef\xcf\x11', '.wmv'),
+    (b'!<arch>\ndebian-binary', '.deb'),
+    (b'\xed\xab\xee\xdb', '.rpm'),
+)
+
+# MPEG 音频 Layer III 帧头：版本（3 = MPEG-1，2 = MPEG-2，0 = MPEG-2.5）→ 码率表（kbps）与采样率表
+_MP3_BITRATES = {3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+                 2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)}
+_MP3_BITRATES[0] = _MP3_BITRATES[2]
+_MP3_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+# ZIP 中的特征路径 → 扩展名
+_ZIP_MARKERS = ((b'word/', '.docx'), (b'xl/', '.xlsx'), (b'ppt/', '.pptx'),
+                (b'AndroidManifest.xml', '.apk'), (b'classes.dex', '.apk'),
+                (b'application/epub+zip', '.epub'))
+
+# ISO 媒体文件的 brand → 扩展名，其余 brand 一律视为 .mp4
+_FTYP_BRANDS = {b'qt  ': '.mov', b'M4A ': '.m4a', b'M4B ': '.m4a', b'heic': '.heic',
+                b'heix': '.heic', b'mif1': '.heic', b'msf1': '.heic', b'avif': '.avif'}
+
+_RIFF_TYPES = {b'WEBP': '.webp', b'WAVE': '.wav', b'AVI ': '.avi'}
+
+# 文本中允许出现的控制字符
+_TEXT_CONTROLS = frozenset(b'\t\n\r\f\b\x1b')
+
+
+def _detect_text(head):
+    """文本文件：识别 XML / SVG / HTML，其余归为 .txt；不是文本时返回 None"""
+    if b'\x00' in head:
+        return None
+    try:
+        text = head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # 末尾被截断的多字节字符不影响判断
+        if e.start < len(head) - 3:
+            return None
+        text = head[:e.start].decode('utf-8')
+    controls = sum(1 for b in head if b < 0x20 and b not in _TEXT_CONTROLS)
+    if controls * 10 > len(head):
+        return None
+    start = text.lstrip('\ufeff \t\r\n').lower()
+    if start.startswith('<svg') or (start.startswith('<?xml') and '<svg' in start):
+        return '.svg'
+    if start.startswith('<!doctype html') or start.startswith('<html'):
+        return '.html'
+    if start.startswith('<?xml'):
+        return '.xml'
+    return '.txt'
+
+
+def _mp3_frame(head, offset):
+    """offset 处是合法的 Layer III 帧头时返回帧长度，否则返回 None"""
+    if len(head) < offset + 4 or head[offset] != 0xff or head[offset + 1] & 0xe0 != 0xe0:
+        return None
+    version = (head[offset + 1] >> 3) & 3
+    layer = (head[offset + 1] >> 1) & 3
+    bitrate = head[offset + 2] >> 4
+    rate = (head[offset + 2] >> 2) & 3
+    if version == 1 or layer != 1 or bitrate in (0, 15) or rate == 3 or head[offset + 3] & 3 == 2:
+        return None
+    padding = (head[offset + 2] >> 1) & 1
+    return ((144 if version == 3 else 72) * _MP3_BITRATES[version][bitrate] * 1000
+            // _MP3_RATES[version][rate] + padding)
+
+
+def _detect_binary(head):
+    """需要解析结构的二进制格式，返回 (扩展名, 是否可靠) 或 None"""
+    if head.startswith(b'MZ') and len(head) >= 0x40:
+        # 只有 DOS 头中 e_lfanew 指向的 PE 签名才算可执行文件，开头碰巧是 "MZ" 的文本不算
+        pe = int.from_bytes(head[0x3c:0x40], 'little')
+        if head[pe:pe + 4] == b'PE\x00\x00':
+            return '.exe', True
+    if head.startswith(b'ID3') and len(head) >= 10 and 2 <= head[3] <= 4 \
+            and all(b < 0x80 for b in head[6:10]):
+        return '.mp3', True
+    length = _mp3_frame(head, 0)
+    if length is not None:
+        if length + 4 <= len(head):
+            # 下一帧也在已读取的范围内：两个连续的帧头才可靠
+            return ('.mp3', True) if _mp3_frame(head, length) is not None else None
+        return '.mp3', False
+    return None
+
+
+def _detect_magic(head):
+    """位置固定的魔数（都足以判断扩展名错误），无法识别时返回 None"""
+    if head.startswith(b'PK\x03\x04'):
+        for marker, ext in _ZIP_MARKERS:
+            if marker in head:
+                return ext
+        return '.zip'
+    if head[4:8] == b'ftyp':
+        return _FTYP_BRANDS.get(head[8:12], '.mp4')
+    if head.startswith(b'RIFF'):
+        return _RIFF_TYPES.get(head[8:12])
+    if head.startswith(b'\x1aE\xdf\xa3'):
+        return '.webm' if b'webm' in head else '.mkv'
+    if head[257:262] == b'ustar':
+        return '.tar'
+    if head.startswith(b'BZh') and head[3:4].isdigit():
+        return '.bz2'
+    if head.startswith(b'BM') and len(head) >= 14 and head[6:10] == b'\x00\x00\x00\x00':
+        return '.bmp'
+    if head.startswith(b'\x00\x00\x01\x00') and len(head) >= 6 and head[4] > 0:
+        return '.ico'
+    for magic, ext in _MAGIC:
+        if head.startswith(magic):
+            return ext
+    return None
+
+
+def identify(head):
+    """根据文件开头的字节识别类型，返回 (规范扩展名, 是否可靠)，无法识别时返回 (None, False)
+
+    不可靠的结果（文本类判断、只看到一个 MP3 帧头）只用于没有已知扩展名的文件，不会纠正扩展名。
+    """
+    if not head:
+        return None, False
+    ext = _detect_magic(head)
+    if ext is not None:
+        return ext, True
+    found = _detect_binary(head)
+    if found is not None:
+        return found
+    return _detect_text(head), False
+
+
+def detect(head):
+    """根据文件开头的字节识别类型，返回规范扩展名，无法识别时返回 None"""
+    return identify(head)[0]
+
+
+def aliases(ext):
+    """与识别结果相容的扩展名集合；文本类识别结果返回 None（不足以判断扩展名错误）"""
+    return _ALIASES.get(ext)
+
+
+def _read_head(path):
+    fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        return os.read(fd, HEAD_SIZE)
+    finally:
+        os.close(fd)
+
+
+class Sniffer:
+    """带缓存的内容识别器"""
+
+    def __init__(self, mode='unknown', cache_path=None, workers=8, batch=256):
+        if mode not in ('unknown', 'all'):
+            raise ValueError(f"sniff mode must be 'unknown' or 'all', not {mode!r}")
+        self.verify = mode == 'all'
+        # 值为 [扩展名, 是否可靠]，扩展名为 '' 表示已读取但无法识别；
+        # 旧版本写入的字符串值（当时 "MZ" 等弱特征也算可靠）视为未命中，重新读取
+        self.cache = get_cache(cache_path or CACHE_PATH)
+        self.workers = max(1, workers)
+        self.batch = batch
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._unsaved = 0       # 上次写回后新增的条目数
+        self._saved_size = 0    # 上次写回时的条目数
+
+    @classmethod
+    def from_config(cls, config):
+        """根据配置字典构建（sniff、sniff_cache、sniff_workers），未开启时返回 None"""
+        mode = config.get('sniff')
+        if not mode:
+            return None
+        return cls('unknown' if mode is True else mode, cache_path=config.get('sniff_cache'),
+                   workers=config.get('sniff_workers', 8))
+
+    def _lookup(self, entry):
+        """在工作线程中执行：stat 并在缓存未命中时读取文件头，返回 (键, [扩展名, 是否可靠])"""
+        key = metadata_key(entry.stat())
+        value = self.cache.get(key)
+        if not isinstance(value, list):
+            ext, strong = identify(_read_head(entry.path))
+            value = [ext or '', strong]
+        return key, value
+
+    def identify(self, entry):
+        """返回 (规范扩展名, 是否可靠)，无法识别或无法读取时返回 (None, False)"""
+        try:
+            key, value = self._lookup(entry)
+        except OSError:
+            return None, False
+        self.cache.set(key, value)
+        return value[0] or None, bool(value[1])
+
+    def sniff(self, entry):
+        """返回文件内容对应的规范扩展名，无法识别或无法读取时返回 None"""
+        return self.identify(entry)[0]
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers,
+                                                thread_name_prefix='fo-sniff')
+            return self._pool
+
+    def prefetch(self, files, need=None):
+        """按批并行读取需要识别的文件头并写入缓存，按原顺序产出 files 中的每一项"""
+        pool = self._executor()
+        batch = []
+        for file in files:
+            batch.append(file)
+            if len(batch) >= self.batch:
+                self._fill(pool, batch, need)
+                yield from batch
+                batch = []
+        if batch:
+            self._fill(pool, batch, need)
+            yield from batch
+        if self._unsaved >= max(self.batch, self._saved_size):
+            self.save()
+
+    def _fill(self, pool, batch, need):
+        futures = [pool.submit(self._lookup, file) for file in batch
+                   if need is None or need(file)]
+        for future in futures:
+            try:
+                key, value = future.result()
+            except OSError:
+                continue
+            if self.cache.get(key) != value:
+                self._unsaved += 1
+            self.cache.set(key, value)
+
+    def save(self):
+        """把缓存写回磁盘"""
+        self.cache.save()
+        self._unsaved = 0
+        self._saved_size = len(self.cache)
+
+    def close(self):
+        """写回缓存并关闭预读线程池（之后仍可使用，需要时重新创建线程池）"""
+        self.save()
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
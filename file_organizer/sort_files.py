@@ -1,27 +1,53 @@
-import os 
-import shutil
+"""图形界面
+
+启动时只导入显示窗口所需的模块（customtkinter、配置与进度），分类引擎、执行器等
+在窗口显示之后或第一次使用时才导入；系统深浅色直接读取 customtkinter 导入时的探测结果，
+不再单独调用 darkdetect。启动耗时见 benchmarks/startup.py。
+"""
+import sys
 from pathlib import Path
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
-from collections import defaultdict
 import threading
-import json
-import darkdetect
 
-# 文件类型分类字典
-FILE_CATEGORIES = {
-    '图片': {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.svg', '.ico', '.tiff'},
-    '视频': {'.mp4', '.avi', '.mkv', '.mov', '.flv', '.wmv', '.webm', '.m4v', '.m3u8'},
-    '文本': {'.txt', '.doc', '.docx', '.pdf', '.xlsx', '.xls', '.ppt', '.pptx', '.md', '.csv', '.json', '.xml', '.html', '.css', '.js', '.py', '.java', '.cpp', '.c'},
-    '音频': {'.mp3', '.wav', '.flac', '.aac', '.ogg', '.wma', '.m4a'},
-    '压缩包': {'.zip', '.rar', '.7z', '.tar', '.gz', '.bz2'},
-    '程序': {'.exe', '.msi', '.apk', '.dmg', '.deb', '.rpm'}
-}
+if not __package__:
+    # 直接以脚本运行时，把项目根目录加入搜索路径
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from file_organizer import config
+from file_organizer.progress import Cancelled, Progress, format_eta, format_size
+
+# 进度轮询间隔（毫秒）
+PROGRESS_POLL_MS = 50
+
+
+def _probe_system_theme():
+    """系统深浅色（'dark' / 'light'）
+
+    customtkinter 导入时已经探测过系统主题（Linux 上会启动子进程），尚未被 set_appearance_mode
+    覆盖时直接读取它的结果；已被覆盖（深浅色由用户指定）时读到的是指定值，只好重新探测一次。
+    """
+    tracker = ctk.AppearanceModeTracker
+    if tracker.appearance_mode_set_by == 'system':
+        mode = tracker.get_mode()
+    else:
+        mode = tracker.detect_appearance_mode()
+    return 'dark' if mode == 1 else 'light'
+
+
+# 导入时读取，此时本模块还没有调用过 set_appearance_mode
+_system_theme = _probe_system_theme()
+
+
+def system_theme():
+    """系统深浅色（'dark' / 'light'），每个进程只探测一次"""
+    return _system_theme
+
 
 # 多语言翻译字典
 TRANSLATIONS = {
     'zh': {
         'title': '文件分类整理工具',
+        'description': '• 📂 选择文件夹进行分类  • 🔄 支持分类和恢复操作  • ⚡ 多线程后台处理，实时进度显示  • 🎨 深浅模式切换  • 🌐 中英文语言支持',
         'select_folder': '📁 选择文件夹',
         'no_folder': '未选择文件夹',
         'selected': '已选择',
@@ -29,13 +55,19 @@ TRANSLATIONS = {
         'progress': '进度',
         'restore': '↩️ 恢复分类',
         'sort': '✨ 开始分类',
+        'pause': '⏸ 暂停',
+        'resume': '▶ 继续',
+        'cancel': '⏹ 取消',
+        'cancelled_sort': '已取消，已分类 {} 个文件。下次分类时会先继续剩余的文件。',
+        'cancelled_restore': '已取消，已恢复 {} 个文件。下次恢复时会先继续剩余的文件。',
         'tip': '提示：选择文件夹后会显示分类预览，确认后点击\'开始分类\'执行',
         'confirm_sort': '确定要开始分类整理文件吗？',
-        'confirm_restore': '确定要将所有子文件夹中的文件恢复到主文件夹吗？',
+        'confirm_restore': '确定要撤销分类，将文件恢复到原来的位置吗？',
         'sorting': '正在分类文件...',
         'restoring': '正在恢复文件...',
         'success_sort': '成功分类 {} 个文件！',
         'success_restore': '成功恢复 {} 个文件！',
+        'restore_skipped': '{} 个文件的原位置已被占用，仍留在分类文件夹中；腾出原位置后再次恢复即可。',
         'error_sort': '分类失败: {}',
         'error_restore': '恢复失败: {}',
         'no_file_sort': '该文件夹中没有文件需要分类',
@@ -43,8 +75,11 @@ TRANSLATIONS = {
         'folder_info': '📊 文件夹: {}',
         'total_files': '📁 共找到 {} 个文件',
         'folder_error': '错误: 文件夹不存在',
-        'category': '📂 {} ({} 个文件)',
+        'category': '📂 {} ({} 个文件, {})',
         'more_files': '   ... 还有 {} 个文件',
+        'rate_eta': '{:.0f} 个/秒，剩余 {}',
+        'scanning': '⏳ 正在扫描...',
+        'recursive': '包含子文件夹',
         'theme': '主题',
         'light': '浅色',
         'dark': '深色',
@@ -54,6 +89,7 @@ TRANSLATIONS = {
     },
     'en': {
         'title': 'File Sorter Tool',
+        'description': '• 📂 Select folder to sort  • 🔄 Support sort and restore  • ⚡ Multi-threaded with progress bar  • 🎨 Dark/Light theme  • 🌐 Multi-language',
         'select_folder': '📁 Select Folder',
         'no_folder': 'No folder selected',
         'selected': 'Selected',
@@ -61,13 +97,19 @@ TRANSLATIONS = {
         'progress': 'Progress',
         'restore': '↩️ Restore',
         'sort': '✨ Sort Files',
+        'pause': '⏸ Pause',
+        'resume': '▶ Resume',
+        'cancel': '⏹ Cancel',
+        'cancelled_sort': 'Cancelled after sorting {} files. The rest will be finished first on the next sort.',
+        'cancelled_restore': 'Cancelled after restoring {} files. The rest will be finished first on the next restore.',
         'tip': 'Tip: Select a folder to preview classification, then click \'Sort Files\' to execute',
         'confirm_sort': 'Are you sure you want to sort the files?',
-        'confirm_restore': 'Are you sure you want to restore all files to the main folder?',
+        'confirm_restore': 'Are you sure you want to undo the sort and move files back where they were?',
         'sorting': 'Sorting files...',
         'restoring': 'Restoring files...',
         'success_sort': 'Successfully sorted {} files!',
         'success_restore': 'Successfully restored {} files!',
+        'restore_skipped': '{} files stayed in their category folders because their original location is taken; move those files away and restore again.',
         'error_sort': 'Sorting failed: {}',
         'error_restore': 'Restoration failed: {}',
         'no_file_sort': 'No files to sort in this folder',
@@ -75,8 +117,11 @@ TRANSLATIONS = {
         'folder_info': '📊 Folder: {}',
         'total_files': '📁 Found {} files',
         'folder_error': 'Error: Folder does not exist',
-        'category': '📂 {} ({} files)',
+        'category': '📂 {} ({} files, {})',
         'more_files': '   ... {} more files',
+        'rate_eta': '{:.0f} files/s, ETA {}',
+        'scanning': '⏳ Scanning...',
+        'recursive': 'Include subfolders',
         'theme': 'Theme',
         'light': 'Light',
         'dark': 'Dark',
@@ -90,6 +135,16 @@ class FileSorterGUI:
     def __init__(self, root):
         self.root = root
         self.selected_path = None
+        self.progress = Progress()
+        self._preview_token = None
+        self._preview_result = None
+        # 分类器与预览用的扫描快照在窗口显示之后创建（见 _finish_startup）
+        self.classifier = None
+        self.snapshots = None
+        # 整理进行中时预览区显示的状态文字（切换语言时重新翻译）
+        self._status_key = None
+        self._worker = None
+        self._closing = False
         
         # 加载配置
         self.load_config()
@@ -103,41 +158,47 @@ class FileSorterGUI:
         
         # 创建界面
         self.create_widgets()
+        # 关闭窗口时先取消正在进行的整理，等当前文件完成后再退出
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        # 窗口第一次绘制之后再导入分类引擎、创建其余控件
+        self.root.after_idle(self.root.after, 0, self._finish_startup)
+    
+    def _finish_startup(self):
+        """启动的第二阶段：导入分类引擎并编译规则，创建说明文字等非必需控件"""
+        from file_organizer.snapshots import SnapshotCache
+        
+        self.build_classifier()
+        # 预览用的扫描快照，切换语言、整理完成后不必重新扫描
+        self.snapshots = SnapshotCache()
+        self.create_secondary_widgets()
         
     def load_config(self):
         """加载用户配置"""
-        config_path = Path.home() / '.file_sorter_config.json'
-        default_config = {
-            'language': 'zh',
-            'theme': 'auto' if darkdetect.isDark() else 'light'
-        }
-        
-        if config_path.exists():
-            try:
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    self.language = config.get('language', 'zh')
-                    self.theme_mode = config.get('theme', 'auto')
-            except:
-                self.language = 'zh'
-                self.theme_mode = 'auto'
-        else:
-            self.language = 'zh'
-            self.theme_mode = 'auto'
+        self.config = config.load_config()
+        self.language = self.config.get('language', 'zh')
+        self.theme_mode = self.config.get('theme', 'auto')
+        self.recursive = bool(self.config.get('recursive', False))
         
         # 如果是auto模式，根据系统设置
         if self.theme_mode == 'auto':
-            self.theme_mode = 'dark' if darkdetect.isDark() else 'light'
+            self.theme_mode = system_theme()
+    
+    def build_classifier(self):
+        """根据配置中的规则编译分类器"""
+        from file_organizer.classifier import Classifier, RuleError
+        
+        try:
+            self.classifier = Classifier.from_config(self.config, self.language)
+        except RuleError:
+            self.classifier = Classifier.from_config({}, self.language)
     
     def save_config(self):
         """保存用户配置"""
-        config_path = Path.home() / '.file_sorter_config.json'
-        config = {
+        config.save_config({
             'language': self.language,
-            'theme': self.theme_mode
-        }
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(config, f, ensure_ascii=False)
+            'theme': self.theme_mode,
+            'recursive': self.recursive
+        })
     
     def t(self, key):
         """获取翻译"""
@@ -146,12 +207,12 @@ class FileSorterGUI:
     def create_widgets(self):
         """创建界面"""
         # 顶部工具栏
-        top_frame = ctk.CTkFrame(self.root)
+        self.top_frame = top_frame = ctk.CTkFrame(self.root)
         top_frame.pack(fill="x", padx=10, pady=10)
         
         # 标题
-        title = ctk.CTkLabel(top_frame, text=self.t('title'), font=("微软雅黑", 20, "bold"))
-        title.pack(side="left", padx=5)
+        self.title_label = ctk.CTkLabel(top_frame, text=self.t('title'), font=("微软雅黑", 20, "bold"))
+        self.title_label.pack(side="left", padx=5)
         
         # 右侧按钮容器
         right_frame = ctk.CTkFrame(top_frame)
@@ -173,33 +234,6 @@ class FileSorterGUI:
                                        font=("微软雅黑", 12))
         self.btn_theme.pack(side="left", padx=5)
         
-        # 功能描述
-        desc_frame = ctk.CTkFrame(self.root)
-        desc_frame.pack(fill="both", padx=20, pady=5)
-        
-        desc_text = "• 📂 选择文件夹进行分类  • 🔄 支持分类和恢复操作  • ⚡ 多线程后台处理，实时进度显示  • 🎨 深浅模式切换  • 🌐 中英文语言支持"
-        if self.language == 'en':
-            desc_text = "• 📂 Select folder to sort  • 🔄 Support sort and restore  • ⚡ Multi-threaded with progress bar  • 🎨 Dark/Light theme  • 🌐 Multi-language"
-        
-        self.desc_label = ctk.CTkLabel(desc_frame, text=desc_text, 
-                                       text_color="gray", font=("微软雅黑", 14),
-                                       justify="left")
-        self.desc_label.pack(anchor="nw", padx=5, fill="both", expand=False)
-        
-        # 绑定窗口大小变化事件以更新换行宽度（只在第一次创建时绑定）
-        if not hasattr(self, '_wraplength_bound'):
-            def update_wraplength(event=None):
-                try:
-                    if hasattr(self, 'desc_label') and self.desc_label.winfo_exists():
-                        width = self.root.winfo_width() - 60  # 减去左右padding
-                        if width > 100:
-                            self.desc_label.configure(wraplength=width)
-                except:
-                    pass  # Widget已被销毁，忽略错误
-            
-            self.root.bind('<Configure>', update_wraplength)
-            self._wraplength_bound = True
-        
         # 文件夹选择区域
         select_frame = ctk.CTkFrame(self.root)
         select_frame.pack(fill="x", padx=20, pady=10)
@@ -212,13 +246,20 @@ class FileSorterGUI:
                                        text_color="gray", font=("微软雅黑", 11))
         self.path_label.pack(side="left", padx=10, fill="x", expand=True)
         
+        self.recursive_var = ctk.BooleanVar(value=self.recursive)
+        self.chk_recursive = ctk.CTkCheckBox(select_frame, text=self.t('recursive'), 
+                                             variable=self.recursive_var,
+                                             command=self.toggle_recursive,
+                                             font=("微软雅黑", 12))
+        self.chk_recursive.pack(side="right", padx=5)
+        
         # 预览区域
         preview_frame = ctk.CTkFrame(self.root)
         preview_frame.pack(padx=20, pady=10, fill="both", expand=True)
         
-        preview_label = ctk.CTkLabel(preview_frame, text=self.t('preview'), 
-                                    font=("微软雅黑", 12, "bold"))
-        preview_label.pack(anchor="w", padx=10, pady=(10, 5))
+        self.preview_label = ctk.CTkLabel(preview_frame, text=self.t('preview'), 
+                                          font=("微软雅黑", 12, "bold"))
+        self.preview_label.pack(anchor="w", padx=10, pady=(10, 5))
         
         self.preview_text = ctk.CTkTextbox(preview_frame, font=("Consolas", 10))
         self.preview_text.pack(fill="both", expand=True, padx=10, pady=(5, 10))
@@ -252,16 +293,69 @@ class FileSorterGUI:
                                      state="disabled")
         self.btn_sort.pack(side="left", padx=8)
         
+        self.btn_pause = ctk.CTkButton(action_frame, text=self.t('pause'),
+                                      command=self.toggle_pause,
+                                      font=("微软雅黑", 12), width=100,
+                                      state="disabled")
+        self.btn_pause.pack(side="left", padx=8)
+        
+        self.btn_cancel = ctk.CTkButton(action_frame, text=self.t('cancel'),
+                                       command=self.cancel_run,
+                                       font=("微软雅黑", 12), width=100,
+                                       fg_color="#9E9E9E", hover_color="#757575",
+                                       state="disabled")
+        self.btn_cancel.pack(side="left", padx=8)
+    
+    def create_secondary_widgets(self):
+        """创建说明文字与提示信息（窗口显示之后再创建，不影响启动速度）"""
+        # 功能描述
+        desc_frame = ctk.CTkFrame(self.root)
+        desc_frame.pack(fill="both", padx=20, pady=5, after=self.top_frame)
+        
+        self.desc_label = ctk.CTkLabel(desc_frame, text=self.t('description'), 
+                                       text_color="gray", font=("微软雅黑", 14),
+                                       justify="left")
+        self.desc_label.pack(anchor="nw", padx=5, fill="both", expand=False)
+        
+        # 绑定窗口大小变化事件以更新换行宽度
+        def update_wraplength(event=None):
+            try:
+                if self.desc_label.winfo_exists():
+                    width = self.root.winfo_width() - 60  # 减去左右padding
+                    if width > 100:
+                        self.desc_label.configure(wraplength=width)
+            except:
+                pass  # Widget已被销毁，忽略错误
+        
+        self.root.bind('<Configure>', update_wraplength)
+        update_wraplength()
+        
         # 提示信息
-        info = ctk.CTkLabel(self.root, text=self.t('tip'), 
-                           text_color="gray", font=("微软雅黑", 15))
-        info.pack(pady=10)
+        self.info_label = ctk.CTkLabel(self.root, text=self.t('tip'), 
+                                       text_color="gray", font=("微软雅黑", 15))
+        self.info_label.pack(pady=10)
     
     def toggle_language(self):
         """切换语言"""
+        previous = self.classifier
         self.language = 'en' if self.language == 'zh' else 'zh'
+        self.build_classifier()
         self.save_config()
-        self.refresh_ui()
+        self.relabel()
+        self._relabel_preview(previous)
+    
+    def toggle_recursive(self):
+        """切换是否包含子文件夹"""
+        self.recursive = self.recursive_var.get()
+        self.save_config()
+        if self.selected_path:
+            self.preview_classification()
+    
+    def get_walker(self):
+        """递归模式下返回遍历器，否则返回 None"""
+        from file_organizer.walker import Walker
+        
+        return Walker.from_config(self.config) if self.recursive else None
     
     def cycle_theme(self):
         """循环切换主题"""
@@ -271,7 +365,7 @@ class FileSorterGUI:
         
         # 应用主题
         if self.theme_mode == 'auto':
-            ctk.set_appearance_mode('dark' if darkdetect.isDark() else 'light')
+            ctk.set_appearance_mode(system_theme())
         else:
             ctk.set_appearance_mode(self.theme_mode)
         
@@ -283,27 +377,62 @@ class FileSorterGUI:
         theme_display = "☀️" if self.theme_mode == 'light' else "🌙" if self.theme_mode == 'dark' else "🔄"
         self.btn_theme.configure(text=theme_display)
     
-    def refresh_ui(self):
-        """刷新整个UI"""
-        # 清空窗口
-        for widget in self.root.winfo_children():
-            widget.destroy()
-        
-        # 重新创建界面
-        self.create_widgets()
-        
-        # 如果有选中的路径，重新加载预览
-        if self.selected_path and self.selected_path.exists():
-            self.path_label.configure(text=f"{self.t('selected')}: {self.selected_path}", text_color="green")
+    def relabel(self):
+        """切换语言后原地更新所有控件的文字，不重建界面"""
+        lang_display = "中文" if self.language == 'zh' else "English"
+        self.root.title(self.t('title'))
+        self.title_label.configure(text=self.t('title'))
+        self.btn_lang.configure(text=f"🌐 {lang_display}")
+        self.desc_label.configure(text=self.t('description'))
+        self.btn_select.configure(text=self.t('select_folder'))
+        if self.selected_path:
+            self.path_label.configure(text=f"{self.t('selected')}: {self.selected_path}")
+        else:
+            self.path_label.configure(text=self.t('no_folder'))
+        self.chk_recursive.configure(text=self.t('recursive'))
+        self.preview_label.configure(text=self.t('preview'))
+        self.btn_restore.configure(text=self.t('restore'))
+        self.btn_sort.configure(text=self.t('sort'))
+        self.btn_pause.configure(text=self.t('resume' if self.progress.running and self.progress.paused
+                                             else 'pause'))
+        self.btn_cancel.configure(text=self.t('cancel'))
+        self.info_label.configure(text=self.t('tip'))
+        current, total, rate, eta = self.progress.snapshot()
+        if total:
+            self._update_progress(int((current / total) * 100), current, total, rate, eta)
+        else:
+            self.progress_label.configure(text=f"{self.t('progress')}: 0%")
+    
+    def _relabel_preview(self, previous):
+        """切换语言后更新预览：只有“其他”分类的名称随语言变化，直接改名后重绘，不重新分类"""
+        if self._status_key is not None:
+            self._show_status(self._status_key)
+            return
+        if not self.selected_path:
+            return
+        result = self._preview_result
+        old, new = previous.other, self.classifier.other
+        categories = result['categories'] if result is not None else {}
+        if (result is None or not result['done'] or result.get('error')
+                or (old in categories and new in categories)
+                or (self.recursive and any((self.selected_path / name).is_dir()
+                                           for name in previous.categories ^ self.classifier.categories))):
+            # 预览尚未完成，或递归模式下要跳过的分类文件夹变了：按新分类器重新预览（使用缓存的快照）
             self.preview_classification()
-            self.btn_restore.configure(state="normal")
-            self.btn_sort.configure(state="normal")
+            return
+        categories = dict(categories)
+        if old in categories:
+            categories[new] = categories.pop(old)
+        self._preview_result = dict(result, categories=categories)
+        self._render_preview(self._preview_result)
     
     def select_folder(self):
         """选择文件夹"""
         folder = filedialog.askdirectory(title=self.t('select_folder'))
         if folder:
             self.selected_path = Path(folder)
+            # 重新选择文件夹时总是重新扫描（文件内容的变化不会反映在目录的 mtime 中）
+            self.snapshots.invalidate()
             self.path_label.configure(text=f"{self.t('selected')}: {folder}", text_color="green")
             self.preview_classification()
             self.btn_restore.configure(state="normal")
@@ -311,47 +440,71 @@ class FileSorterGUI:
     
     def get_category(self, file_path):
         """获取文件分类"""
-        ext = file_path.suffix.lower()
-        for category, extensions in FILE_CATEGORIES.items():
-            if ext in extensions:
-                return category
-        return '其他' if self.language == 'zh' else 'Other'
+        return self.classifier.classify(file_path)
     
     def preview_classification(self):
-        """预览分类"""
+        """预览分类（后台流式扫描，分批刷新文本框）"""
+        self._preview_token = token = object()
+        self._preview_result = None
         self.preview_text.delete("1.0", "end")
         
         if not self.selected_path or not self.selected_path.exists():
             self.preview_text.insert("1.0", self.t('folder_error') + "\n")
             return
         
-        category_files = {}
-        total_files = 0
-        
-        for file in self.selected_path.iterdir():
-            if file.is_file():
-                total_files += 1
-                category = self.get_category(file)
-                if category not in category_files:
-                    category_files[category] = []
-                category_files[category].append(file.name)
-        
-        self.preview_text.insert("end", self.t('folder_info').format(self.selected_path.name) + "\n")
-        self.preview_text.insert("end", self.t('total_files').format(total_files) + "\n")
-        self.preview_text.insert("end", "=" * 60 + "\n\n")
+        thread = threading.Thread(target=self._preview_thread, 
+                                  args=(token, self.selected_path, self.classifier, self.get_walker()), 
+                                  daemon=True)
+        thread.start()
+        self.root.after(PROGRESS_POLL_MS, lambda: self._poll_preview(token, None))
+    
+    def _preview_thread(self, token, path, classifier, walker):
+        """后台预览线程：只保存最新的统计结果，由界面轮询读取"""
+        from file_organizer import engine
         
-        if total_files == 0:
-            self.preview_text.insert("end", self.t('no_file_sort') + "\n")
+        try:
+            files = self.snapshots.files(path, walker, classifier.categories)
+            for result in engine.iter_preview(path, classifier=classifier, snapshot=files):
+                if token is not self._preview_token:
+                    return
+                self._preview_result = result
+        except OSError:
+            self._preview_result = {'error': True, 'done': True}
+    
+    def _poll_preview(self, token, rendered):
+        """轮询预览结果，有新结果时整体重绘一次"""
+        if token is not self._preview_token:
             return
-        
-        for category in sorted(category_files.keys()):
-            files = category_files[category]
-            self.preview_text.insert("end", self.t('category').format(category, len(files)) + "\n")
-            for file in files[:5]:
-                self.preview_text.insert("end", f"   • {file}\n")
-            if len(files) > 5:
-                self.preview_text.insert("end", self.t('more_files').format(len(files) - 5) + "\n")
-            self.preview_text.insert("end", "\n")
+        result = self._preview_result
+        if result is not None and result is not rendered:
+            self._render_preview(result)
+            rendered = result
+            if result['done']:
+                return
+        self.root.after(PROGRESS_POLL_MS, lambda: self._poll_preview(token, rendered))
+    
+    def _render_preview(self, result):
+        """把预览结果一次性写入文本框"""
+        if result.get('error'):
+            lines = [self.t('folder_error')]
+        else:
+            lines = [self.t('folder_info').format(self.selected_path.name),
+                     self.t('total_files').format(result['total']),
+                     "=" * 60, ""]
+            if not result['done']:
+                lines += [self.t('scanning'), ""]
+            elif result['total'] == 0:
+                lines.append(self.t('no_file_sort'))
+            for category in sorted(result['categories'].keys()):
+                entry = result['categories'][category]
+                lines.append(self.t('category').format(category, entry['count'], format_size(entry['size'])))
+                for file in entry['files']:
+                    lines.append(f"   • {file}")
+                if entry['count'] > len(entry['files']):
+                    lines.append(self.t('more_files').format(entry['count'] - len(entry['files'])))
+                lines.append("")
+        self.preview_text.delete("1.0", "end")
+        self.preview_text.insert("1.0", "\n".join(lines) + "\n")
     
     def sort_files(self):
         """分类文件"""
@@ -362,43 +515,87 @@ class FileSorterGUI:
         if not messagebox.askyesno("确认", self.t('confirm_sort')):
             return
         
-        self.btn_restore.configure(state="disabled")
-        self.btn_sort.configure(state="disabled")
-        self.preview_text.delete("1.0", "end")
-        self.preview_text.insert("1.0", self.t('sorting') + "\n")
+        self._set_running(True)
+        self._show_status('sorting')
         self.progress_bar.set(0)
         self.progress_label.configure(text=f"{self.t('progress')}: 0%")
         
-        thread = threading.Thread(target=self._sort_files_thread, daemon=True)
-        thread.start()
+        self.progress = Progress()
+        self.progress.start()
+        self._worker = threading.Thread(target=self._sort_files_thread, daemon=True)
+        self._worker.start()
+        self._poll_progress()
+    
+    def _show_status(self, key):
+        """整理进行中时在预览区显示状态文字"""
+        self._preview_token = None
+        self._preview_result = None
+        self._status_key = key
+        self.preview_text.delete("1.0", "end")
+        self.preview_text.insert("1.0", self.t(key) + "\n")
+    
+    def _update_snapshot(self, result, walker):
+        """用本次执行的移动更新扫描快照；续做了上次中断的运行时无法确定移动了哪些文件，丢弃快照"""
+        if result.get('resumed'):
+            self.snapshots.invalidate(self.selected_path)
+        else:
+            self.snapshots.apply(self.selected_path, result['moves'], walker)
     
+    def _run_stats(self):
+        """配置了 stats_file 时为本次运行记录统计"""
+        from file_organizer.stats import Stats
+        
+        return Stats() if self.config.get('stats_file') else None
+
+    def _write_stats(self, stats, command):
+        """把统计写入配置中的 stats_file，写入失败不影响整理结果"""
+        if stats is None:
+            return
+        try:
+            stats.write(self.config['stats_file'], {'command': command,
+                                                    'folder': str(self.selected_path)})
+        except OSError:
+            pass
+
     def _sort_files_thread(self):
         """后台分类线程"""
+        from file_organizer import engine
+        from file_organizer.collisions import CollisionResolver
+        from file_organizer.dedupe import Deduper
+        from file_organizer.executor import MoveExecutor
+        
         try:
-            total_files = sum(1 for file in self.selected_path.iterdir() if file.is_file())
+            stats = self._run_stats()
+            walker = self.get_walker()
+            result = engine.sort_folder(self.selected_path, classifier=self.classifier,
+                                        progress=self.progress,
+                                        executor=MoveExecutor.from_config(self.config),
+                                        walker=walker,
+                                        deduper=Deduper.from_config(self.config, self.language),
+                                        resolver=CollisionResolver.from_config(self.config),
+                                        stats=stats)
+            self._write_stats(stats, 'sort')
+            self._update_snapshot(result, walker)
             
-            if total_files == 0:
+            if not result['total']:
                 self.root.after(0, lambda: messagebox.showinfo("提示", self.t('no_file_sort')))
                 self.root.after(0, self._sort_buttons_enable)
                 return
             
-            sorted_count = 0
-            for file in self.selected_path.iterdir():
-                if file.is_file():
-                    category = self.get_category(file)
-                    dest_folder = self.selected_path / category
-                    dest_folder.mkdir(exist_ok=True)
-                    shutil.move(str(file), str(dest_folder / file.name))
-                    sorted_count += 1
-                    
-                    progress = int((sorted_count / total_files) * 100)
-                    self.root.after(0, lambda p=progress, c=sorted_count, t=total_files: 
-                                   self._update_progress(p, c, t))
+            sorted_count = result['moved']
             
             self.root.after(0, lambda: self._sort_complete(sorted_count))
+        except Cancelled:
+            self.snapshots.invalidate(self.selected_path)
+            if not self._closing:
+                done = self.progress.done
+                self.root.after(0, lambda: self._cancelled('cancelled_sort', done))
         except Exception as e:
+            self.snapshots.invalidate(self.selected_path)
             self.root.after(0, lambda: messagebox.showerror("错误", self.t('error_sort').format(str(e))))
             self.root.after(0, self._sort_buttons_enable)
+        finally:
+            self.progress.finish()
     
     def restore_files(self):
         """恢复文件"""
@@ -409,54 +606,71 @@ class FileSorterGUI:
         if not messagebox.askyesno("确认", self.t('confirm_restore')):
             return
         
-        self.btn_restore.configure(state="disabled")
-        self.btn_sort.configure(state="disabled")
-        self.preview_text.delete("1.0", "end")
-        self.preview_text.insert("1.0", self.t('restoring') + "\n")
+        self._set_running(True)
+        self._show_status('restoring')
         self.progress_bar.set(0)
         self.progress_label.configure(text=f"{self.t('progress')}: 0%")
         
-        thread = threading.Thread(target=self._restore_files_thread, daemon=True)
-        thread.start()
+        self.progress = Progress()
+        self.progress.start()
+        self._worker = threading.Thread(target=self._restore_files_thread, daemon=True)
+        self._worker.start()
+        self._poll_progress()
     
     def _restore_files_thread(self):
         """后台恢复线程"""
+        from file_organizer import engine
+        from file_organizer.collisions import CollisionResolver
+        from file_organizer.executor import MoveExecutor
+        
         try:
-            total_files = sum(1 for folder in self.selected_path.iterdir() 
-                            if folder.is_dir() 
-                            for file in folder.iterdir() 
-                            if file.is_file())
+            stats = self._run_stats()
+            walker = self.get_walker()
+            result = engine.restore_folder(self.selected_path, progress=self.progress,
+                                           executor=MoveExecutor.from_config(self.config),
+                                           walker=walker,
+                                           resolver=CollisionResolver.from_config(self.config),
+                                           stats=stats)
+            self._write_stats(stats, 'restore')
+            self._update_snapshot(result, walker)
             
-            if total_files == 0:
+            skipped_count = len(result.get('skipped') or ())
+            if not result['total'] and not skipped_count:
                 self.root.after(0, lambda: messagebox.showinfo("提示", self.t('no_file_restore')))
                 self.root.after(0, self._restore_buttons_enable)
                 return
             
-            restored_count = 0
-            for folder in self.selected_path.iterdir():
-                if folder.is_dir():
-                    for file in folder.iterdir():
-                        if file.is_file():
-                            shutil.move(str(file), str(self.selected_path / file.name))
-                            restored_count += 1
-                            
-                            progress = int((restored_count / total_files) * 100)
-                            self.root.after(0, lambda p=progress, c=restored_count, t=total_files: 
-                                           self._update_progress(p, c, t))
-                    try:
-                        folder.rmdir()
-                    except:
-                        pass
+            restored_count = result['moved']
             
-            self.root.after(0, lambda: self._restore_complete(restored_count))
+            self.root.after(0, lambda: self._restore_complete(restored_count, skipped_count))
+        except Cancelled:
+            self.snapshots.invalidate(self.selected_path)
+            if not self._closing:
+                done = self.progress.done
+                self.root.after(0, lambda: self._cancelled('cancelled_restore', done))
         except Exception as e:
+            self.snapshots.invalidate(self.selected_path)
             self.root.after(0, lambda: messagebox.showerror("错误", self.t('error_restore').format(str(e))))
             self.root.after(0, self._restore_buttons_enable)
+        finally:
+            self.progress.finish()
     
-    def _update_progress(self, progress, current, total):
+    def _poll_progress(self):
+        """按固定频率读取进度计数器并刷新界面，任务结束后停止轮询"""
+        running = self.progress.running
+        current, total, rate, eta = self.progress.snapshot()
+        if total:
+            self._update_progress(int((current / total) * 100), current, total, rate, eta)
+        if running:
+            self.root.after(PROGRESS_POLL_MS, self._poll_progress)
+    
+    def _update_progress(self, progress, current, total, rate=None, eta=None):
         """更新进度条"""
         self.progress_bar.set(progress / 100)
-        self.progress_label.configure(text=f"{self.t('progress')}: {progress}% ({current}/{total})")
+        text = f"{self.t('progress')}: {progress}% ({current}/{total})"
+        if rate:
+            text += "  " + self.t('rate_eta').format(rate, format_eta(eta))
+        self.progress_label.configure(text=text)
     
     def _sort_complete(self, sorted_count):
         """分类完成"""
@@ -464,21 +678,65 @@ class FileSorterGUI:
         self.preview_classification()
         self._sort_buttons_enable()
     
-    def _restore_complete(self, restored_count):
-        """恢复完成"""
-        messagebox.showinfo("完成", self.t('success_restore').format(restored_count))
+    def _restore_complete(self, restored_count, skipped_count=0):
+        """恢复完成，原位置被占用而留下的文件一并提示"""
+        message = self.t('success_restore').format(restored_count)
+        if skipped_count:
+            message += "\n" + self.t('restore_skipped').format(skipped_count)
+        messagebox.showinfo("完成", message)
         self.preview_classification()
         self._restore_buttons_enable()
     
+    def _cancelled(self, key, done):
+        """整理被取消"""
+        messagebox.showinfo("提示", self.t(key).format(done))
+        self.preview_classification()
+        self._set_running(False)
+    
     def _sort_buttons_enable(self):
         """启用按钮"""
-        self.btn_restore.configure(state="normal")
-        self.btn_sort.configure(state="normal")
+        self._set_running(False)
     
     def _restore_buttons_enable(self):
         """启用按钮"""
-        self.btn_restore.configure(state="normal")
-        self.btn_sort.configure(state="normal")
+        self._set_running(False)
+    
+    def _set_running(self, running):
+        """整理进行中时只能暂停 / 取消，结束后恢复分类 / 恢复按钮"""
+        if not running:
+            self._status_key = None
+        idle = "disabled" if running else "normal"
+        active = "normal" if running else "disabled"
+        self.btn_restore.configure(state=idle)
+        self.btn_sort.configure(state=idle)
+        self.btn_pause.configure(state=active,
+                                 text=self.t('resume' if running and self.progress.paused else 'pause'))
+        self.btn_cancel.configure(state=active)
+    
+    def toggle_pause(self):
+        """暂停 / 继续当前的整理（当前文件完成后暂停）"""
+        if self.progress.paused:
+            self.progress.resume()
+            self.btn_pause.configure(text=self.t('pause'))
+        else:
+            self.progress.pause()
+            self.btn_pause.configure(text=self.t('resume'))
+    
+    def cancel_run(self):
+        """取消当前的整理，已完成的移动保留在移动日志中，下次运行时续做"""
+        self.progress.cancel()
+        self.btn_pause.configure(state="disabled")
+        self.btn_cancel.configure(state="disabled")
+    
+    def on_close(self):
+        """关闭窗口：整理进行中时先取消，等待进行中的移动完成后再退出"""
+        if self._worker is None or not self._worker.is_alive():
+            self.root.destroy()
+            return
+        self._closing = True
+        self.progress.cancel()
+        self._worker.join(timeout=0.05)
+        self.root.after(PROGRESS_POLL_MS, self.on_close)
 
 if __name__ == "__main__":
     root = ctk.CTk()
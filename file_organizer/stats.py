@@ -0,0 +1,154 @@
+"""运行统计：各阶段耗时、文件系统操作计数、复制字节数与单个文件的移动延迟
+
+引擎与执行器在传入 Stats 时才记录，未传入时没有任何额外开销；
+开启时每个文件只多两次 perf_counter 与一次计数，在本地 tmpfs 上的开销约为百分之几，
+在真实磁盘与网络挂载上可以忽略。
+结果可以打印、导出为 JSON 或 Prometheus 文本文件（供 node_exporter 的 textfile 收集器读取），
+profiled() / traced() 用于按需开启 cProfile 与 tracemalloc。
+"""
+import json
+import os
+import threading
+import time
+from array import array
+from contextlib import contextmanager, nullcontext
+
+
+class Stats:
+    """一次运行的统计数据，可在多个线程中同时记录"""
+
+    def __init__(self):
+        self.phases = {}        # 阶段 → 累计秒数（按首次出现的顺序）
+        self.counts = {}        # 操作 → 次数
+        self.bytes_copied = 0
+        self.started = time.time()
+        self._latencies = array('d')
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """累计 with 块的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def count(self, op, n=1):
+        with self._lock:
+            self.counts[op] = self.counts.get(op, 0) + n
+
+    def copied(self, size):
+        with self._lock:
+            self.bytes_copied += size
+
+    def latency(self, seconds):
+        """记录一个文件从开始移动到完成的耗时（执行器只在调用 run() 的线程中记录，无需加锁）"""
+        self._latencies.append(seconds)
+
+    def percentile(self, p):
+        """单个文件移动延迟的 p 分位数（秒），没有记录时返回 None"""
+        values = sorted(self._latencies)
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+    def summary(self):
+        """可直接序列化为 JSON 的摘要"""
+        return {'phases': {name: round(seconds, 6) for name, seconds in self.phases.items()},
+                'counts': dict(self.counts), 'bytes_copied': self.bytes_copied,
+                'files': len(self._latencies),
+                'latency_p50': self.percentile(50), 'latency_p99': self.percentile(99)}
+
+    def format(self):
+        """多行文本摘要"""
+        lines = []
+        for name, seconds in self.phases.items():
+            lines.append(f"{name:<10}{seconds:>10.3f}s")
+        if self.counts:
+            lines.append('ops: ' + ', '.join(f"{op}={n}" for op, n in sorted(self.counts.items())))
+        if self.bytes_copied:
+            lines.append(f"copied: {self.bytes_copied} bytes")
+        p50, p99 = self.percentile(50), self.percentile(99)
+        if p50 is not None:
+            lines.append(f"per-file latency: p50 {p50 * 1000:.3f} ms, p99 {p99 * 1000:.3f} ms")
+        return '\n'.join(lines)
+
+    def prometheus(self, labels=None):
+        """Prometheus 文本格式"""
+        label = ','.join(f'{k}="{v}"' for k, v in (labels or {}).items())
+        extra = ',' + label if label else ''
+        lines = ['# TYPE file_organizer_phase_seconds gauge']
+        for name, seconds in self.phases.items():
+            lines.append(f'file_organizer_phase_seconds{{phase="{name}"{extra}}} {seconds:.6f}')
+        lines.append('# TYPE file_organizer_operations_total counter')
+        for op, n in sorted(self.counts.items()):
+            lines.append(f'file_organizer_operations_total{{op="{op}"{extra}}} {n}')
+        plain = '{' + label + '}' if label else ''
+        lines.append('# TYPE file_organizer_copied_bytes_total counter')
+        lines.append(f'file_organizer_copied_bytes_total{plain} {self.bytes_copied}')
+        lines.append('# TYPE file_organizer_file_latency_seconds summary')
+        for q in (50, 99):
+            value = self.percentile(q)
+            if value is not None:
+                lines.append(f'file_organizer_file_latency_seconds{{quantile="{q / 100}"{extra}}} '
+                             f'{value:.6f}')
+        lines.append(f'file_organizer_file_latency_seconds_count{plain} {len(self._latencies)}')
+        lines.append('# TYPE file_organizer_last_run_timestamp_seconds gauge')
+        lines.append(f'file_organizer_last_run_timestamp_seconds{plain} {self.started:.0f}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path, labels=None):
+        """导出到文件：.prom 结尾时为 Prometheus 文本格式，否则为 JSON（先写临时文件再替换）"""
+        path = os.fspath(path)
+        if path.endswith('.prom'):
+            text = self.prometheus(labels)
+        else:
+            text = json.dumps(dict(self.summary(), labels=labels or {}), ensure_ascii=False,
+                              indent=2)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+
+def phase(stats, name):
+    """stats 为 None 时返回空的上下文管理器"""
+    return stats.phase(name) if stats is not None else nullcontext()
+
+
+@contextmanager
+def profiled(path):
+    """在 with 块中开启 cProfile，结束时把结果写入 path（可用 pstats / snakeviz 查看）"""
+    if not path:
+        yield
+        return
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(os.fspath(path))
+
+
+@contextmanager
+def traced(limit, out):
+    """在 with 块中开启 tracemalloc，结束时把峰值与前 limit 个分配位置写入 out"""
+    if not limit:
+        yield
+        return
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"tracemalloc peak: {peak} bytes", file=out)
+        for stat in snapshot.statistics('lineno')[:limit]:
+            print(f"  {stat}", file=out)
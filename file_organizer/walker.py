@@ -0,0 +1,177 @@
+"""递归模式：多线程并行遍历目录树
+
+所有工作线程共享一个目录队列：每个线程取出一个目录、用 os.scandir 列举一次，
+把文件交给结果队列、把子目录放回共享队列，空闲线程随时可以接手别的线程发现的
+子目录，宽而深的目录树可以同时用上所有核心与 I/O 队列。
+支持深度限制、排除模式（匹配名称或相对路径）以及符号链接环路保护
+（默认不跟随目录符号链接；跟随时按 (st_dev, st_ino) 记录已访问目录）。
+walk() 的结果按相对路径排序，顺序与线程调度无关。
+调用方提前关闭 iter_batches() 时（取消、出错），工作线程不再开始新的 scandir，
+队列中剩余的目录直接丢弃，返回前等所有线程退出。
+"""
+import fnmatch
+import os
+import queue
+import threading
+
+from .scanner import IGNORED_NAMES, FileEntry, Snapshot
+
+
+class Walker:
+    """递归遍历选项"""
+
+    def __init__(self, max_depth=None, exclude=(), follow_symlinks=False, workers=None):
+        self.max_depth = max_depth
+        self.exclude = list(exclude)
+        self.follow_symlinks = follow_symlinks
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+
+    @classmethod
+    def from_config(cls, config):
+        """根据配置字典构建（max_depth、exclude、follow_symlinks、walk_workers）"""
+        return cls(max_depth=config.get('max_depth'), exclude=config.get('exclude', ()),
+                   follow_symlinks=config.get('follow_symlinks', False),
+                   workers=config.get('walk_workers'))
+
+    def _excluded(self, name, rel):
+        for pattern in self.exclude:
+            if fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(rel, pattern):
+                return True
+        return False
+
+    def includes(self, rel, skip_top=()):
+        """相对路径为 rel 的子目录是否在遍历范围内（深度、排除模式与 skip_top，不检查符号链接）"""
+        parts = rel.split(os.sep)
+        if parts[0] in skip_top:
+            return False
+        if self.max_depth is not None and len(parts) > self.max_depth:
+            return False
+        if self.exclude:
+            for i, name in enumerate(parts):
+                if self._excluded(name, os.sep.join(parts[:i + 1])):
+                    return False
+        return True
+
+    def iter_batches(self, root, skip_top=()):
+        """并行遍历，按目录产出 (目录项, [FileEntry]) 批次（顺序不确定）
+
+        目录项为 (相对路径, 绝对路径)；skip_top 为要跳过的顶层子目录名（如分类文件夹）。
+        """
+        root = os.fspath(root)
+        skip_top = set(skip_top)
+        work = queue.Queue()
+        results = queue.SimpleQueue()
+        visited = set()
+        lock = threading.Lock()
+        if self.follow_symlinks:
+            st = os.stat(root)
+            visited.add((st.st_dev, st.st_ino))
+        work.put((root, '', 0))
+        stop = object()
+        cancelled = threading.Event()
+
+        def scan_dir(path, rel, depth):
+            files = []
+            with os.scandir(path) as it:
+                for entry in it:
+                    if cancelled.is_set():
+                        break
+                    name = entry.name
+                    if name in IGNORED_NAMES:
+                        continue
+                    child_rel = os.path.join(rel, name) if rel else name
+                    if self.exclude and self._excluded(name, child_rel):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=self.follow_symlinks):
+                            if depth == 0 and name in skip_top:
+                                continue
+                            if self.max_depth is not None and depth >= self.max_depth:
+                                continue
+                            if self.follow_symlinks:
+                                st = entry.stat()
+                                key = (st.st_dev, st.st_ino)
+                                with lock:
+                                    if key in visited:
+                                        continue
+                                    visited.add(key)
+                            work.put((entry.path, child_rel, depth + 1))
+                        elif entry.is_file():
+                            files.append(FileEntry(name, entry.path, entry))
+                    except OSError:
+                        continue
+            return files
+
+        def worker():
+            while True:
+                item = work.get()
+                if item is stop:
+                    work.task_done()
+                    return
+                path, rel, depth = item
+                try:
+                    if cancelled.is_set():
+                        continue
+                    results.put(((rel, path), scan_dir(path, rel, depth), None))
+                except OSError as e:
+                    results.put(((rel, path), [], e))
+                finally:
+                    work.task_done()
+
+        threads = [threading.Thread(target=worker, daemon=True, name=f'fo-walk-{n}')
+                   for n in range(self.workers)]
+        for thread in threads:
+            thread.start()
+
+        def wait_all():
+            work.join()
+            results.put(None)
+
+        def drain():
+            while True:
+                try:
+                    work.get_nowait()
+                except queue.Empty:
+                    return
+                work.task_done()
+
+        waiter = threading.Thread(target=wait_all, daemon=True)
+        waiter.start()
+        try:
+            while True:
+                item = results.get()
+                if item is None:
+                    break
+                directory, files, error = item
+                if error is not None and not directory[0]:
+                    # 根目录无法读取时直接报错，子目录出错则跳过
+                    raise error
+                yield directory, files
+        finally:
+            cancelled.set()
+            drain()
+            for _ in threads:
+                work.put(stop)
+            for thread in threads:
+                thread.join()
+            # 退出前正在列举的线程可能又放入了子目录
+            drain()
+            waiter.join()
+
+    def iter_files(self, root, skip_top=()):
+        """并行遍历，流式产出所有文件（顺序不确定）"""
+        for _, files in self.iter_batches(root, skip_top):
+            yield from files
+
+    def walk(self, root, skip_top=()):
+        """并行遍历，返回按相对路径排序的快照；dirs 包含所有子目录（相对路径, 绝对路径）"""
+        root = os.fspath(root)
+        files = []
+        dirs = []
+        for directory, batch in self.iter_batches(root, skip_top):
+            if directory[0]:
+                dirs.append(directory)
+            files.extend(batch)
+        files.sort(key=lambda f: f.path)
+        dirs.sort()
+        return Snapshot(root, files, dirs)
@@ -0,0 +1,332 @@
+"""监视模式：持续整理新到达的文件
+
+只处理主文件夹顶层，每个文件在写完后才移动：
+- Linux 上使用 inotify（通过 ctypes 调用 libc），只检查发生变化的文件名；
+- 其他平台、网络挂载或 inotify 不可用时轮询：目录 mtime 变化时才重新列举顶层，
+  平时只重新 stat 尚未写完的少数文件，不会每个周期扫描整个文件夹；
+- 文件的大小与修改时间在 settle 秒内保持不变才视为写完（去抖），
+  下载中的临时文件（*.part、*.crdownload 等）直接忽略；
+- 待定文件与目录 mtime 保存在文件夹内的 .file_organizer_watch.json 中，
+  重启后不必重新扫描，已稳定的文件也不必再等待。
+每批移动都作为一次分类运行写入移动日志，可以照常撤销与续做。
+"""
+import ctypes
+import ctypes.util
+import fnmatch
+import json
+import os
+import select
+import stat
+import struct
+import sys
+import time
+
+from .collisions import POLICIES, CollisionResolver
+from .engine import default_classifier, execute, plan_sort, resume
+from .journal import Journal
+from .scanner import IGNORED_NAMES, WATCH_STATE_NAME, FileEntry, iter_files
+
+# 默认忽略的文件：隐藏文件与常见下载器的临时文件
+PARTIAL_PATTERNS = ('.*', '*.part', '*.crdownload', '*.download', '*.tmp', '~$*')
+
+# 目录 mtime 距今不足该秒数时，粗粒度时间戳可能掩盖后续变化，继续重新列举
+_MTIME_GRACE = 2.0
+
+# inotify 常量（linux/inotify.h）
+_IN_MODIFY = 0x2
+_IN_ATTRIB = 0x4
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_EVENT = struct.Struct('iIII')
+
+
+class _PollSource:
+    """轮询：只负责等待，变化由调用方比较目录 mtime 与文件 stat 得出"""
+
+    name = 'poll'
+
+    def wait(self, timeout):
+        """等待 timeout 秒，返回 None 表示不知道哪些文件变了"""
+        time.sleep(timeout)
+        return None
+
+    def close(self):
+        pass
+
+
+class _InotifySource:
+    """inotify：返回发生变化的文件名集合，事件队列溢出时返回 None"""
+
+    name = 'inotify'
+    _MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+             | _IN_CREATE | _IN_DELETE)
+
+    def __init__(self, root):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        if libc.inotify_add_watch(fd, os.fsencode(root), self._MASK) < 0:
+            err = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(err, os.strerror(err), root)
+        self.fd = fd
+
+    def wait(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        names = set()
+        overflow = False
+        while readable:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                if mask & _IN_Q_OVERFLOW:
+                    overflow = True
+                if length:
+                    names.add(os.fsdecode(data[offset:offset + length].rstrip(b'\0')))
+                offset += length
+        return None if overflow else names
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def _make_source(root, backend):
+    """backend 为 'auto'、'inotify' 或 'poll'；auto 在 inotify 不可用时回退到轮询"""
+    if backend == 'poll':
+        return _PollSource()
+    if backend == 'auto' and not sys.platform.startswith('linux'):
+        return _PollSource()
+    try:
+        return _InotifySource(root)
+    except (OSError, AttributeError):
+        if backend == 'inotify':
+            raise
+        return _PollSource()
+
+
+class Watcher:
+    """监视一个文件夹，把写完的新文件分批移动到分类文件夹"""
+
+    def __init__(self, root, language='zh', classifier=None, executor=None, settle=2.0,
+                 interval=1.0, ignore=PARTIAL_PATTERNS, backend='auto', use_journal=True,
+                 collisions='rename', index_path=None):
+        self.root = os.fspath(root)
+        self.classifier = classifier or default_classifier(language)
+        self.executor = executor
+        self.settle = settle
+        self.interval = interval
+        self.ignore = list(ignore)
+        if collisions not in POLICIES:
+            raise ValueError(f"collision policy must be one of {', '.join(POLICIES)}, not {collisions!r}")
+        self.collisions = collisions
+        self.index_path = index_path    # hash 策略使用的哈希索引
+        self.state_path = os.path.join(self.root, WATCH_STATE_NAME)
+        self.journal = Journal(self.root) if use_journal else None
+        self.pending = {}       # 文件名 → [大小, mtime_ns, 稳定起始时间]
+        self._dir_mtime = None
+        self._dirty = False
+        self._load_state()
+        self.source = _make_source(self.root, backend)
+
+    @classmethod
+    def from_config(cls, root, config, **kwargs):
+        """根据配置字典构建（watch_settle、watch_interval、watch_ignore、watch_backend、
+        collisions、dedupe_index）"""
+        kwargs.setdefault('settle', config.get('watch_settle', 2.0))
+        kwargs.setdefault('interval', config.get('watch_interval', 1.0))
+        kwargs.setdefault('ignore', config.get('watch_ignore', PARTIAL_PATTERNS))
+        kwargs.setdefault('backend', config.get('watch_backend', 'auto'))
+        kwargs.setdefault('collisions', config.get('collisions', 'rename'))
+        kwargs.setdefault('index_path', config.get('dedupe_index'))
+        return cls(root, **kwargs)
+
+    # ---- 状态持久化 ----
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self._dir_mtime = state.get('dir_mtime')
+            for name, record in state.get('pending', {}).items():
+                self.pending[name] = list(record)
+        except (OSError, ValueError, TypeError, AttributeError):
+            self._dir_mtime = None
+            self.pending = {}
+
+    def _save_state(self):
+        if not self._dirty:
+            return
+        tmp = self.state_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'dir_mtime': self._dir_mtime, 'pending': self.pending}, f,
+                      ensure_ascii=False)
+        os.replace(tmp, self.state_path)
+        self._dirty = False
+
+    # ---- 变化检测 ----
+
+    def _ignored(self, name):
+        if name in IGNORED_NAMES:
+            return True
+        for pattern in self.ignore:
+            if fnmatch.fnmatch(name, pattern):
+                return True
+        return False
+
+    def _observe(self, name, st, now):
+        """记录一次 stat 结果，大小或 mtime 变化时重新开始计时"""
+        record = self.pending.get(name)
+        if record is not None and record[0] == st.st_size and record[1] == st.st_mtime_ns:
+            return
+        # 稳定起始时间取最后一次写入或属性变化（cp -p 在最后才改 mtime，但会更新 ctime）
+        since = min(now, max(st.st_mtime, st.st_ctime))
+        self.pending[name] = [st.st_size, st.st_mtime_ns, since]
+        self._dirty = True
+
+    def _refresh(self, name, now):
+        """重新 stat 一个文件，已消失或不再是普通文件时移出待定列表"""
+        try:
+            st = os.stat(os.path.join(self.root, name))
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISREG(st.st_mode):
+            if self.pending.pop(name, None) is not None:
+                self._dirty = True
+            return None
+        self._observe(name, st, now)
+        return st
+
+    def _rescan(self, now):
+        """目录有变化时重新列举顶层文件，新文件加入待定列表；返回本次的 {文件名: stat}"""
+        st = os.stat(self.root)
+        seen = {}
+        if st.st_mtime_ns == self._dir_mtime and now - st.st_mtime >= _MTIME_GRACE:
+            return seen
+        self._dir_mtime = st.st_mtime_ns
+        self._dirty = True
+        for file in iter_files(self.root):
+            if self._ignored(file.name):
+                continue
+            try:
+                seen[file.name] = file.stat()
+            except OSError:
+                continue
+            self._observe(file.name, seen[file.name], now)
+        for name in list(self.pending):
+            if name not in seen:
+                del self.pending[name]
+        return seen
+
+    def check(self, changed=None):
+        """处理一次变化并移动已写完的文件，返回本批结果（没有可移动的文件时返回 None）
+
+        changed 为发生变化的文件名集合；为 None 时比较目录 mtime 并重新 stat 所有待定文件。
+        """
+        now = time.time()
+        if changed is None:
+            fresh = self._rescan(now)   # 本次已 stat 的文件名 → stat 结果
+            names = [name for name in self.pending if name not in fresh]
+        else:
+            fresh = {}
+            names = [name for name in changed if not self._ignored(name)]
+        for name in names:
+            fresh[name] = self._refresh(name, now)
+        ready = []
+        for name, (size, mtime_ns, since) in list(self.pending.items()):
+            if now - since < self.settle:
+                continue
+            st = fresh.get(name)
+            if st is None:
+                # 移动前再确认一次，避免去抖期间漏掉的写入（inotify 模式下未变化的文件）
+                st = self._refresh(name, now)
+                if st is None or self.pending[name][2] != since:
+                    continue
+            ready.append(FileEntry(name, os.path.join(self.root, name), stat=st))
+        result = self._sort(ready) if ready else None
+        self._save_state()
+        return result
+
+    def _sort(self, files):
+        """把一批写完的文件作为一次分类运行移动"""
+        names = {file.path: file.name for file in files}
+        moves = plan_sort(self.root, files, classifier=self.classifier)
+        # 每批只有少量文件，按需检查目标路径，不列举（可能很大的）分类文件夹；
+        # 因冲突跳过的文件留在原处，目录下次变化时重新检查
+        moves, skipped = CollisionResolver(self.collisions, listing=False,
+                                           index_path=self.index_path).resolve(moves)
+        moved = 0
+        error = None
+        done = []
+        run_id = self.journal.begin('sort', moves) if self.journal is not None else None
+
+        def on_done(i):
+            done.append(i)
+            if run_id is not None:
+                self.journal.done(run_id, i)
+
+        try:
+            moved = execute(moves, on_done=on_done, executor=self.executor)
+        except OSError as e:
+            # 已完成的移动照常记录；失败的文件留在待定列表中，settle 秒后重新尝试
+            error = str(e)
+        if run_id is not None:
+            self.journal.end(run_id)
+        # 只移出已移动与因冲突跳过的文件（"newer" 挪开的旧文件不在待定列表中）
+        for name in ([names.get(moves[i].src) for i in done]
+                     + [names.get(move.src) for move in skipped]):
+            self.pending.pop(name, None)
+        now = time.time()
+        for file in files:
+            if file.name in self.pending:
+                self.pending[file.name][2] = now
+        self._dirty = True
+        return {'folder': self.root, 'total': len(moves), 'moved': moved,
+                'moves': moves, 'skipped': skipped, 'error': error}
+
+    def _timeout(self):
+        """等待到下一个待定文件可能写完，最长 interval 秒"""
+        if not self.pending:
+            return self.interval
+        earliest = min(record[2] for record in self.pending.values())
+        return max(0.05, min(self.interval, earliest + self.settle - time.time()))
+
+    # ---- 主循环 ----
+
+    def run(self, on_batch=None, stop=None):
+        """持续监视，直到 stop（threading.Event）被设置；每移动一批调用 on_batch(结果)
+
+        启动时先续做中断的运行，再检查监视停止期间到达的文件。
+        """
+        try:
+            if self.journal is not None:
+                resume(self.root, journal=self.journal, executor=self.executor)
+            changed = None
+            while True:
+                result = self.check(changed)
+                if result is not None and on_batch:
+                    on_batch(result)
+                if stop is not None and stop.is_set():
+                    break
+                changed = self.source.wait(self._timeout())
+        finally:
+            self.close()
+
+    def close(self):
+        self.source.close()
+        self.classifier.save()
+        if self.journal is not None:
+            self.journal.close()
+        self._save_state()
@@ -0,0 +1,14 @@
+import pytest
+
+from file_organizer import config, dedupe, sniff
+
+
+@pytest.fixture(autouse=True)
+def home(tmp_path_factory, monkeypatch):
+    """测试不读写用户主目录：默认的配置、哈希索引与内容识别缓存都指向临时目录"""
+    home = tmp_path_factory.mktemp('home')
+    monkeypatch.setenv('HOME', str(home))
+    monkeypatch.setattr(config, 'CONFIG_PATH', home / '.file_sorter_config.json')
+    monkeypatch.setattr(dedupe, 'INDEX_PATH', home / '.file_sorter_hash_index.json')
+    monkeypatch.setattr(sniff, 'CACHE_PATH', home / '.file_sorter_sniff_cache.json')
+    return home
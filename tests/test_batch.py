@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+from file_organizer.batch import BatchRunner, ManifestError, build_jobs
+
+
+class Tracking(BatchRunner):
+    """记录同时进行的任务数"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.now = self.peak = 0
+        self._track = threading.Lock()
+
+    def _run_job(self, job, dry_run):
+        with self._track:
+            self.now += 1
+            self.peak = max(self.peak, self.now)
+        try:
+            time.sleep(0.05)
+            return super()._run_job(job, dry_run)
+        finally:
+            with self._track:
+                self.now -= 1
+
+
+def make_folders(tmp_path, n):
+    folders = []
+    for i in range(n):
+        folder = tmp_path / f'inbox{i}'
+        folder.mkdir()
+        (folder / f'{i}.jpg').write_text(str(i))
+        folders.append(str(folder))
+    return folders
+
+
+@pytest.mark.parametrize('limits, peak', [({}, 2), (None, 1)])
+def test_jobs_on_one_device_respect_the_device_limit(tmp_path, limits, peak):
+    folders = make_folders(tmp_path, 4)
+    if limits is None:
+        limits = {str(tmp_path): 1}
+    runner = Tracking(build_jobs({'jobs': folders}), workers=4, device_jobs=2,
+                      device_limits=limits)
+
+    report = runner.run()
+
+    assert runner.peak == peak
+    assert report['ok'] == 4 and report['moved'] == 4
+    [device] = report['devices'].values()
+    assert device['limit'] == peak and device['jobs'] == 4
+    for i in range(4):
+        assert (tmp_path / f'inbox{i}' / '图片' / f'{i}.jpg').exists()
+
+
+def test_manifest_expands_folders_and_reports_bad_jobs(tmp_path):
+    make_folders(tmp_path, 2)
+    (tmp_path / 'inbox0' / 'data.zzz').write_text('?')
+    manifest = {'defaults': {'collisions': 'skip'},
+                'jobs': [str(tmp_path / 'inbox*'),
+                         {'folder': str(tmp_path / 'inbox1'), 'collisions': 'newer'},
+                         str(tmp_path / 'missing')]}
+
+    jobs = build_jobs(manifest, {'language': 'en'})
+
+    assert [job.folder for job in jobs] == [str(tmp_path / 'inbox0'), str(tmp_path / 'inbox1'),
+                                            str(tmp_path / 'inbox1'), str(tmp_path / 'missing')]
+    assert jobs[0].config == {'language': 'en', 'collisions': 'skip'}
+    assert jobs[2].duplicate and jobs[2].config['collisions'] == 'newer'
+
+    report = BatchRunner(jobs).run()
+
+    assert [record['status'] for record in report['folders']] == ['ok', 'ok', 'skipped', 'failed']
+    assert (tmp_path / 'inbox0' / 'Other' / 'data.zzz').exists()
+    with pytest.raises(ManifestError):
+        build_jobs({'jobs': [{'folder': str(tmp_path), 'command': 'delete'}]})
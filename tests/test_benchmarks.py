@@ -0,0 +1,51 @@
+import os
+import sys
+
+import pytest
+
+# benchmarks 不是包，与直接运行脚本时一样从该目录导入
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+import bench  # noqa: E402
+import synth  # noqa: E402
+
+
+def tree(root):
+    result = {}
+    for parent, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(parent, name)
+            with open(path, 'rb') as f:
+                result[os.path.relpath(path, root)] = f.read()
+    return result
+
+
+def test_synth_tree_is_reproducible(tmp_path):
+    for name, seed in (('a', 1), ('b', 1), ('c', 2)):
+        synth.generate(tmp_path / name, 60, depth=2, fanout=2, size=(0, 256), seed=seed)
+
+    assert len(tree(tmp_path / 'a')) == 60
+    assert tree(tmp_path / 'a') == tree(tmp_path / 'b')
+    assert tree(tmp_path / 'a') != tree(tmp_path / 'c')
+    # 参数相同时复用已有的目录树，参数不同时拒绝写入非空文件夹
+    synth.generate(tmp_path / 'a', 60, depth=2, fanout=2, size=(0, 256), seed=1)
+    with pytest.raises(ValueError):
+        synth.generate(tmp_path / 'a', 60, depth=2, fanout=2, size=(0, 256), seed=3)
+
+
+def test_bench_round_restores_tree_and_compare_flags_regressions(tmp_path):
+    root = tmp_path / 'tree'
+    synth.generate(root, 80, depth=1, fanout=3, seed=0)
+    before = tree(root)
+
+    case = bench.run_case(str(root), 80, repeat=2, recursive=True, workers=2)
+
+    assert set(case['phases']) == set(bench.PHASES)
+    assert tree(root).keys() - before.keys() <= {'.file_organizer_journal.ndjson'}
+    assert {k: v for k, v in tree(root).items() if k in before} == before
+
+    params = {'files': 80}
+    slow = {'phases': {'execute': {'seconds': 1.0}}, 'params': params, 'peak_rss': None}
+    fast = {'phases': {'execute': {'seconds': 0.5}}, 'params': params, 'peak_rss': None}
+    assert bench.compare({'cases': {'80': slow}}, {'cases': {'80': fast}}, 0.2) == [
+        '80 execute: 0.500s -> 1.000s (+100%)']
+    assert bench.compare({'cases': {'80': fast}}, {'cases': {'80': slow}}, 0.2) == []
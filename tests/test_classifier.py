@@ -0,0 +1,65 @@
+import pytest
+
+from file_organizer.classifier import Classifier, RuleError
+
+
+def test_regex_rules_with_groups_are_not_merged():
+    # 同名分组与编号反向引用在合并的正则中会冲突或错位
+    classifier = Classifier([
+        {'category': 'A', 'regex': r'(?P<n>a)\d+\.log'},
+        {'category': 'B', 'regex': r'(?P<n>b)\d+\.log'},
+        {'category': 'C', 'regex': r'(x)\1\.log'},
+        {'category': 'D', 'regex': r'(y)\1\.log'},
+        {'category': 'E', 'regex': r'z+\.log'},
+        {'category': 'F', 'glob': 'Scan_*'},
+        {'category': 'G', 'regex': r'(q)\1', 'min_size': 0},
+    ])
+
+    assert classifier.classify('a1.log') == 'A'
+    assert classifier.classify('b22.log') == 'B'
+    assert classifier.classify('xx.log') == 'C'
+    assert classifier.classify('yy.log') == 'D'
+    assert classifier.classify('zzz.log') == 'E'
+    assert classifier.classify('scan_001.pdf') == 'F'
+    assert classifier.classify('xy.log') == '其他'
+
+
+def test_first_rule_wins_across_merged_and_separate_patterns():
+    classifier = Classifier([
+        {'category': 'first', 'regex': r'(r)\d+\.txt'},
+        {'category': 'second', 'regex': r'r\d+\.txt'},
+    ])
+
+    assert classifier.classify('r1.txt') == 'first'
+
+
+def test_user_rules_in_config_order_then_builtin_categories(tmp_path):
+    big = tmp_path / 'big.log'
+    big.write_bytes(b'x' * 2048)
+    small = tmp_path / 'small.log'
+    small.write_bytes(b'x')
+    classifier = Classifier([
+        {'category': '备份', 'suffix': ['tar.gz', '.bak']},
+        {'category': '扫描件', 'glob': 'Scan_*.pdf'},
+        {'category': '大日志', 'suffix': '.log', 'min_size': 1024},
+        {'category': '日志', 'suffix': '.log'},
+        {'category': '发票', 'regex': r'invoice-\d{4}\.pdf'},
+    ])
+
+    assert classifier.classify('site.TAR.GZ') == '备份'
+    assert classifier.classify('old.bak') == '备份'
+    assert classifier.classify('scan_0001.PDF') == '扫描件'
+    assert classifier.classify(str(big)) == '大日志'
+    assert classifier.classify(str(small)) == '日志'
+    assert classifier.classify('invoice-2024.pdf') == '发票'
+    assert classifier.classify('report.pdf') == '文本'
+    assert classifier.classify('archive.gz') == '压缩包'
+    assert classifier.classify('.bashrc') == '其他'
+
+
+def test_invalid_rules_are_rejected():
+    for rules in ([{'suffix': '.x'}], [{'category': 'A'}],
+                  [{'category': 'A', 'suffix': '.x', 'glob': '*.x'}],
+                  [{'category': 'A', 'regex': '('}]):
+        with pytest.raises(RuleError):
+            Classifier(rules)
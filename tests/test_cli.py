@@ -0,0 +1,48 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+GUI_MODULES = ('tkinter', 'customtkinter', 'darkdetect')
+
+
+def run_cli(*args):
+    # 在新进程中运行，检查命令行只导入标准库与本项目的模块
+    code = ("import json, sys\n"
+            "from file_organizer.cli import main\n"
+            f"code = main({list(args)!r})\n"
+            f"print(json.dumps(sorted(m for m in sys.modules if m.split('.')[0] in {GUI_MODULES!r})))\n"
+            "sys.exit(code)\n")
+    proc = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=dict(os.environ),
+                          capture_output=True, text=True, check=True)
+    *output, loaded = proc.stdout.splitlines()
+    assert json.loads(loaded) == []
+    return json.loads('\n'.join(output))
+
+
+def test_headless_preview_dry_run_sort_and_restore(tmp_path):
+    (tmp_path / 'photo.jpg').write_bytes(b'jpg')
+    (tmp_path / 'notes.txt').write_bytes(b'txt')
+    (tmp_path / 'data.xyz').write_bytes(b'???')
+
+    preview = run_cli('preview', str(tmp_path), '--json')
+    assert preview['total'] == 3
+    assert {name: entry['count'] for name, entry in preview['categories'].items()} == {
+        '图片': 1, '文本': 1, '其他': 1}
+
+    planned = run_cli('sort', str(tmp_path), '--dry-run', '--json')
+    assert planned['moved'] == 0 and planned['total'] == 3
+    assert (tmp_path / 'photo.jpg').exists()
+
+    result = run_cli('sort', str(tmp_path), '--json')
+    assert result['moved'] == 3
+    assert (tmp_path / '图片' / 'photo.jpg').read_bytes() == b'jpg'
+    assert (tmp_path / '其他' / 'data.xyz').exists()
+
+    result = run_cli('restore', str(tmp_path), '--json')
+    assert result['moved'] == 3
+    assert sorted(p.name for p in tmp_path.iterdir() if not p.name.startswith('.')) == [
+        'data.xyz', 'notes.txt', 'photo.jpg']
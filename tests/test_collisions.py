@@ -0,0 +1,100 @@
+import json
+import os
+
+import pytest
+
+from file_organizer import dedupe, engine
+from file_organizer.cache import get_cache, metadata_key
+from file_organizer.collisions import CollisionResolver
+from file_organizer.engine import Move
+from file_organizer.pipeline import PipelineExecutor, stream_sort_folder
+
+
+def write(path, data, mtime):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.mark.parametrize('pipeline', [False, True])
+def test_newer_keeps_replaced_file_and_undo_restores_it(tmp_path, pipeline):
+    write(tmp_path / '图片' / 'a.jpg', b'OLD', 1_000_000)
+    write(tmp_path / 'a.jpg', b'NEW', 2_000_000)
+
+    if pipeline:
+        result = stream_sort_folder(tmp_path, executor=PipelineExecutor(),
+                                    resolver=CollisionResolver('newer'))
+    else:
+        result = engine.sort_folder(tmp_path, resolver=CollisionResolver('newer'))
+
+    assert [(move.src, move.dest) for move in result['moves']] == [
+        (str(tmp_path / '图片' / 'a.jpg'), str(tmp_path / '图片' / 'a (replaced).jpg')),
+        (str(tmp_path / 'a.jpg'), str(tmp_path / '图片' / 'a.jpg')),
+    ]
+
+    assert (tmp_path / '图片' / 'a.jpg').read_bytes() == b'NEW'
+    assert (tmp_path / '图片' / 'a (replaced).jpg').read_bytes() == b'OLD'
+    assert not (tmp_path / 'a.jpg').exists()
+
+    result = engine.restore_folder(tmp_path, executor=PipelineExecutor() if pipeline else None)
+
+    assert result['skipped'] == []
+    assert (tmp_path / 'a.jpg').read_bytes() == b'NEW'
+    assert (tmp_path / '图片' / 'a.jpg').read_bytes() == b'OLD'
+    assert not (tmp_path / '图片' / 'a (replaced).jpg').exists()
+
+
+def test_newer_leaves_older_source_in_place(tmp_path):
+    write(tmp_path / '图片' / 'a.jpg', b'NEW', 2_000_000)
+    write(tmp_path / 'a.jpg', b'OLD', 1_000_000)
+
+    result = engine.sort_folder(tmp_path, resolver=CollisionResolver('newer'))
+
+    assert [move.src for move in result['skipped']] == [str(tmp_path / 'a.jpg')]
+    assert (tmp_path / 'a.jpg').read_bytes() == b'OLD'
+    assert (tmp_path / '图片' / 'a.jpg').read_bytes() == b'NEW'
+
+
+def test_hash_policy_uses_configured_index(tmp_path, monkeypatch):
+    default_index = tmp_path.parent / f'{tmp_path.name}-default-index.json'
+    monkeypatch.setattr(dedupe, 'INDEX_PATH', default_index)
+    index_path = tmp_path.parent / f'{tmp_path.name}-index.json'
+    write(tmp_path / '图片' / 'a.jpg', b'SAME', 1_000_000)
+    write(tmp_path / 'a.jpg', b'SAME', 2_000_000)
+    keys = {metadata_key(os.stat(tmp_path / 'a.jpg')), metadata_key(os.stat(tmp_path / '图片' / 'a.jpg'))}
+
+    resolver = CollisionResolver.from_config({'collisions': 'hash', 'dedupe_index': str(index_path)})
+    result = engine.sort_folder(tmp_path, use_journal=False, resolver=resolver)
+    for path in (index_path, default_index):
+        get_cache(path).save()
+
+    assert [move.src for move in result['skipped']] == [str(tmp_path / 'a.jpg')]
+    assert set(json.loads(index_path.read_text())) == keys
+    assert not default_index.exists()
+
+
+def test_rename_numbers_past_existing_files(tmp_path):
+    write(tmp_path / '图片' / 'a.jpg', b'existing', 1_000_000)
+    write(tmp_path / '图片' / 'a (1).jpg', b'existing 1', 1_000_000)
+    write(tmp_path / 'a.jpg', b'new', 1_000_000)
+
+    result = engine.sort_folder(tmp_path)
+
+    assert result['skipped'] == []
+    assert (tmp_path / '图片' / 'a.jpg').read_bytes() == b'existing'
+    assert (tmp_path / '图片' / 'a (1).jpg').read_bytes() == b'existing 1'
+    assert (tmp_path / '图片' / 'a (2).jpg').read_bytes() == b'new'
+
+
+def test_rename_numbers_names_planned_in_earlier_batches(tmp_path):
+    # 同一个解析器跨批次使用（流水线模式），本次已分配的名称同样算作占用
+    write(tmp_path / 'dest' / 'a.jpg', b'existing', 1_000_000)
+    dest = str(tmp_path / 'dest' / 'a.jpg')
+    resolver = CollisionResolver()
+
+    first, _ = resolver.resolve([Move(str(tmp_path / 'x' / 'a.jpg'), dest, '图片'),
+                                 Move(str(tmp_path / 'y' / 'a.jpg'), dest, '图片')])
+    second, _ = resolver.resolve([Move(str(tmp_path / 'z' / 'a.jpg'), dest, '图片')])
+
+    assert [os.path.basename(move.dest) for move in first + second] == [
+        'a (1).jpg', 'a (2).jpg', 'a (3).jpg']
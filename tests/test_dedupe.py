@@ -0,0 +1,81 @@
+import os
+
+from file_organizer import engine
+from file_organizer.dedupe import Deduper
+from file_organizer.engine import Move
+from file_organizer.executor import MoveExecutor
+
+
+def write(path, data, mtime=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_hardlink_follows_renamed_keeper(tmp_path):
+    # 保留文件因同名冲突改名后，重复文件必须链接到改名后的文件，而不是原位置上的旧文件
+    write(tmp_path / '图片' / 'a.jpg', b'OLD')
+    write(tmp_path / 'a.jpg', b'NEW', mtime=1_000_000)
+    write(tmp_path / 'b.jpg', b'NEW', mtime=2_000_000)
+    deduper = Deduper('hardlink', index_path=tmp_path.parent / f'{tmp_path.name}-index.json')
+
+    result = engine.sort_folder(tmp_path, use_journal=False, deduper=deduper)
+
+    assert (tmp_path / '图片' / 'a.jpg').read_bytes() == b'OLD'
+    assert (tmp_path / '图片' / 'a (1).jpg').read_bytes() == b'NEW'
+    assert (tmp_path / '图片' / 'b.jpg').read_bytes() == b'NEW'
+    assert os.path.samefile(tmp_path / '图片' / 'b.jpg', tmp_path / '图片' / 'a (1).jpg')
+    assert [move.dest for move in result['duplicates']] == [str(tmp_path / '图片' / 'a (1).jpg')]
+
+
+def test_link_to_unexpected_file_falls_back_to_move(tmp_path):
+    # 链接目标已被替换成另一个文件时不删除源文件，改为普通移动
+    keep = write(tmp_path / 'keep.jpg', b'NEW')
+    dup = write(tmp_path / 'dup.jpg', b'NEW')
+    key = f"{os.stat(keep).st_dev}:{os.stat(keep).st_ino}:3:0"
+    dest = tmp_path / 'out' / 'dup.jpg'
+
+    MoveExecutor().run([Move(str(dup), str(dest), 'x', link=str(keep), link_key=key)])
+
+    assert dest.read_bytes() == b'NEW'
+    assert not os.path.samefile(dest, keep)
+    assert not dup.exists()
+
+
+def test_undo_breaks_hardlinks(tmp_path):
+    write(tmp_path / 'a.jpg', b'SAME', mtime=1_000_000)
+    write(tmp_path / 'b.jpg', b'SAME', mtime=2_000_000)
+    deduper = Deduper('hardlink', index_path=tmp_path.parent / f'{tmp_path.name}-index.json')
+    engine.sort_folder(tmp_path, deduper=deduper)
+    assert os.path.samefile(tmp_path / '图片' / 'a.jpg', tmp_path / '图片' / 'b.jpg')
+
+    engine.restore_folder(tmp_path)
+
+    assert not os.path.samefile(tmp_path / 'a.jpg', tmp_path / 'b.jpg')
+    assert os.stat(tmp_path / 'a.jpg').st_nlink == 1
+    assert os.stat(tmp_path / 'b.jpg').st_nlink == 1
+    (tmp_path / 'b.jpg').write_bytes(b'EDITED')
+    assert (tmp_path / 'a.jpg').read_bytes() == b'SAME'
+    assert not (tmp_path / '图片').exists()
+
+
+def test_duplicates_of_sorted_files_are_skipped_or_moved_aside(tmp_path):
+    index_path = tmp_path.parent / f'{tmp_path.name}-index.json'
+    write(tmp_path / '图片' / 'kept.jpg', b'PHOTO')
+    write(tmp_path / 'copy.jpg', b'PHOTO')
+    write(tmp_path / 'other.jpg', b'OTHER')     # 大小相同、内容不同
+    write(tmp_path / 'notes.txt', b'PHOTO')     # 内容相同也算重复，与分类无关
+
+    result = engine.sort_folder(tmp_path, deduper=Deduper('skip', index_path=index_path))
+
+    assert sorted(os.path.basename(move.src) for move in result['duplicates']) == ['copy.jpg', 'notes.txt']
+    assert (tmp_path / 'copy.jpg').exists() and (tmp_path / 'notes.txt').exists()
+    assert (tmp_path / '图片' / 'other.jpg').read_bytes() == b'OTHER'
+
+    result = engine.sort_folder(tmp_path, deduper=Deduper('move', index_path=index_path))
+
+    assert sorted(p.name for p in (tmp_path / '重复文件').iterdir()) == ['copy.jpg', 'notes.txt']
+    assert sorted(p.name for p in (tmp_path / '图片').iterdir()) == ['kept.jpg', 'other.jpg']
+    assert not (tmp_path / '文本').exists()
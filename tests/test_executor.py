@@ -0,0 +1,46 @@
+import os
+
+from file_organizer.engine import Move
+from file_organizer.executor import MoveExecutor
+from file_organizer.stats import Stats
+
+
+class TwoDevices(MoveExecutor):
+    """把 remote 下的目录当作另一个设备，跨设备的移动走复制路径"""
+
+    def __init__(self, remote, **kwargs):
+        super().__init__(**kwargs)
+        self.remote = os.fspath(remote)
+
+    def _device(self, directory):
+        return 2 if directory.startswith(self.remote) else 1
+
+
+def test_renames_on_one_device_and_copies_across_devices(tmp_path):
+    local = tmp_path / 'local'
+    remote = tmp_path / 'remote'
+    local.mkdir()
+    big = os.urandom(5000)
+    (local / 'big.bin').write_bytes(big)
+    (local / 'small.txt').write_bytes(b'small')
+    (local / 'here.txt').write_bytes(b'here')
+    for name in ('big.bin', 'small.txt'):
+        os.utime(local / name, (1_000_000, 1_000_000))
+    moves = [Move(str(local / 'big.bin'), str(remote / '其他' / 'big.bin'), '其他'),
+             Move(str(local / 'small.txt'), str(remote / '文本' / 'small.txt'), '文本'),
+             Move(str(local / 'here.txt'), str(local / '文本' / 'here.txt'), '文本')]
+    done = []
+    stats = Stats()
+
+    executor = TwoDevices(remote, workers=2, chunk_size=1024, parallel_threshold=2048)
+    moved = executor.run(moves, on_done=done.append, stats=stats)
+
+    assert moved == 3 and sorted(done) == [0, 1, 2]
+    assert (remote / '其他' / 'big.bin').read_bytes() == big
+    assert (remote / '文本' / 'small.txt').read_bytes() == b'small'
+    assert (local / '文本' / 'here.txt').read_bytes() == b'here'
+    assert os.stat(remote / '其他' / 'big.bin').st_mtime == 1_000_000
+    assert sorted(p.name for p in local.iterdir()) == ['文本']
+    assert not list(remote.rglob('*.fo-partial'))
+    assert stats.counts['copy'] == 2 and stats.counts['rename'] == 1
+    assert stats.bytes_copied == len(big) + len(b'small')
@@ -0,0 +1,110 @@
+import pytest
+
+from file_organizer import engine
+from file_organizer.engine import Move
+from file_organizer.executor import MoveExecutor
+from file_organizer.journal import JOURNAL_NAME, Journal
+from file_organizer.progress import Cancelled
+
+
+def test_executor_never_overwrites(tmp_path):
+    src = tmp_path / 'a.txt'
+    dest = tmp_path / '文本' / 'a.txt'
+    src.write_text('new')
+    dest.parent.mkdir()
+    dest.write_text('user')
+
+    with pytest.raises(FileExistsError):
+        MoveExecutor().run([Move(str(src), str(dest), '文本')])
+
+    assert src.read_text() == 'new'
+    assert dest.read_text() == 'user'
+
+
+def test_resume_keeps_file_created_at_pending_destination(tmp_path):
+    for name in ('a.txt', 'b.txt', 'c.txt'):
+        (tmp_path / name).write_text(name)
+
+    def cancel_after_first(done, total):
+        if done >= 1:
+            raise Cancelled()
+
+    with pytest.raises(Cancelled):
+        engine.sort_folder(tmp_path, progress=cancel_after_first)
+    pending = sorted(p.name for p in tmp_path.glob('*.txt'))
+    assert len(pending) == 2
+    (tmp_path / '文本' / pending[0]).write_text('user')
+
+    result = engine.sort_folder(tmp_path)
+
+    assert result['resumed']['conflicts'] == 1
+    assert (tmp_path / '文本' / pending[0]).read_text() == 'user'
+    stem = pending[0][:-len('.txt')]
+    assert (tmp_path / '文本' / f'{stem} (1).txt').read_text() == pending[0]
+    assert (tmp_path / '文本' / pending[1]).read_text() == pending[1]
+    assert not list(tmp_path.glob('*.txt'))
+
+
+def test_skipped_undo_entries_stay_undoable(tmp_path):
+    (tmp_path / 'a.jpg').write_text('first')
+    engine.sort_folder(tmp_path)
+    (tmp_path / 'a.jpg').write_text('second')
+    engine.sort_folder(tmp_path)
+
+    result = engine.restore_folder(tmp_path)
+
+    # 两个文件都想回到 a.jpg：较新的一次先恢复，较早的那个留在分类文件夹中
+    assert result['moved'] == 1
+    assert [move.src for move in result['skipped']] == [str(tmp_path / '图片' / 'a.jpg')]
+    assert (tmp_path / 'a.jpg').read_text() == 'second'
+    assert Journal(tmp_path).undoable()
+
+    (tmp_path / 'a.jpg').rename(tmp_path / 'kept.jpg')
+    result = engine.restore_folder(tmp_path)
+
+    assert result['moved'] == 1 and result['skipped'] == []
+    assert (tmp_path / 'a.jpg').read_text() == 'first'
+    assert not (tmp_path / '图片').exists()
+    assert not Journal(tmp_path).undoable()
+    assert (tmp_path / JOURNAL_NAME).read_text() == ''
+
+
+def test_files_gone_from_category_do_not_block_clearing(tmp_path):
+    (tmp_path / 'a.jpg').write_text('a')
+    (tmp_path / 'b.jpg').write_text('b')
+    engine.sort_folder(tmp_path)
+    (tmp_path / '图片' / 'b.jpg').unlink()
+
+    result = engine.restore_folder(tmp_path)
+
+    assert result['moved'] == 1 and result['lost'] == 1 and result['skipped'] == []
+    assert (tmp_path / 'a.jpg').read_text() == 'a'
+    assert (tmp_path / JOURNAL_NAME).read_text() == ''
+
+
+def test_interrupted_sort_resumes_and_undo_touches_only_moved_files(tmp_path):
+    for i in range(10):
+        (tmp_path / f'{i}.txt').write_text(str(i))
+    (tmp_path / '文本').mkdir()
+    (tmp_path / '文本' / 'mine.txt').write_text('already here')
+
+    def cancel_after_four(done, total):
+        if done >= 4:
+            raise Cancelled()
+
+    with pytest.raises(Cancelled):
+        engine.sort_folder(tmp_path, progress=cancel_after_four)
+    assert len(list(tmp_path.glob('*.txt'))) == 6
+    assert Journal(tmp_path).interrupted() is not None
+
+    result = engine.resume(tmp_path)
+
+    assert result['kind'] == 'sort' and result['moved'] == 6
+    assert not list(tmp_path.glob('*.txt'))
+    assert Journal(tmp_path).interrupted() is None
+
+    result = engine.restore_folder(tmp_path)
+
+    assert result['moved'] == 10
+    assert sorted(p.name for p in tmp_path.glob('*.txt')) == sorted(f'{i}.txt' for i in range(10))
+    assert [p.name for p in (tmp_path / '文本').iterdir()] == ['mine.txt']
@@ -0,0 +1,55 @@
+import os
+import threading
+
+from file_organizer.collisions import CollisionResolver
+from file_organizer.pipeline import LatencyFS, PipelineExecutor, stream_sort_folder
+from file_organizer.stats import Stats
+
+
+class RecordingFS(LatencyFS):
+    """记录每次重命名的开始与结束顺序"""
+
+    def __init__(self, delay):
+        super().__init__(delay)
+        self.events = []
+        self._lock = threading.Lock()
+
+    def rename(self, src, dest):
+        with self._lock:
+            self.events.append(('start', src, dest))
+        super().rename(src, dest)
+        with self._lock:
+            self.events.append(('end', src, dest))
+
+
+def write(path, data, mtime):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    os.utime(path, (mtime, mtime))
+
+
+def test_pipeline_on_slow_mount_moves_everything_and_waits_for_aside_moves(tmp_path):
+    for i in range(200):
+        write(tmp_path / f'{i}.txt', b'%d' % i, 1_000_000)
+    for i in range(20):
+        write(tmp_path / '图片' / f'{i}.jpg', b'OLD', 1_000_000)
+        write(tmp_path / f'{i}.jpg', b'NEW', 2_000_000)
+    fs = RecordingFS(0.005)
+    stats = Stats()
+
+    result = stream_sort_folder(tmp_path, executor=PipelineExecutor(inflight=16, fs=fs),
+                                resolver=CollisionResolver('newer'), batch=32, stats=stats)
+
+    assert result['moved'] == result['total'] == 240 and result['skipped'] == []
+    assert sorted(p.name for p in tmp_path.iterdir() if p.is_file()) == ['.file_organizer_journal.ndjson']
+    assert len(list((tmp_path / '文本').iterdir())) == 200
+    for i in range(20):
+        assert (tmp_path / '图片' / f'{i}.jpg').read_bytes() == b'NEW'
+        assert (tmp_path / '图片' / f'{i} (replaced).jpg').read_bytes() == b'OLD'
+    assert stats.counts['rename'] == 240
+    # 旧文件改名移开完成之后，新文件才开始移入同一路径
+    position = {event: n for n, event in enumerate(fs.events)}
+    for i in range(20):
+        kept = str(tmp_path / '图片' / f'{i}.jpg')
+        aside = ('end', kept, str(tmp_path / '图片' / f'{i} (replaced).jpg'))
+        assert position[aside] < position[('start', str(tmp_path / f'{i}.jpg'), kept)]
@@ -0,0 +1,20 @@
+from file_organizer import engine
+
+
+def test_streaming_preview_keeps_only_the_largest_samples(tmp_path):
+    for i in range(600):
+        (tmp_path / f'{i:03d}.txt').write_bytes(b'x' * i)
+    (tmp_path / 'a.jpg').write_bytes(b'jpg')
+
+    results = list(engine.iter_preview(tmp_path, sample=3, interval=0))
+
+    partial = results[:-1]
+    assert partial and all(not r['done'] for r in partial)
+    assert [r['total'] for r in partial] == sorted(r['total'] for r in partial)
+    final = results[-1]
+    assert final['done'] and final['total'] == 601
+    assert final['size'] == sum(range(600)) + 3
+    text = final['categories']['文本']
+    assert text['count'] == 600 and text['size'] == sum(range(600))
+    assert text['files'] == ['599.txt', '598.txt', '597.txt']
+    assert final['categories']['图片'] == {'count': 1, 'size': 3, 'files': ['a.jpg']}
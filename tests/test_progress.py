@@ -0,0 +1,79 @@
+import threading
+import time
+
+from file_organizer import engine
+from file_organizer.progress import Cancelled, Progress, format_eta, format_size
+
+
+def test_engine_updates_shared_counter(tmp_path):
+    for i in range(20):
+        (tmp_path / f'{i}.txt').write_text(str(i))
+    seen = []
+
+    class Recording(Progress):
+        def __call__(self, done, total):
+            seen.append((done, total))
+            super().__call__(done, total)
+
+    progress = Recording()
+    engine.sort_folder(tmp_path, progress=progress)
+    progress.finish()
+
+    done, total, rate, eta = progress.snapshot()
+    assert (done, total) == (20, 20)
+    assert rate > 0 and eta == 0
+    assert seen[-1] == (20, 20)
+    assert all(a[0] <= b[0] for a, b in zip(seen, seen[1:]))
+
+
+def test_formatting():
+    assert format_eta(None) == '--:--'
+    assert format_eta(65) == '1:05'
+    assert format_eta(3725) == '1:02:05'
+    assert format_size(512) == '512 B'
+    assert format_size(1536) == '1.5 KB'
+
+
+def test_pause_holds_moves_and_cancelled_run_continues_later(tmp_path):
+    for i in range(20):
+        (tmp_path / f'{i}.txt').write_text(str(i))
+
+    class PauseAtFive(Progress):
+        def __call__(self, done, total):
+            if done >= 5 and not self.cancelled:
+                self.pause()
+            super().__call__(done, total)
+
+    def remaining():
+        return len(list(tmp_path.glob('*.txt')))
+
+    progress = PauseAtFive()
+    errors = []
+
+    def run():
+        try:
+            engine.sort_folder(tmp_path, progress=progress)
+        except Cancelled as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not progress.paused and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert progress.paused
+    time.sleep(0.05)
+    left = remaining()
+    time.sleep(0.2)
+    assert remaining() == left and 0 < left <= 15
+
+    progress.cancel()
+    thread.join(5)
+
+    assert not thread.is_alive() and len(errors) == 1
+    assert remaining() == left
+
+    result = engine.sort_folder(tmp_path)
+
+    assert result['resumed']['moved'] == left
+    assert remaining() == 0 and len(list((tmp_path / '文本').iterdir())) == 20
@@ -0,0 +1,26 @@
+import os
+
+from file_organizer import engine
+from file_organizer.journal import JOURNAL_NAME
+from file_organizer.scanner import scan
+
+
+def test_one_listing_serves_count_preview_and_plan(tmp_path, monkeypatch):
+    for name in ('a.jpg', 'b.txt', 'c.mp3'):
+        (tmp_path / name).write_bytes(name.encode())
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / JOURNAL_NAME).write_text('')
+    listed = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, 'scandir', lambda path: listed.append(path) or scandir(path))
+
+    snapshot = scan(tmp_path)
+    preview = engine.preview(tmp_path, snapshot=snapshot)
+    moves = engine.plan_sort(tmp_path, snapshot)
+
+    assert listed == [str(tmp_path)]
+    assert len(snapshot) == 3
+    assert snapshot.dirs == [('sub', str(tmp_path / 'sub'))]
+    assert preview['total'] == 3
+    assert sorted(os.path.relpath(move.dest, tmp_path) for move in moves) == [
+        os.path.join('图片', 'a.jpg'), os.path.join('文本', 'b.txt'), os.path.join('音频', 'c.mp3')]
@@ -0,0 +1,51 @@
+from file_organizer import engine
+from file_organizer.snapshots import SnapshotCache
+from file_organizer.walker import Walker
+
+
+def paths(files):
+    return sorted(file.path for file in files)
+
+
+def test_snapshot_is_reused_until_a_directory_changes(tmp_path):
+    (tmp_path / 'a.jpg').write_text('a')
+    cache = SnapshotCache()
+
+    first = paths(cache.files(tmp_path))
+
+    assert cache.get(tmp_path) is not None
+    assert paths(cache.files(tmp_path)) == first == [str(tmp_path / 'a.jpg')]
+
+    (tmp_path / 'b.txt').write_text('b')
+    assert cache.get(tmp_path) is None
+    assert paths(cache.files(tmp_path)) == [str(tmp_path / 'a.jpg'), str(tmp_path / 'b.txt')]
+
+    cache.invalidate(tmp_path)
+    assert cache.get(tmp_path) is None
+
+
+def test_applied_moves_match_a_fresh_scan(tmp_path):
+    for rel in ('a.jpg', 'x/b.txt', 'x/y/c.pdf'):
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(rel)
+    walker = Walker(workers=2)
+    classifier = engine.default_classifier('zh')
+    cache = SnapshotCache()
+
+    def fresh():
+        return paths(walker.walk(tmp_path, skip_top=classifier.categories).files)
+
+    list(cache.files(tmp_path, walker, classifier.categories))
+    result = engine.sort_folder(tmp_path, walker=walker)
+    cache.apply(tmp_path, result['moves'], walker)
+
+    # 移空的子文件夹已被删除，快照中不再有任何文件，且不需要重新扫描
+    assert paths(cache.get(tmp_path, walker, classifier.categories)) == fresh() == []
+
+    result = engine.restore_folder(tmp_path)
+    cache.apply(tmp_path, result['moves'], walker)
+
+    restored = cache.get(tmp_path, walker, classifier.categories)
+    assert paths(restored) == fresh() == sorted(str(tmp_path / rel) for rel in
+                                                ('a.jpg', 'x/b.txt', 'x/y/c.pdf'))
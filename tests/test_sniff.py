@@ -0,0 +1,90 @@
+from file_organizer.classifier import Classifier
+from file_organizer.sniff import Sniffer, detect, identify
+
+# MPEG-1 Layer III，128 kbps，44.1 kHz：帧长 417 字节
+FRAME = b'\xff\xfb\x90\x00'
+
+
+def pe_head():
+    head = bytearray(512)
+    head[:2] = b'MZ'
+    head[0x3c:0x40] = (0x80).to_bytes(4, 'little')
+    head[0x80:0x84] = b'PE\x00\x00'
+    return bytes(head)
+
+
+def test_mz_requires_pe_header():
+    assert detect(b'MZ is a nice abbreviation for my notes\n') == '.txt'
+    assert identify(pe_head()) == ('.exe', True)
+
+
+def test_mp3_frame_sync():
+    two_frames = FRAME + bytes(413) + FRAME + bytes(91)
+    assert identify(two_frames) == ('.mp3', True)
+    assert identify(FRAME + bytes(100)) == ('.mp3', False)
+    assert detect(FRAME + bytes(508)) != '.mp3'
+    assert detect(b'\xff\xfb\xf0\x00' + bytes(100)) is None
+
+
+def test_weak_signatures_do_not_override_extension(tmp_path):
+    classifier = Classifier(sniffer=Sniffer('all', cache_path=tmp_path / 'sniff.json'))
+    (tmp_path / 'notes.txt').write_bytes(b'MZ notes\n')
+    (tmp_path / 'frame.txt').write_bytes(FRAME + bytes(100))
+    (tmp_path / 'song').write_bytes(FRAME + bytes(100))
+    (tmp_path / 'setup.txt').write_bytes(pe_head())
+
+    assert classifier.classify(tmp_path / 'notes.txt') == '文本'
+    assert classifier.classify(tmp_path / 'frame.txt') == '文本'
+    assert classifier.classify(tmp_path / 'song') == '音频'
+    assert classifier.classify(tmp_path / 'setup.txt') == '程序'
+
+
+def test_batched_prefetch_reuses_pool_and_bounds_cache_writes(tmp_path, monkeypatch):
+    # 流水线每批调用一次 prefetch：不应每批都新建线程池并整体重写缓存
+    import json
+    from file_organizer.scanner import iter_files
+
+    cache_path = tmp_path / 'sniff.json'
+    sniffer = Sniffer('unknown', cache_path=cache_path, batch=4)
+    written = []
+    save = sniffer.cache.save
+    monkeypatch.setattr(sniffer.cache, 'save', lambda: (written.append(len(sniffer.cache)), save()))
+    src = tmp_path / 'src'
+    src.mkdir()
+    for i in range(200):
+        (src / f'file{i}').write_bytes(b'%PDF-1.4 ' + bytes([i]))
+    files = list(iter_files(src))
+
+    pools = set()
+    for start in range(0, len(files), 8):
+        assert len(list(sniffer.prefetch(files[start:start + 8]))) == len(files[start:start + 8])
+        pools.add(id(sniffer._pool))
+    sniffer.close()
+
+    assert len(pools) == 1
+    assert sum(written) <= 3 * len(files)
+    assert len(json.loads(cache_path.read_text())) == len(files)
+
+
+def test_extensionless_image_is_sorted_by_content_and_not_read_again(tmp_path, monkeypatch):
+    from file_organizer import engine, sniff
+
+    cache_path = tmp_path / 'sniff.json'
+    src = tmp_path / 'src'
+    src.mkdir()
+    (src / 'IMG_0001').write_bytes(b'\x89PNG\r\n\x1a\n' + bytes(64))
+    (src / 'notes').write_bytes(b'just some words\n')
+
+    classifier = Classifier(sniffer=Sniffer('unknown', cache_path=cache_path))
+    engine.sort_folder(src, classifier=classifier)
+
+    assert (src / '图片' / 'IMG_0001').exists()
+    assert (src / '文本' / 'notes').exists()
+
+    # 移动后 inode 不变，新的识别器直接使用持久缓存
+    def fail(path):
+        raise AssertionError(f'read {path}')
+
+    monkeypatch.setattr(sniff, '_read_head', fail)
+    classifier = Classifier(sniffer=Sniffer('unknown', cache_path=cache_path))
+    assert classifier.classify(src / '图片' / 'IMG_0001') == '图片'
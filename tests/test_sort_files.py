@@ -0,0 +1,46 @@
+import pytest
+
+
+@pytest.fixture
+def gui(home):
+    # customtkinter 导入时会在主目录下创建 .fonts，先由 home 夹具指向临时目录再导入
+    ctk = pytest.importorskip('customtkinter')
+    sort_files = pytest.importorskip('file_organizer.sort_files')
+    return ctk.AppearanceModeTracker, sort_files
+
+
+def test_system_theme_reads_import_time_probe(gui, monkeypatch):
+    tracker, sort_files = gui
+    monkeypatch.setattr(tracker, 'appearance_mode_set_by', 'system')
+    monkeypatch.setattr(tracker, 'appearance_mode', 1)
+    monkeypatch.setattr(tracker, 'detect_appearance_mode', pytest.fail)
+
+    assert sort_files._probe_system_theme() == 'dark'
+
+
+def test_system_theme_ignores_forced_mode(gui, monkeypatch):
+    # 系统为浅色、界面已被指定为深色时，仍应得到系统的浅色
+    tracker, sort_files = gui
+    monkeypatch.setattr(tracker, 'appearance_mode_set_by', 'user')
+    monkeypatch.setattr(tracker, 'appearance_mode', 1)
+    monkeypatch.setattr(tracker, 'detect_appearance_mode', staticmethod(lambda: 0))
+
+    assert sort_files._probe_system_theme() == 'light'
+
+
+def test_gui_startup_defers_engine_imports(home):
+    # 在新进程中导入图形界面（主目录由 home 夹具指向临时目录），分类引擎等不应被导入
+    import importlib.util
+    import os
+    import sys
+
+    if importlib.util.find_spec('customtkinter') is None:
+        pytest.skip('customtkinter is not installed')
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                    'benchmarks'))
+    import startup
+
+    result = startup.measure_imports()
+
+    assert result['deferred_loaded'] == []
+    assert 'file_organizer.progress' not in startup.DEFERRED
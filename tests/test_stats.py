@@ -0,0 +1,30 @@
+import json
+
+from file_organizer import engine
+from file_organizer.stats import Stats
+
+
+def test_sort_records_phases_operations_and_exports(tmp_path):
+    for name in ('a.jpg', 'b.jpg', 'c.txt'):
+        (tmp_path / name).write_text(name)
+    stats = Stats()
+
+    result = engine.sort_folder(tmp_path, stats=stats)
+
+    assert result['moved'] == 3
+    summary = stats.summary()
+    assert {'scan', 'classify', 'collisions', 'journal', 'execute'} <= set(summary['phases'])
+    assert summary['counts']['rename'] == 3
+    assert summary['files'] == 3 and summary['latency_p50'] <= summary['latency_p99']
+
+    stats.write(tmp_path / 'stats.json', {'command': 'sort'})
+    exported = json.loads((tmp_path / 'stats.json').read_text())
+    assert exported['counts'] == summary['counts'] and exported['labels'] == {'command': 'sort'}
+
+    stats.write(tmp_path / 'stats.prom', {'command': 'sort'})
+    lines = (tmp_path / 'stats.prom').read_text().splitlines()
+    assert 'file_organizer_operations_total{op="rename",command="sort"} 3' in lines
+    assert 'file_organizer_file_latency_seconds_count{command="sort"} 3' in lines
+    assert any(line.startswith('file_organizer_phase_seconds{phase="execute",command="sort"} ')
+               for line in lines)
+    assert not list(tmp_path.glob('*.tmp'))
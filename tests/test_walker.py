@@ -0,0 +1,49 @@
+import os
+import threading
+import time
+
+from file_organizer.walker import Walker
+
+
+def test_closing_iter_batches_stops_and_joins_workers(tmp_path, monkeypatch):
+    for i in range(40):
+        for j in range(5):
+            (tmp_path / f'd{i}' / f's{j}').mkdir(parents=True)
+    calls = []
+    scandir = os.scandir
+
+    def slow_scandir(path):
+        calls.append(path)
+        time.sleep(0.005)
+        return scandir(path)
+
+    monkeypatch.setattr(os, 'scandir', slow_scandir)
+    batches = Walker(workers=4).iter_batches(tmp_path)
+    next(batches)
+    batches.close()
+
+    assert not [t for t in threading.enumerate() if t.name.startswith('fo-walk')]
+    assert len(calls) < 1 + 40 + 40 * 5
+
+
+def test_walk_honours_depth_exclude_skip_top_and_symlink_loops(tmp_path):
+    for rel in ('a.txt', 'x/b.txt', 'x/y/c.txt', 'x/y/z/d.txt', 'node_modules/e.js',
+                'x/cache/f.txt', '图片/old.jpg'):
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(rel)
+    os.symlink(tmp_path / 'x', tmp_path / 'x' / 'y' / 'loop')
+
+    def names(snapshot):
+        return [os.path.relpath(f.path, tmp_path) for f in snapshot.files]
+
+    walker = Walker(max_depth=2, exclude=['node_modules', 'x/cache'], workers=4)
+    snapshot = walker.walk(tmp_path, skip_top={'图片'})
+
+    assert names(snapshot) == ['a.txt', os.path.join('x', 'b.txt'), os.path.join('x', 'y', 'c.txt')]
+    assert [rel for rel, _ in snapshot.dirs] == ['x', os.path.join('x', 'y')]
+
+    # 跟随符号链接时每个目录只访问一次，环路不会无限遍历
+    snapshot = Walker(follow_symlinks=True, workers=4).walk(tmp_path)
+    assert sorted(names(snapshot)) == names(snapshot)
+    assert len(names(snapshot)) == 7
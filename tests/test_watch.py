@@ -0,0 +1,63 @@
+import os
+import time
+
+from file_organizer.watch import Watcher
+
+
+class FailAfterFirst:
+    """移动第一个文件后报错的执行器"""
+
+    def run(self, moves, progress=None, on_done=None, stats=None):
+        os.makedirs(os.path.dirname(moves[0].dest), exist_ok=True)
+        os.rename(moves[0].src, moves[0].dest)
+        on_done(0)
+        raise OSError('disk full')
+
+
+def test_failed_files_stay_pending(tmp_path):
+    (tmp_path / 'a.jpg').write_bytes(b'A')
+    (tmp_path / 'b.txt').write_bytes(b'B')
+    watcher = Watcher(tmp_path, settle=0, backend='poll', executor=FailAfterFirst())
+    try:
+        result = watcher.check()
+        assert result['error'] == 'disk full'
+        first = os.path.basename(result['moves'][0].src)
+        second = os.path.basename(result['moves'][1].src)
+        assert list(watcher.pending) == [second]
+
+        watcher.executor = None
+        result = watcher.check()
+        assert result['error'] is None
+        assert [os.path.basename(move.src) for move in result['moves']] == [second]
+        assert not watcher.pending
+        assert not (tmp_path / first).exists() and not (tmp_path / second).exists()
+    finally:
+        watcher.close()
+
+
+def test_files_are_sorted_once_settled_and_partial_downloads_are_ignored(tmp_path):
+    (tmp_path / 'a.jpg').write_bytes(b'A')
+    (tmp_path / 'c.txt').write_bytes(b'C')
+    (tmp_path / 'd.mp4.part').write_bytes(b'D')
+    watcher = Watcher(tmp_path, settle=0.2, backend='poll')
+    try:
+        assert watcher.check() is None
+        time.sleep(0.3)
+        # 仍在写入的文件重新开始计时
+        with open(tmp_path / 'c.txt', 'ab') as f:
+            f.write(b'more')
+
+        result = watcher.check()
+
+        assert [os.path.basename(move.src) for move in result['moves']] == ['a.jpg']
+        assert (tmp_path / '图片' / 'a.jpg').read_bytes() == b'A'
+        assert sorted(watcher.pending) == ['c.txt']
+
+        time.sleep(0.3)
+        result = watcher.check()
+
+        assert [os.path.basename(move.src) for move in result['moves']] == ['c.txt']
+        assert (tmp_path / '文本' / 'c.txt').read_bytes() == b'Cmore'
+        assert (tmp_path / 'd.mp4.part').exists() and not watcher.pending
+    finally:
+        watcher.close()